@@ -1,29 +1,47 @@
 """
 Approval Nudger Agent - Sends escalating nudges for pending approvals.
 Monitors approval steps and sends reminders when deadlines are past due.
+
+Checks a single approval, a set of approvals or, with neither given, every
+approval.  A run costs one SELECT and one UPDATE of "lastNudgedAt" however
+many approvals it nudges; the emails go out concurrently.
 """
 
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional
 from app.agents.base_agent import BaseAgent
 from app.db import get_conn
 
 
 class ApprovalNudgerAgent(BaseAgent):
-    def __init__(self, approval_id: str = None):
+    def __init__(self, approval_id: str = None, approval_ids: Optional[Iterable[str]] = None):
         super().__init__()
         self.approval_id = approval_id
+        # None means every approval; an empty set means none
+        self.approval_ids = None
+        if approval_id or approval_ids is not None:
+            self.approval_ids = sorted(set(approval_ids or ()) | ({approval_id} if approval_id else set()))
 
     def get_action_type(self) -> str:
         return 'APPROVAL_NUDGE'
 
     async def run(self) -> Dict[str, Any]:
         overdue_approvals = await self.find_overdue_approvals()
+        if not overdue_approvals:
+            return {'nudges_sent': 0, 'approvals': []}
+
+        nudges_sent = [self.build_nudge(approval) for approval in overdue_approvals]
 
-        nudges_sent = []
-        for approval in overdue_approvals:
-            result = await self.send_nudge(approval)
-            nudges_sent.append(result)
+        # One UPDATE for the whole batch, before sending so a retry can't double-nudge
+        await self.mark_nudged([approval['id'] for approval in overdue_approvals])
+
+        from app.services.email_service import get_email_service
+        results = await get_email_service().send_many([
+            self.nudge_message(approval, nudge['days_overdue'], nudge['urgency'])
+            for approval, nudge in zip(overdue_approvals, nudges_sent)
+        ])
+        for nudge, result in zip(nudges_sent, results):
+            nudge['email_sent'] = result.get("sent", False)
 
         return {
             'nudges_sent': len(nudges_sent),
@@ -31,18 +49,20 @@ class ApprovalNudgerAgent(BaseAgent):
         }
 
     async def find_overdue_approvals(self) -> List[Dict[str, Any]]:
+        if self.approval_ids is not None and not self.approval_ids:
+            return []
         async with get_conn() as conn:
-            if self.approval_id:
+            if self.approval_ids is not None:
                 rows = await conn.fetch(
                     '''SELECT s.*, i."amount" as invoice_amount, p."name" as project_name
                        FROM "ApprovalStep" s
                        JOIN "Invoice" i ON s."invoiceId" = i."id"
                        JOIN "Project" p ON i."projectId" = p."id"
-                       WHERE s."id" = $1
+                       WHERE s."id" = ANY($1::text[])
                          AND s."status" = 'PENDING'
                          AND s."deadline" < NOW()
                          AND (s."lastNudgedAt" IS NULL OR s."lastNudgedAt" < NOW() - INTERVAL '24 hours')''',
-                    self.approval_id,
+                    self.approval_ids,
                 )
             else:
                 rows = await conn.fetch(
@@ -73,7 +93,7 @@ class ApprovalNudgerAgent(BaseAgent):
             for r in rows
         ]
 
-    async def send_nudge(self, approval: Dict[str, Any]) -> Dict[str, Any]:
+    def build_nudge(self, approval: Dict[str, Any]) -> Dict[str, Any]:
         deadline = approval['deadline']
         if deadline.tzinfo is None:
             deadline = deadline.replace(tzinfo=timezone.utc)
@@ -85,17 +105,26 @@ class ApprovalNudgerAgent(BaseAgent):
             f"({days_overdue} days overdue)"
         )
 
-        # Update lastNudgedAt
+        return {
+            'approval_id': approval['id'],
+            'stage': approval['stage'],
+            'assignee': approval['assigneeEmail'],
+            'days_overdue': days_overdue,
+            'urgency': urgency,
+            'nudge_sent': True,
+            'email_sent': False,
+        }
+
+    async def mark_nudged(self, approval_ids: List[str]) -> None:
         async with get_conn() as conn:
             await conn.execute(
-                'UPDATE "ApprovalStep" SET "lastNudgedAt" = NOW(), "updatedAt" = NOW() WHERE "id" = $1',
-                approval['id'],
+                '''UPDATE "ApprovalStep" SET "lastNudgedAt" = NOW(), "updatedAt" = NOW()
+                   WHERE "id" = ANY($1::text[])''',
+                approval_ids,
             )
 
-        # Send email nudge
-        from app.services.email_service import get_email_service
-        email_sent = False
-
+    def nudge_message(self, approval: Dict[str, Any], days_overdue: int, urgency: str) -> Dict[str, Any]:
+        """Nudge email for one approval, as send_email keyword arguments."""
         urgency_colors = {
             'low': '#3b82f6',
             'medium': '#eab308',
@@ -135,22 +164,7 @@ class ApprovalNudgerAgent(BaseAgent):
             f"<p style='color:#6b7280'>— ZOARK OS Approval Nudger</p>"
         )
 
-        result = await get_email_service().send_email(
-            to=approval['assigneeEmail'],
-            subject=subject,
-            body=body,
-        )
-        email_sent = result.get("sent", False)
-
-        return {
-            'approval_id': approval['id'],
-            'stage': approval['stage'],
-            'assignee': approval['assigneeEmail'],
-            'days_overdue': days_overdue,
-            'urgency': urgency,
-            'nudge_sent': True,
-            'email_sent': email_sent,
-        }
+        return {"to": approval['assigneeEmail'], "subject": subject, "body": body}
 
     def calculate_urgency(self, days_overdue: int) -> str:
         if days_overdue > 7:
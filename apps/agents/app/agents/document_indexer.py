@@ -1,8 +1,47 @@
+"""
+Document Indexer Agent - Embeds pending RAGDocument rows into the vector index.
+
+Runs as a continuous worker: claims batches of PENDING documents with
+``FOR UPDATE SKIP LOCKED`` (so several replicas can share the queue), runs
+fetch → extract → embed/upsert as bounded concurrent stages, and writes the
+resulting statuses back in bulk.  Claimed rows are marked INDEXING; a claim
+whose worker died is picked up again once its lease expires.
+"""
+
+import asyncio
 import logging
-from app.db import get_conn
+import time
+from typing import Any, Dict, List, Optional
+
 from app.agents.base_agent import BaseAgent
+from app.config import get_settings
+from app.db import get_conn
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_MAX_IDLE_SECONDS = 30.0
+
+
+class StageTimer:
+    """Running latency totals for one pipeline stage."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_ms": round(1000 * self.total / self.count, 2) if self.count else 0.0,
+            "max_ms": round(1000 * self.max, 2),
+        }
 
 
 class DocumentIndexerAgent(BaseAgent):
@@ -10,48 +49,189 @@ class DocumentIndexerAgent(BaseAgent):
 
     agent_type = "document_indexer"
 
+    def __init__(self, batch_size: Optional[int] = None, concurrency: Optional[int] = None):
+        super().__init__()
+        self.batch_size = batch_size or settings.document_indexer_batch_size
+        self.concurrency = concurrency or settings.document_indexer_concurrency
+        self.lease_seconds = settings.document_indexer_lease_seconds
+        self.stages = {name: StageTimer() for name in ("claim", "fetch", "extract", "embed_upsert", "status")}
+        self.documents_indexed = 0
+        self.documents_failed = 0
+        self.queue_depth = 0
+        self._running = False
+
     def get_action_type(self) -> str:
         return "DOCUMENT_INDEXED"
 
     async def run(self):
-        """Check for pending documents and index them to RAG"""
-        async with get_conn() as conn:
-            documents = await conn.fetch(
-                '''SELECT * FROM "RAGDocument"
-                   WHERE "ragStatus" = 'PENDING'::"RAGStatus"
-                   ORDER BY "createdAt" ASC
-                   LIMIT 10'''
-            )
+        """Claim one batch of pending documents and index them to RAG"""
+        documents = await self._claim_batch()
+        if not documents:
+            return {"documents_processed": 0, "indexed": 0, "failed": 0}
 
-            for doc in documents:
-                await self._index_document(conn, doc)
+        indexed, failed = await self._process_batch(documents)
+        return {"documents_processed": len(documents), "indexed": len(indexed), "failed": len(failed)}
 
-        return {"documents_processed": len(documents)}
+    async def run_forever(self) -> None:
+        """Keep draining the queue; back off while it is empty."""
+        self._running = True
+        idle = settings.document_indexer_idle_seconds
+        logger.info(f"Document indexer worker started (batch={self.batch_size}, concurrency={self.concurrency})")
+        while self._running:
+            try:
+                result = await self.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Document indexer batch failed: {e}")
+                result = {"documents_processed": 0}
 
-    async def _index_document(self, conn, document):
-        """Index a single document to RAG"""
-        try:
-            content = document["content"]
-            if not content and document["url"]:
-                # In production, would fetch and extract text from URL
-                content = f"Document: {document['name']}"
+            if result["documents_processed"]:
+                idle = settings.document_indexer_idle_seconds
+            else:
+                await asyncio.sleep(idle)
+                idle = min(idle * 2, _MAX_IDLE_SECONDS)
 
-            # In production, would call Pinecone API to create embeddings and store vector
-            logger.info(f"Indexing document {document['id']}: {document['name']}")
+    def stop(self) -> None:
+        self._running = False
 
-            await conn.execute(
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth,
+            "documents_indexed": self.documents_indexed,
+            "documents_failed": self.documents_failed,
+            "stages": {name: timer.summary() for name, timer in self.stages.items()},
+        }
+
+    # ── claim ─────────────────────────────────────────────────────────
+    async def _claim_batch(self) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        async with get_conn() as conn:
+            rows = await conn.fetch(
                 '''UPDATE "RAGDocument"
-                   SET "ragStatus" = 'INDEXED'::"RAGStatus", "updatedAt" = NOW()
-                   WHERE "id" = $1''',
-                document["id"]
+                   SET "ragStatus" = 'INDEXING'::"RAGStatus", "updatedAt" = NOW()
+                   WHERE "id" IN (
+                       SELECT "id" FROM "RAGDocument"
+                       WHERE "ragStatus" = 'PENDING'::"RAGStatus"
+                          OR ("ragStatus" = 'INDEXING'::"RAGStatus"
+                              AND "updatedAt" < NOW() - make_interval(secs => $2))
+                       ORDER BY "createdAt" ASC
+                       LIMIT $1
+                       FOR UPDATE SKIP LOCKED
+                   )
+                   RETURNING "id", "name", "type", "source", "url", "content", "metadata"''',
+                self.batch_size,
+                float(self.lease_seconds),
             )
+            self.queue_depth = await conn.fetchval(
+                '''SELECT COUNT(*) FROM "RAGDocument" WHERE "ragStatus" = 'PENDING'::"RAGStatus"'''
+            )
+        self.stages["claim"].record(time.perf_counter() - started)
+        return [dict(r) for r in rows]
+
+    # ── pipeline ──────────────────────────────────────────────────────
+    async def _process_batch(self, documents: List[Dict[str, Any]]):
+        from app.rag.retriever import get_rag_retriever
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def prepare(document):
+            async with semaphore:
+                try:
+                    return await self._extract_text(document)
+                except Exception as e:
+                    logger.error(f"Error extracting document {document['id']}: {e}")
+                    return None
+
+        texts = await asyncio.gather(*(prepare(d) for d in documents))
+        ready = [(d, t) for d, t in zip(documents, texts) if t]
+        failed = {d["id"] for d, t in zip(documents, texts) if not t}
+
+        started = time.perf_counter()
+        result = await get_rag_retriever().index_batch(
+            (
+                {
+                    "id": d["id"],
+                    "text": text,
+                    "metadata": {"type": d["type"], "name": d["name"], "source": d["source"], "url": d["url"]},
+                }
+                for d, text in ready
+            ),
+            concurrency=self.concurrency,
+        )
+        self.stages["embed_upsert"].record(time.perf_counter() - started)
+
+        failed |= set(result.get("failed_documents", []))
+        indexed = [d["id"] for d, _ in ready if d["id"] not in failed]
+        await self._write_statuses(indexed, sorted(failed))
+
+        self.documents_indexed += len(indexed)
+        self.documents_failed += len(failed)
+        logger.info(f"Indexed {len(indexed)} documents, {len(failed)} failed ({self.queue_depth} pending)")
+        return indexed, failed
+
+    async def _extract_text(self, document: Dict[str, Any]) -> str:
+        content = document["content"]
+        if content:
+            return content
+        if not document["url"]:
+            return f"Document: {document['name']}"
+
+        from app.services.pdf_extraction import download, extract_pdf_text
+
+        started = time.perf_counter()
+        data = await download(document["url"])
+        self.stages["fetch"].record(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        if data[:5] == b"%PDF-" or document["url"].lower().endswith(".pdf"):
+            text = await extract_pdf_text(data)
+        else:
+            text = data.decode("utf-8", errors="replace")
+        self.stages["extract"].record(time.perf_counter() - started)
+        return text or f"Document: {document['name']}"
+
+    async def _write_statuses(self, indexed: List[str], failed: List[str]) -> None:
+        started = time.perf_counter()
+        async with get_conn() as conn:
+            async with conn.transaction():
+                if indexed:
+                    # Chunks are stored as "{id}#0", "{id}#1", ...; vectorId holds their common prefix
+                    await conn.execute(
+                        '''UPDATE "RAGDocument"
+                           SET "ragStatus" = 'INDEXED'::"RAGStatus", "vectorId" = "id" || '#', "updatedAt" = NOW()
+                           WHERE "id" = ANY($1::text[])''',
+                        indexed,
+                    )
+                if failed:
+                    await conn.execute(
+                        '''UPDATE "RAGDocument"
+                           SET "ragStatus" = 'FAILED'::"RAGStatus", "updatedAt" = NOW()
+                           WHERE "id" = ANY($1::text[])''',
+                        failed,
+                    )
+        if indexed:
+            from app.rag.hybrid_search import get_hybrid_search
+            get_hybrid_search().invalidate()
+        self.stages["status"].record(time.perf_counter() - started)
+
+
+# Singleton worker instance
+_document_indexer = None
+
+
+def get_document_indexer() -> DocumentIndexerAgent:
+    global _document_indexer
+    if _document_indexer is None:
+        _document_indexer = DocumentIndexerAgent()
+    return _document_indexer
+
 
-        except Exception as e:
-            logger.error(f"Error indexing document {document['id']}: {e}")
-            async with get_conn() as err_conn:
-                await err_conn.execute(
-                    '''UPDATE "RAGDocument"
-                       SET "ragStatus" = 'FAILED'::"RAGStatus", "updatedAt" = NOW()
-                       WHERE "id" = $1''',
-                    document["id"]
-                )
+async def start_document_indexer() -> None:
+    """Run the shared indexer worker until cancelled."""
+    indexer = get_document_indexer()
+    try:
+        await indexer.run_forever()
+    except asyncio.CancelledError:
+        indexer.stop()
+        logger.info("Document indexer worker shut down")
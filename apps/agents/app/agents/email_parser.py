@@ -5,10 +5,11 @@ Parses invoice PDFs, extracts key information (amount, date, vendor),
 and indexes content in vector database for RAG.
 """
 
-from typing import Dict, Any
-import re
+from typing import Dict, Any, List, Optional
+import asyncio
 import logging
 from app.agents.base_agent import BaseAgent
+from app.services.entity_extraction import get_extraction_engine
 from app.rag.retriever import get_rag_retriever
 
 logger = logging.getLogger(__name__)
@@ -69,23 +70,9 @@ class EmailParserAgent(BaseAgent):
         logger.info(f"Downloading PDF: {pdf_url}")
 
         try:
-            import httpx
-            from PyPDF2 import PdfReader
-            import tempfile, os
+            from app.services.pdf_extraction import download_and_extract
 
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(pdf_url)
-                response.raise_for_status()
-
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-                tmp.write(response.content)
-                tmp_path = tmp.name
-
-            try:
-                reader = PdfReader(tmp_path)
-                text = ''.join(page.extract_text() or '' for page in reader.pages)
-            finally:
-                os.unlink(tmp_path)
+            text = await download_and_extract(pdf_url)
 
             logger.info(f"Parsed PDF: {len(text)} chars extracted")
             return text
@@ -109,6 +96,38 @@ class EmailParserAgent(BaseAgent):
                 "Account Number: 1234-5678-9012\n"
             )
 
+    @classmethod
+    async def parse_batch(
+        cls,
+        invoices: List[Dict[str, Any]],
+        concurrency: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Parse a queue of invoice PDFs concurrently.
+
+        Downloads share one keep-alive client and parsing runs in the PDF
+        process pool, so ``concurrency`` mostly bounds memory and provider load.
+
+        Args:
+            invoices: List of {"pdf_url": str, "invoice_id": str}
+            concurrency: Invoices in flight at once
+
+        Returns:
+            One result per invoice, in order; failures carry an "error" key
+        """
+        from app.config import get_settings
+        semaphore = asyncio.Semaphore(concurrency or get_settings().pdf_batch_concurrency)
+
+        async def parse_one(invoice: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                agent = cls(pdf_url=invoice.get('pdf_url'), invoice_id=invoice.get('invoice_id'))
+                try:
+                    return await agent.execute()
+                except Exception as e:
+                    return {'invoice_id': invoice.get('invoice_id'), 'pdf_url': invoice.get('pdf_url'), 'error': str(e)}
+
+        return await asyncio.gather(*(parse_one(i) for i in invoices))
+
     def extract_entities(self, text: str) -> Dict[str, Any]:
         """
         Extract key entities from invoice text.
@@ -121,29 +140,7 @@ class EmailParserAgent(BaseAgent):
         """
         logger.info("Extracting entities from PDF text")
 
-        entities = {}
-
-        # Extract invoice number
-        invoice_match = re.search(r'Invoice\s+Number:\s*([A-Z0-9-]+)', text, re.IGNORECASE)
-        if invoice_match:
-            entities['invoice_number'] = invoice_match.group(1)
-
-        # Extract date
-        date_match = re.search(r'Date:\s*([A-Za-z]+\s+\d+,\s+\d{4})', text)
-        if date_match:
-            entities['date'] = date_match.group(1)
-
-        # Extract amount (various formats)
-        amount_match = re.search(r'Total\s*\$?([\d,]+\.?\d*)', text, re.IGNORECASE)
-        if amount_match:
-            amount_str = amount_match.group(1).replace(',', '')
-            entities['amount'] = float(amount_str)
-
-        # Extract vendor/company names
-        # Simple heuristic: look for "From:" section
-        from_match = re.search(r'From:\s*\n\s*([^\n]+)', text)
-        if from_match:
-            entities['vendor'] = from_match.group(1).strip()
+        entities = get_extraction_engine().extract(text)
 
         logger.info(f"Extracted entities: {entities}")
         return entities
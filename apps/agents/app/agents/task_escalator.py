@@ -1,6 +1,9 @@
 import logging
+import time
 from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
 from uuid import uuid4
+from app.config import get_settings
 from app.db import get_conn
 from app.agents.base_agent import BaseAgent
 
@@ -8,61 +11,90 @@ logger = logging.getLogger(__name__)
 
 
 class TaskEscalatorAgent(BaseAgent):
-    """Agent that escalates stuck tasks and updates health status"""
+    """
+    Agent that escalates stuck tasks and updates health status
+
+    Escalation is set-based: each chunk of stuck tasks is marked CRITICAL
+    with one ``UPDATE ... RETURNING`` and its "TaskDetail" rows are upserted
+    with one ``INSERT ... ON CONFLICT``, both in the same transaction.
+    Chunks walk the ("status", "lastUpdated") index by keyset, so a large
+    backlog never holds one huge transaction.
+    """
 
     agent_type = "task_escalator"
 
+    def __init__(self, chunk_size: Optional[int] = None):
+        super().__init__()
+        self.chunk_size = chunk_size or get_settings().task_escalation_chunk_size
+
     def get_action_type(self) -> str:
         return "TASK_ESCALATED"
 
     async def run(self):
         """Check for stuck tasks and escalate them"""
         stuck_threshold = datetime.utcnow() - timedelta(hours=48)
+        started = time.perf_counter()
+        escalated = 0
+        chunks = 0
+        cursor = None
 
         async with get_conn() as conn:
-            stuck_tasks = await conn.fetch(
-                '''SELECT * FROM "Task"
-                   WHERE "status" = 'ACTIVE'::"TaskStatus"
-                   AND "lastUpdated" < $1
-                   ORDER BY "lastUpdated" ASC''',
-                stuck_threshold
-            )
-
-            for task in stuck_tasks:
-                await self._escalate_task(conn, task)
+            while True:
+                task_ids, cursor = await self._escalate_chunk(conn, stuck_threshold, cursor)
+                if not task_ids:
+                    break
+                escalated += len(task_ids)
+                chunks += 1
+                logger.info(f"Escalated {len(task_ids)} stuck tasks (chunk {chunks})")
+                if len(task_ids) < self.chunk_size:
+                    break
 
-        return {"tasks_escalated": len(stuck_tasks)}
+        elapsed = time.perf_counter() - started
+        rate = escalated / elapsed if elapsed > 0 else 0.0
+        logger.info(f"Escalated {escalated} stuck tasks in {elapsed:.2f}s ({rate:.0f} rows/s)")
+        return {
+            "tasks_escalated": escalated,
+            "chunks": chunks,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(rate, 1),
+        }
 
-    async def _escalate_task(self, conn, task):
-        """Escalate a single stuck task"""
-        try:
-            logger.info(f"Escalating stuck task {task['id']}: {task['title']}")
-
-            await conn.execute(
-                '''UPDATE "Task"
+    async def _escalate_chunk(
+        self, conn, stuck_threshold: datetime, cursor: Optional[Tuple[datetime, str]],
+    ) -> Tuple[List[str], Optional[Tuple[datetime, str]]]:
+        """Escalate the next chunk after ``cursor``; returns its task ids and the new cursor"""
+        after_updated, after_id = cursor or (datetime.min, "")
+        async with conn.transaction():
+            rows = await conn.fetch(
+                '''WITH stuck AS (
+                       SELECT "id" FROM "Task"
+                       WHERE "status" = 'ACTIVE'::"TaskStatus"
+                       AND "healthStatus" != 'CRITICAL'::"HealthStatus"
+                       AND "lastUpdated" < $1
+                       AND ("lastUpdated", "id") > ($2, $3)
+                       ORDER BY "lastUpdated" ASC, "id" ASC
+                       LIMIT $4
+                       FOR UPDATE
+                   )
+                   UPDATE "Task" t
                    SET "healthStatus" = 'CRITICAL'::"HealthStatus", "updatedAt" = NOW()
-                   WHERE "id" = $1''',
-                task["id"]
+                   FROM stuck WHERE t."id" = stuck."id"
+                   RETURNING t."id", t."lastUpdated"''',
+                stuck_threshold, after_updated, after_id, self.chunk_size,
             )
+            if not rows:
+                return [], cursor
 
-            detail = await conn.fetchrow(
-                'SELECT "id" FROM "TaskDetail" WHERE "taskId" = $1',
-                task["id"]
+            task_ids = [r["id"] for r in rows]
+            await conn.execute(
+                '''INSERT INTO "TaskDetail" ("id", "taskId", "healthStatus", "createdAt", "updatedAt")
+                   SELECT d."id", d."taskId", 'CRITICAL'::"HealthStatus", NOW(), NOW()
+                   FROM unnest($1::text[], $2::text[]) AS d("id", "taskId")
+                   ON CONFLICT ("taskId") DO UPDATE
+                   SET "healthStatus" = 'CRITICAL'::"HealthStatus", "updatedAt" = NOW()''',
+                [str(uuid4()) for _ in task_ids], task_ids,
             )
 
-            if detail:
-                await conn.execute(
-                    '''UPDATE "TaskDetail"
-                       SET "healthStatus" = 'CRITICAL'::"HealthStatus", "updatedAt" = NOW()
-                       WHERE "taskId" = $1''',
-                    task["id"]
-                )
-            else:
-                await conn.execute(
-                    '''INSERT INTO "TaskDetail" ("id", "taskId", "healthStatus", "createdAt", "updatedAt")
-                       VALUES ($1, $2, 'CRITICAL'::"HealthStatus", NOW(), NOW())''',
-                    str(uuid4()), task["id"]
-                )
-
-        except Exception as e:
-            logger.error(f"Error escalating task {task['id']}: {e}")
+        # RETURNING order is unspecified: the cursor is the chunk's largest key
+        last = max(rows, key=lambda r: (r["lastUpdated"], r["id"]))
+        return task_ids, (last["lastUpdated"], last["id"])
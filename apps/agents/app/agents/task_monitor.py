@@ -1,18 +1,25 @@
 """
 Task Monitor Agent - Detects and alerts on stuck tasks.
 Monitors tasks in ACTIVE status and alerts when they haven't been updated in >48 hours.
+
+Checks a single task, a set of tasks (one query for the whole set) or, with
+neither given, every task.
 """
 
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional
 from app.agents.base_agent import BaseAgent
 from app.db import get_conn
 
 
 class TaskMonitorAgent(BaseAgent):
-    def __init__(self, task_id: str = None):
+    def __init__(self, task_id: str = None, task_ids: Optional[Iterable[str]] = None):
         super().__init__()
         self.task_id = task_id
+        # None means every task; an empty set means none
+        self.task_ids = None
+        if task_id or task_ids is not None:
+            self.task_ids = sorted(set(task_ids or ()) | ({task_id} if task_id else set()))
 
     def get_action_type(self) -> str:
         return 'TASK_STUCK_ALERT'
@@ -20,10 +27,18 @@ class TaskMonitorAgent(BaseAgent):
     async def run(self) -> Dict[str, Any]:
         stuck_tasks = await self.find_stuck_tasks()
 
-        alerts = []
-        for task in stuck_tasks:
-            alert = await self.send_alert(task)
-            alerts.append(alert)
+        alerts = [self.build_alert(task) for task in stuck_tasks]
+
+        from app.config import get_settings
+        settings = get_settings()
+        if settings.alert_email and alerts:
+            from app.services.email_service import get_email_service
+            results = await get_email_service().send_many([
+                self.alert_message(task, alert['stuck_days'], settings.alert_email)
+                for task, alert in zip(stuck_tasks, alerts)
+            ])
+            for alert, result in zip(alerts, results):
+                alert['email_sent'] = result.get("sent", False)
 
         return {
             'alerts_sent': len(alerts),
@@ -31,15 +46,17 @@ class TaskMonitorAgent(BaseAgent):
         }
 
     async def find_stuck_tasks(self) -> List[Dict[str, Any]]:
+        if self.task_ids is not None and not self.task_ids:
+            return []
         async with get_conn() as conn:
-            if self.task_id:
+            if self.task_ids is not None:
                 rows = await conn.fetch(
                     '''SELECT t.*, p."name" as project_name
                        FROM "Task" t
                        JOIN "Project" p ON t."projectId" = p."id"
-                       WHERE t."id" = $1 AND t."status" = 'ACTIVE'
+                       WHERE t."id" = ANY($1::text[]) AND t."status" = 'ACTIVE'
                          AND t."lastUpdated" < NOW() - INTERVAL '48 hours' ''',
-                    self.task_id,
+                    self.task_ids,
                 )
             else:
                 rows = await conn.fetch(
@@ -61,7 +78,7 @@ class TaskMonitorAgent(BaseAgent):
             for r in rows
         ]
 
-    async def send_alert(self, task: Dict[str, Any]) -> Dict[str, Any]:
+    def build_alert(self, task: Dict[str, Any]) -> Dict[str, Any]:
         last_updated = task['lastUpdated']
         if last_updated.tzinfo is None:
             last_updated = last_updated.replace(tzinfo=timezone.utc)
@@ -71,40 +88,31 @@ class TaskMonitorAgent(BaseAgent):
             f"Task {task['id']} ({task['title']}) stuck for {stuck_days} days"
         )
 
-        from app.services.email_service import get_email_service
-        from app.config import get_settings
-        settings = get_settings()
-
-        email_sent = False
-        if settings.alert_email:
-            subject = f"[ZOARK OS] Task Stuck — {task['title']}"
-            body = (
-                f"<h2>Task Stuck Alert</h2>"
-                f"<table style='border-collapse:collapse;width:100%'>"
-                f"<tr><td style='padding:6px 12px;color:#9ca3af'>Task</td>"
-                f"<td style='padding:6px 12px;font-weight:bold'>{task['title']}</td></tr>"
-                f"<tr><td style='padding:6px 12px;color:#9ca3af'>Project</td>"
-                f"<td style='padding:6px 12px'>{task['project']['name']}</td></tr>"
-                f"<tr><td style='padding:6px 12px;color:#9ca3af'>Status</td>"
-                f"<td style='padding:6px 12px'>{task['status']}</td></tr>"
-                f"<tr><td style='padding:6px 12px;color:#9ca3af'>Stuck For</td>"
-                f"<td style='padding:6px 12px;color:#ef4444;font-weight:bold'>{stuck_days} day(s)</td></tr>"
-                f"</table>"
-                f"<p style='margin-top:16px;color:#6b7280'>Last updated: {task['lastUpdated']}</p>"
-                f"<p style='color:#6b7280'>— ZOARK OS Task Monitor</p>"
-            )
-            result = await get_email_service().send_email(
-                to=settings.alert_email,
-                subject=subject,
-                body=body,
-            )
-            email_sent = result.get("sent", False)
-
         return {
             'task_id': task['id'],
             'task_title': task['title'],
             'project': task['project']['name'],
             'stuck_days': stuck_days,
             'alert_sent': True,
-            'email_sent': email_sent,
+            'email_sent': False,
         }
+
+    def alert_message(self, task: Dict[str, Any], stuck_days: int, to: str) -> Dict[str, Any]:
+        """Alert email for one stuck task, as send_email keyword arguments."""
+        subject = f"[ZOARK OS] Task Stuck — {task['title']}"
+        body = (
+            f"<h2>Task Stuck Alert</h2>"
+            f"<table style='border-collapse:collapse;width:100%'>"
+            f"<tr><td style='padding:6px 12px;color:#9ca3af'>Task</td>"
+            f"<td style='padding:6px 12px;font-weight:bold'>{task['title']}</td></tr>"
+            f"<tr><td style='padding:6px 12px;color:#9ca3af'>Project</td>"
+            f"<td style='padding:6px 12px'>{task['project']['name']}</td></tr>"
+            f"<tr><td style='padding:6px 12px;color:#9ca3af'>Status</td>"
+            f"<td style='padding:6px 12px'>{task['status']}</td></tr>"
+            f"<tr><td style='padding:6px 12px;color:#9ca3af'>Stuck For</td>"
+            f"<td style='padding:6px 12px;color:#ef4444;font-weight:bold'>{stuck_days} day(s)</td></tr>"
+            f"</table>"
+            f"<p style='margin-top:16px;color:#6b7280'>Last updated: {task['lastUpdated']}</p>"
+            f"<p style='color:#6b7280'>— ZOARK OS Task Monitor</p>"
+        )
+        return {"to": to, "subject": subject, "body": body}
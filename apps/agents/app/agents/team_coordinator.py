@@ -1,10 +1,21 @@
 import logging
-from datetime import datetime
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import get_settings
 from app.db import get_conn
 from app.agents.base_agent import BaseAgent
 
 logger = logging.getLogger(__name__)
 
+# Team members without an upload for this long are reminded, at most once
+# per this period
+REMINDER_AFTER = timedelta(days=7)
+
+# project id -> (expires_at, report), least recently used first
+_report_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
 
 class TeamCoordinatorAgent(BaseAgent):
     """Agent that coordinates team tasks, sends reminders, and collects documents"""
@@ -16,40 +27,98 @@ class TeamCoordinatorAgent(BaseAgent):
 
     async def run(self):
         """Send document collection reminders and track submissions"""
+        now = datetime.utcnow()
         async with get_conn() as conn:
+            # Each assignment of a member not reminded recently, with the
+            # member's latest upload, in one query
             assignments = await conn.fetch(
-                '''SELECT ta.*, tm."email", t."title", t."id" as "taskId"
+                '''SELECT ta."id", ta."teamMemberId", tm."email", tm."name", t."title", t."id" as "taskId",
+                          d."uploadedAt" as "lastUploadAt"
                    FROM "TaskAssignment" ta
                    JOIN "TeamMember" tm ON ta."teamMemberId" = tm."id"
                    JOIN "Task" t ON ta."taskId" = t."id"
+                   LEFT JOIN LATERAL (
+                       SELECT "uploadedAt" FROM "TeamDocument"
+                       WHERE "teamMemberId" = ta."teamMemberId"
+                       ORDER BY "uploadedAt" DESC LIMIT 1
+                   ) d ON true
                    WHERE t."status" = 'ACTIVE'::"TaskStatus"
-                   ORDER BY ta."assignedAt" DESC'''
+                     AND (tm."lastRemindedAt" IS NULL OR tm."lastRemindedAt" < $1)
+                   ORDER BY ta."assignedAt" DESC''',
+                now - REMINDER_AFTER,
             )
 
-            for assignment in assignments:
-                await self._check_assignment(conn, assignment)
-
-        return {"assignments_checked": len(assignments)}
-
-    async def _check_assignment(self, conn, assignment):
-        """Check assignment status and send reminders if needed"""
-        try:
-            team_member_id = assignment["teamMemberId"]
-            task_id = assignment["taskId"]
-
-            documents = await conn.fetch(
-                'SELECT * FROM "TeamDocument" WHERE "teamMemberId" = $1 ORDER BY "uploadedAt" DESC LIMIT 1',
-                team_member_id
+        reminders = self._build_reminders(assignments, now)
+        sent = 0
+        if reminders:
+            from app.services.email_service import get_email_service
+            results = await get_email_service().send_many(
+                [self._reminder_message(reminder) for reminder in reminders],
+                rate_per_second=get_settings().team_reminder_rate_per_second,
             )
-
-            if not documents or (datetime.utcnow() - documents[0]["uploadedAt"]).days > 7:
-                logger.info(f"Sending reminder to {assignment['email']} for task {task_id}")
-
-        except Exception as e:
-            logger.error(f"Error checking assignment {assignment['id']}: {e}")
-
-    async def generate_team_report(self, project_id: str):
-        """Generate a team report for a project"""
+            reminded = [r["memberId"] for r, result in zip(reminders, results) if result.get("sent")]
+            sent = len(reminded)
+            if reminded:
+                async with get_conn() as conn:
+                    await conn.execute(
+                        '''UPDATE "TeamMember" SET "lastRemindedAt" = NOW(), "updatedAt" = NOW()
+                           WHERE "id" = ANY($1::text[])''',
+                        reminded,
+                    )
+
+        return {
+            "assignments_checked": len(assignments),
+            "members_reminded": len(reminders),
+            "reminders_sent": sent,
+        }
+
+    def _build_reminders(self, assignments, now: datetime) -> List[Dict[str, Any]]:
+        """One reminder per team member whose latest upload is missing or stale, listing their tasks"""
+        reminders: Dict[str, Dict[str, Any]] = {}
+        for assignment in assignments:
+            last_upload = assignment["lastUploadAt"]
+            if last_upload is not None and now - last_upload <= REMINDER_AFTER:
+                continue
+            reminder = reminders.setdefault(assignment["teamMemberId"], {
+                "memberId": assignment["teamMemberId"],
+                "email": assignment["email"],
+                "name": assignment["name"],
+                "lastUploadAt": last_upload,
+                "tasks": [],
+            })
+            reminder["tasks"].append(assignment["title"])
+            logger.info(f"Sending reminder to {assignment['email']} for task {assignment['taskId']}")
+        return list(reminders.values())
+
+    def _reminder_message(self, reminder: Dict[str, Any]) -> Dict[str, Any]:
+        tasks_list = "".join(f"<li>{title}</li>" for title in reminder["tasks"])
+        last_upload = reminder["lastUploadAt"] or "never"
+        body = (
+            f"<h2>Document Reminder</h2>"
+            f"<p>Hi {reminder['name']}, please upload your latest documents for:</p>"
+            f"<ul>{tasks_list}</ul>"
+            f"<p style='color:#6b7280'>Last upload: {last_upload}</p>"
+            f"<p style='color:#6b7280'>— ZOARK OS Team Coordinator</p>"
+        )
+        return {
+            "to": reminder["email"],
+            "subject": f"[ZOARK OS] Documents needed for {len(reminder['tasks'])} task(s)",
+            "body": body,
+        }
+
+    async def generate_team_report(self, project_id: str, use_cache: bool = True):
+        """Generate a team report for a project (cached for team_report_cache_seconds)"""
+        if use_cache:
+            cached = _cached_report(project_id)
+            if cached is not None:
+                return cached
+
+        report = await self._build_team_report(project_id)
+        if report is not None:
+            _remember_report(project_id, report)
+        return report
+
+    async def _build_team_report(self, project_id: str) -> Optional[Dict[str, Any]]:
         try:
             async with get_conn() as conn:
                 team_members = await conn.fetch(
@@ -94,3 +163,25 @@ class TeamCoordinatorAgent(BaseAgent):
         except Exception as e:
             logger.error(f"Error generating team report: {e}")
             return None
+
+
+def _cached_report(project_id: str) -> Optional[Dict[str, Any]]:
+    entry = _report_cache.get(project_id)
+    if entry is None:
+        return None
+    expires_at, report = entry
+    if expires_at < time.monotonic():
+        del _report_cache[project_id]
+        return None
+    _report_cache.move_to_end(project_id)
+    return report
+
+
+def _remember_report(project_id: str, report: Dict[str, Any]) -> None:
+    settings = get_settings()
+    if settings.team_report_cache_size <= 0:
+        return
+    _report_cache[project_id] = (time.monotonic() + settings.team_report_cache_seconds, report)
+    _report_cache.move_to_end(project_id)
+    while len(_report_cache) > settings.team_report_cache_size:
+        _report_cache.popitem(last=False)
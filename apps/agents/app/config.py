@@ -39,13 +39,150 @@ class Settings(BaseSettings):
     # System alert inbox (task-stuck notifications, etc.)
     alert_email: str = ""
 
+    # Emails in flight at once when an agent sends a batch (send_many)
+    email_send_concurrency: int = 8
+    # Per-provider bounds: pooled SMTP sessions, concurrent REST requests
+    smtp_pool_size: int = 4
+    sendgrid_concurrency: int = 8
+    resend_concurrency: int = 4
+
+    # Outbound email queue: endpoints enqueue to this Redis stream and a
+    # background sender pool delivers.  Failed sends retry with exponential
+    # backoff (base * 2^n, capped); sends are shaped by a token bucket per
+    # provider ("smtp=1,sendgrid=50" emails per second, burst of rate_burst)
+    # kept in Redis, so the rates hold across all replicas combined.
+    # Messages taken within batch_window_seconds go out through one
+    # send_bulk call (one SendGrid request per template); sender_concurrency
+    # bounds the messages in flight, and so the size of a batch.
+    email_queue_stream: str = "email_outbox:stream"
+    email_queue_group: str = "email-senders"
+    email_sender_concurrency: int = 100
+    email_batch_window_seconds: float = 1.0
+    email_max_attempts: int = 5
+    email_retry_base_seconds: float = 30.0
+    email_retry_max_seconds: float = 3600.0
+    email_retry_poll_seconds: float = 1.0
+    email_rate_limits: str = "smtp=1,sendgrid=50,resend=2"
+    email_rate_burst: int = 10
+
+    # TeamCoordinatorAgent: document reminders sent per second, and how long
+    # a generated team report is served from cache (at most cache_size projects)
+    team_reminder_rate_per_second: float = 5.0
+    team_report_cache_seconds: float = 300.0
+    team_report_cache_size: int = 256
+
     # ── LLM ───────────────────────────────────────────────────────────
     openai_api_key: str = ""
 
+    # Embedding cache: in-process LRU entries, plus a shared Redis tier
+    embedding_cache_size: int = 10000
+    embedding_cache_ttl_seconds: int = 7 * 24 * 3600
+    embedding_cache_redis: bool = True
+    # Concurrent embedding requests are coalesced for up to this long / this many texts
+    embedding_batch_window_ms: float = 5.0
+    embedding_batch_max_size: int = 256
+
+    # Bulk indexing pipeline (RAGRetriever.index_batch)
+    rag_chunk_tokens: int = 512
+    rag_chunk_overlap: int = 64
+    rag_embed_batch_size: int = 256
+    rag_index_concurrency: int = 4
+    rag_upsert_page_size: int = 100
+
+    # Semantic search result cache, invalidated by every index write.
+    # similarity > 0 also serves queries whose embedding is at least that
+    # cosine-similar to a cached query's.  With redis the invalidation is
+    # shared, so writes from other workers and replicas are seen at once.
+    rag_query_cache_size: int = 1024
+    rag_query_cache_ttl_seconds: float = 300.0
+    rag_query_cache_similarity: float = 0.0
+    rag_query_cache_redis: bool = True
+
+    # Hybrid /documents/search: full-text + vector rankings fused with RRF.
+    # Candidates are taken from each ranker and fused once per query; every
+    # page is sliced from that cached ranking, and pages reaching past this
+    # depth (offset + limit) are rejected with 422.
+    search_rrf_k: int = 60
+    search_candidates: int = 200
+    search_cache_size: int = 512
+    search_cache_ttl_seconds: float = 30.0
+
+    # Document indexer worker (drains PENDING RAGDocument rows)
+    document_indexer_enabled: bool = True
+    document_indexer_batch_size: int = 32
+    document_indexer_concurrency: int = 8
+    document_indexer_lease_seconds: int = 600
+    document_indexer_idle_seconds: float = 2.0
+
+    # Orchestrator trigger engine: a fired row whose deadline the agent run
+    # did not move is fired again after this delay
+    trigger_retry_seconds: float = 60.0
+    # TaskEscalatorAgent escalates stuck tasks this many per transaction
+    task_escalation_chunk_size: int = 5000
+    # Orchestrator worker pool: runs in flight overall and per agent type
+    # (overrides as "broadcast_agent=2,task_escalator=1").  An agent type
+    # never overlaps itself; requests during a run collapse into one re-run.
+    orchestrator_max_workers: int = 8
+    orchestrator_agent_concurrency: int = 1
+    orchestrator_agent_concurrency_overrides: str = ""
+
+    # Agent event bus: Redis Stream written by pg_listener and read by
+    # redis_worker through a consumer group shared by all replicas.
+    # Unacked events idle for claim_idle_ms are retried, and dead-lettered
+    # after max_deliveries attempts.
+    event_stream: str = "agent_events:stream"
+    event_stream_group: str = "agent-workers"
+    event_stream_maxlen: int = 100_000
+    event_batch_size: int = 64
+    event_block_ms: int = 5000
+    # Entries in flight at once, including those waiting in a coalescing window
+    event_concurrency: int = 1000
+    event_claim_idle_ms: int = 60_000
+    event_max_deliveries: int = 5
+    # Replicas all receive each pg_notify; only the first appends it
+    event_publish_dedupe_seconds: float = 5.0
+    # task_stuck / approval_overdue events for the same type within this
+    # window are deduplicated by entity and handled by one agent run
+    event_coalesce_window_seconds: float = 0.5
+    event_coalesce_max_batch: int = 500
+    event_coalesce_concurrency: int = 4
+
+    # PDF extraction process pool (0 workers = one per CPU)
+    pdf_workers: int = 0
+    pdf_pages_per_task: int = 25
+    pdf_max_download_bytes: int = 50 * 1024 * 1024
+    pdf_batch_concurrency: int = 8
+
     # ── Vector DB ─────────────────────────────────────────────────────
     pinecone_api_key: str = ""
     pinecone_index_name: str = "zoark-documents"
     pinecone_environment: str = "us-east-1"
+    # SDK calls run on this many threads (= Pinecone requests in flight);
+    # each failed page is retried with exponential backoff
+    pinecone_concurrency: int = 4
+    pinecone_max_retries: int = 3
+    pinecone_retry_backoff_seconds: float = 0.5
+
+    # Local vector index (used when Pinecone is not configured).
+    # IVF lists: 0 picks ~sqrt(N) at training time.  nprobe: lists scanned per
+    # approximate query — raise for recall, lower for latency.
+    vector_index_nlist: int = 0
+    vector_index_nprobe: int = 8
+    # Metadata keys with an inverted index for filtered queries (comma-separated)
+    vector_index_metadata_keys: str = "type,invoice_id,project,project_id,doc_id"
+    # Row storage: "float32", "int8" (4x smaller) or "pq" (product quantization,
+    # pq_subspaces bytes per row; 0 = dim/16).  rerank > 0 re-scores the best
+    # top_k * rerank compressed hits against full vectors, which are then kept.
+    vector_index_storage: str = "float32"
+    vector_index_pq_subspaces: int = 0
+    vector_index_rerank: int = 0
+    # Train IVF lists / quantizers on a worker thread; searches stay exact
+    # until training finishes instead of blocking the event loop
+    vector_index_background_training: bool = True
+    # Directory for the persistent on-disk index; empty keeps it in memory only.
+    # Point every worker on a host at the same directory to share one copy.
+    vector_index_path: str = ""
+    vector_index_checkpoint_ops: int = 10000
 
     # ── App ───────────────────────────────────────────────────────────
     app_name: str = "ZOARK OS API"
@@ -0,0 +1,29 @@
+-- Full-text search support for ZOARK OS RAG documents
+--
+-- "RAGDocument"."searchVector" and its GIN index are declared in the Prisma
+-- schema; this keeps the column in sync with "name" (weight A) and
+-- "content" (weight B).  Safe to re-run.
+
+CREATE OR REPLACE FUNCTION rag_document_search_vector()
+RETURNS trigger AS $$
+BEGIN
+  NEW."searchVector" :=
+    setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(NEW.content, '')), 'B');
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger on RAGDocument inserts and name/content edits
+DROP TRIGGER IF EXISTS rag_document_search_vector_trigger ON "RAGDocument";
+CREATE TRIGGER rag_document_search_vector_trigger
+BEFORE INSERT OR UPDATE OF name, content ON "RAGDocument"
+FOR EACH ROW
+EXECUTE FUNCTION rag_document_search_vector();
+
+-- Backfill rows created before the trigger existed
+UPDATE "RAGDocument"
+SET "searchVector" =
+  setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+  setweight(to_tsvector('english', coalesce(content, '')), 'B')
+WHERE "searchVector" IS NULL;
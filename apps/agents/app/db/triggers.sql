@@ -79,3 +79,114 @@ CREATE TRIGGER invoice_created_trigger
 AFTER INSERT ON "Invoice"
 FOR EACH ROW
 EXECUTE FUNCTION notify_invoice_created();
+
+
+-- Row-change events for the orchestrator's trigger engine
+-- (app/workers/trigger_engine.py).  Each event carries the row's new trigger
+-- deadline ("due", NULL when the row no longer needs its agent), so the
+-- engine can move the row's timer without querying.
+
+-- Task: due 48 hours after the last update while ACTIVE and not CRITICAL
+CREATE OR REPLACE FUNCTION notify_task_changed()
+RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    PERFORM pg_notify('agent_events', json_build_object(
+      'type', 'row_changed', 'table', TG_TABLE_NAME, 'op', TG_OP, 'id', OLD.id, 'due', NULL
+    )::text);
+  ELSE
+    PERFORM pg_notify('agent_events', json_build_object(
+      'type', 'row_changed', 'table', TG_TABLE_NAME, 'op', TG_OP, 'id', NEW.id,
+      'due', CASE WHEN NEW.status = 'ACTIVE' AND NEW."healthStatus" != 'CRITICAL'
+                  THEN NEW."lastUpdated" + INTERVAL '48 hours' END
+    )::text);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS task_row_changed_trigger ON "Task";
+CREATE TRIGGER task_row_changed_trigger
+AFTER INSERT OR DELETE OR UPDATE OF "status", "lastUpdated", "healthStatus" ON "Task"
+FOR EACH ROW
+EXECUTE FUNCTION notify_task_changed();
+
+-- ApprovalStep: due at the deadline, or 24 hours after the last nudge
+CREATE OR REPLACE FUNCTION notify_approval_changed()
+RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    PERFORM pg_notify('agent_events', json_build_object(
+      'type', 'row_changed', 'table', TG_TABLE_NAME, 'op', TG_OP, 'id', OLD.id, 'due', NULL
+    )::text);
+  ELSE
+    PERFORM pg_notify('agent_events', json_build_object(
+      'type', 'row_changed', 'table', TG_TABLE_NAME, 'op', TG_OP, 'id', NEW.id,
+      'due', CASE WHEN NEW.status = 'PENDING'
+                  THEN GREATEST(NEW.deadline, NEW."lastNudgedAt" + INTERVAL '24 hours') END
+    )::text);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS approval_row_changed_trigger ON "ApprovalStep";
+CREATE TRIGGER approval_row_changed_trigger
+AFTER INSERT OR DELETE OR UPDATE OF "status", "deadline", "lastNudgedAt" ON "ApprovalStep"
+FOR EACH ROW
+EXECUTE FUNCTION notify_approval_changed();
+
+-- BroadcastEmail: due at "scheduledFor" while SCHEDULED
+CREATE OR REPLACE FUNCTION notify_broadcast_changed()
+RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    PERFORM pg_notify('agent_events', json_build_object(
+      'type', 'row_changed', 'table', TG_TABLE_NAME, 'op', TG_OP, 'id', OLD.id, 'due', NULL
+    )::text);
+  ELSE
+    PERFORM pg_notify('agent_events', json_build_object(
+      'type', 'row_changed', 'table', TG_TABLE_NAME, 'op', TG_OP, 'id', NEW.id,
+      'due', CASE WHEN NEW.status = 'SCHEDULED' THEN NEW."scheduledFor" END
+    )::text);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS broadcast_row_changed_trigger ON "BroadcastEmail";
+CREATE TRIGGER broadcast_row_changed_trigger
+AFTER INSERT OR DELETE OR UPDATE OF "status", "scheduledFor" ON "BroadcastEmail"
+FOR EACH ROW
+EXECUTE FUNCTION notify_broadcast_changed();
+
+-- AgentSchedule: the whole schedule, for the orchestrator's cron engine
+-- (app/workers/cron.py)
+CREATE OR REPLACE FUNCTION notify_schedule_changed()
+RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    PERFORM pg_notify('agent_events', json_build_object(
+      'type', 'row_changed', 'table', TG_TABLE_NAME, 'op', TG_OP, 'id', OLD.id
+    )::text);
+  ELSE
+    PERFORM pg_notify('agent_events', json_build_object(
+      'type', 'row_changed', 'table', TG_TABLE_NAME, 'op', TG_OP, 'id', NEW.id,
+      'agentType', NEW."agentType",
+      'cronExpression', NEW."cronExpression",
+      'isActive', NEW."isActive",
+      'nextRun', NEW."nextRun"
+    )::text);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS schedule_row_changed_trigger ON "AgentSchedule";
+CREATE TRIGGER schedule_row_changed_trigger
+AFTER INSERT OR DELETE OR UPDATE OF "agentType", "cronExpression", "isActive", "nextRun" ON "AgentSchedule"
+FOR EACH ROW
+EXECUTE FUNCTION notify_schedule_changed();
+
+-- Superseded by the per-table functions above
+DROP FUNCTION IF EXISTS notify_row_changed();
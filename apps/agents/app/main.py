@@ -70,19 +70,35 @@ async def lifespan(app: FastAPI):
     from app.workers.pg_listener import start_pg_listener
     from app.workers.redis_worker import start_worker
     from app.workers.agent_orchestrator import start_orchestrator, stop_orchestrator
+    from app.agents.document_indexer import start_document_indexer
+    from app.services.email_queue import start_email_sender
 
     start_scheduler()
     pg_task = asyncio.create_task(start_pg_listener())
     worker_task = asyncio.create_task(start_worker())
+    email_task = asyncio.create_task(start_email_sender())
+    background = [pg_task, worker_task, email_task]
+    if settings.document_indexer_enabled:
+        background.append(asyncio.create_task(start_document_indexer()))
     await start_orchestrator()
 
     yield  # ← app serves requests here
 
     # Graceful shutdown
-    pg_task.cancel()
-    worker_task.cancel()
+    for task in background:
+        task.cancel()
     await stop_orchestrator()
-    await asyncio.gather(pg_task, worker_task, return_exceptions=True)
+    await asyncio.gather(*background, return_exceptions=True)
+    from app.services.http_client import close_http_client
+    from app.services.email_service import reset_email_service
+    from app.services.email_queue import close_email_queue
+    from app.services.pdf_extraction import shutdown_pdf_pool
+    from app.rag.pinecone_client import shutdown_pinecone_executor
+    await close_email_queue()
+    await reset_email_service()
+    await close_http_client()
+    shutdown_pdf_pool()
+    shutdown_pinecone_executor()
     from app.db import close_pool
     await close_pool()
 
@@ -0,0 +1,73 @@
+"""
+Token-aware Text Chunking
+
+Splits documents into overlapping windows that fit the embedding model's
+token budget.  Uses ``tiktoken`` when it is installed; otherwise token counts
+are estimated at ~4 characters per token, which is close for English text
+with OpenAI tokenizers.
+"""
+
+from typing import List
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken missing or its data not downloadable (air-gapped)
+    _encoding = None
+
+_CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(1, -(-len(text) // _CHARS_PER_TOKEN)) if text else 0
+
+
+def chunk_text(text: str, max_tokens: int = 512, overlap: int = 64) -> List[str]:
+    """
+    Split ``text`` into chunks of at most ``max_tokens`` tokens.
+
+    Consecutive chunks share ``overlap`` tokens so a sentence cut at a
+    boundary still appears whole in one of them.
+
+    Returns:
+        List of chunk strings (empty for blank text)
+    """
+    if not text or not text.strip():
+        return []
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+
+    if _encoding is not None:
+        tokens = _encoding.encode(text)
+        step = max_tokens - overlap
+        return [
+            _encoding.decode(tokens[start:start + max_tokens])
+            for start in range(0, max(1, len(tokens) - overlap), step)
+        ]
+
+    # Estimated tokens: chunk on whitespace so words are never split
+    words = text.split()
+    costs = [count_tokens(w) + 1 for w in words]
+    chunks = []
+    start = 0
+    while start < len(words):
+        end, budget = start, 0
+        while end < len(words) and (budget + costs[end] <= max_tokens or end == start):
+            budget += costs[end]
+            end += 1
+        chunks.append(" ".join(words[start:end]))
+        if end >= len(words):
+            break
+
+        # Step back far enough to carry ~overlap tokens into the next chunk
+        next_start, carried = end, 0
+        while next_start > start + 1 and carried + costs[next_start - 1] <= overlap:
+            next_start -= 1
+            carried += costs[next_start]
+        start = next_start
+    return chunks
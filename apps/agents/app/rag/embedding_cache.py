@@ -0,0 +1,167 @@
+"""
+Embedding Cache
+
+Two-tier cache in front of the embeddings provider, keyed by
+(model, sha256(normalized text)):
+
+  1. In-process LRU, bounded by entry count.
+  2. Redis, shared by every worker and replica, bounded by TTL (and by the
+     server's maxmemory policy).
+
+Vectors are stored as float16 — half the bytes of float32 and a tiny fraction
+of a Python list of floats — which is well inside the noise of cosine ranking.
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import hashlib
+import logging
+import time
+import unicodedata
+
+import numpy as np
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "emb:"
+# After a Redis error, skip the shared tier for this long instead of stalling every lookup
+_REDIS_BACKOFF_SECONDS = 30.0
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for cache keys: NFC, collapsed whitespace, stripped."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, text: str) -> str:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{_KEY_PREFIX}{model}:{digest}"
+
+
+def encode_vector(vector: List[float]) -> bytes:
+    return np.asarray(vector, dtype=np.float16).tobytes()
+
+
+def decode_vector(data: bytes) -> List[float]:
+    return np.frombuffer(data, dtype=np.float16).astype(np.float32).tolist()
+
+
+class EmbeddingCache:
+    """
+    LRU + Redis embedding cache with hit/miss counters.
+
+    Args:
+        max_entries: In-process LRU capacity (0 disables the local tier)
+        ttl_seconds: Expiry for entries in Redis
+        use_redis: Whether to consult the shared Redis tier
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 7 * 24 * 3600, use_redis: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.use_redis = use_redis
+        self._lru: "OrderedDict[str, bytes]" = OrderedDict()
+        self._redis = None
+        self._redis_down_until = 0.0
+        self.hits_local = 0
+        self.hits_redis = 0
+        self.misses = 0
+
+    # ── public ────────────────────────────────────────────────────────
+    async def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached vectors in ``texts`` order; ``None`` marks a miss."""
+        keys = [cache_key(model, t) for t in texts]
+        found: Dict[str, bytes] = {}
+
+        for key in keys:
+            data = self._lru.get(key)
+            if data is not None:
+                self._lru.move_to_end(key)
+                found[key] = data
+        self.hits_local += sum(1 for k in keys if k in found)
+
+        remote_keys = list(dict.fromkeys(k for k in keys if k not in found))
+        if remote_keys:
+            remote = await self._redis_get(remote_keys)
+            for key, data in remote.items():
+                found[key] = data
+                self._remember(key, data)
+            self.hits_redis += sum(1 for k in keys if k in remote)
+
+        self.misses += sum(1 for k in keys if k not in found)
+        return [decode_vector(found[k]) if k in found else None for k in keys]
+
+    async def get(self, model: str, text: str) -> Optional[List[float]]:
+        return (await self.get_many(model, [text]))[0]
+
+    async def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        entries = {cache_key(model, t): encode_vector(v) for t, v in zip(texts, vectors)}
+        for key, data in entries.items():
+            self._remember(key, data)
+        await self._redis_set(entries)
+
+    async def put(self, model: str, text: str, vector: List[float]) -> None:
+        await self.put_many(model, [text], [vector])
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits_local + self.hits_redis + self.misses
+        return {
+            "entries": len(self._lru),
+            "max_entries": self.max_entries,
+            "hits_local": self.hits_local,
+            "hits_redis": self.hits_redis,
+            "misses": self.misses,
+            "hit_ratio": (self.hits_local + self.hits_redis) / lookups if lookups else 0.0,
+        }
+
+    def clear(self) -> None:
+        self._lru.clear()
+
+    # ── local tier ────────────────────────────────────────────────────
+    def _remember(self, key: str, data: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        self._lru[key] = data
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    # ── shared tier ───────────────────────────────────────────────────
+    def _redis_client(self):
+        if not self.use_redis or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(settings.redis_url)
+        return self._redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        logger.warning(f"Embedding cache Redis tier unavailable ({error}); retrying in {_REDIS_BACKOFF_SECONDS:.0f}s")
+        self._redis_down_until = time.monotonic() + _REDIS_BACKOFF_SECONDS
+        self._redis = None
+
+    async def _redis_get(self, keys: List[str]) -> Dict[str, bytes]:
+        client = self._redis_client()
+        if client is None:
+            return {}
+        try:
+            values = await client.mget(keys)
+        except Exception as e:
+            self._redis_failed(e)
+            return {}
+        return {k: v for k, v in zip(keys, values) if v is not None}
+
+    async def _redis_set(self, entries: Dict[str, bytes]) -> None:
+        client = self._redis_client()
+        if client is None or not entries:
+            return
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                for key, data in entries.items():
+                    pipe.set(key, data, ex=self.ttl_seconds)
+                await pipe.execute()
+        except Exception as e:
+            self._redis_failed(e)
@@ -3,17 +3,27 @@ Embeddings Service
 
 Generates vector embeddings using OpenAI's embedding models.
 Falls back to random mock vectors when OPENAI_API_KEY is not set.
+
+Real embeddings are cached by content hash (see ``app.rag.embedding_cache``),
+so repeated queries and re-sent documents skip the API round-trip.  Cache
+misses from concurrent ``generate_embedding`` calls are coalesced by
+``EmbeddingBatcher`` into a single ``input=[...]`` request.
 """
 
-from typing import List
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
 import logging
 import random
 
 from app.config import get_settings
+from app.rag.embedding_cache import EmbeddingCache
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# OpenAI accepts at most this many inputs per embeddings request
+_MAX_INPUTS_PER_REQUEST = 2048
+
 _openai_client = None
 
 
@@ -25,19 +35,116 @@ def _get_openai_client():
     return _openai_client
 
 
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-text embedding requests into batched calls.
+
+    A batch is flushed when ``max_batch`` texts are pending or ``window_ms``
+    after the first text arrived, whichever comes first.  Duplicate texts in
+    a batch are embedded once.
+
+    Args:
+        embed: Coroutine embedding a list of texts, in order
+        window_ms: How long to wait for more requests before flushing
+        max_batch: Flush immediately at this many pending texts
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], Awaitable[List[List[float]]]],
+        window_ms: float = 5.0,
+        max_batch: int = 256,
+    ):
+        self._embed = embed
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: set = set()
+        self.batches = 0
+        self.requests = 0
+        self.texts_sent = 0
+
+    async def submit(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "texts_sent": self.texts_sent,
+            "avg_batch_size": self.texts_sent / self.batches if self.batches else 0.0,
+            "fill_ratio": self.texts_sent / (self.batches * self.max_batch) if self.batches else 0.0,
+            "window_ms": self.window * 1000.0,
+            "max_batch": self.max_batch,
+        }
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self.batches += 1
+        self.texts_sent += len(texts)
+        try:
+            vectors = dict(zip(texts, await self._embed(texts)))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for text, future in batch:
+            if not future.done():
+                future.set_result(vectors[text])
+
+
 class EmbeddingsService:
     def __init__(self):
         self.model = "text-embedding-3-small"
+        self.cache = EmbeddingCache(
+            max_entries=settings.embedding_cache_size,
+            ttl_seconds=settings.embedding_cache_ttl_seconds,
+            use_redis=settings.embedding_cache_redis,
+        )
+        self.batcher = EmbeddingBatcher(
+            self._embed_uncached,
+            window_ms=settings.embedding_batch_window_ms,
+            max_batch=settings.embedding_batch_max_size,
+        )
         if _get_openai_client():
             logger.info("Embeddings service initialized (OpenAI)")
         else:
             logger.info("Embeddings service initialized (mock — set OPENAI_API_KEY to enable)")
 
+    @property
+    def is_mock(self) -> bool:
+        """True when vectors are random placeholders (no OpenAI key)."""
+        return _get_openai_client() is None
+
     async def generate_embedding(self, text: str) -> List[float]:
         client = _get_openai_client()
         if client:
-            response = await client.embeddings.create(model=self.model, input=text)
-            return response.data[0].embedding
+            cached = await self.cache.get(self.model, text)
+            if cached is not None:
+                return cached
+            return await self.batcher.submit(text)
 
         logger.warning("Using MOCK embeddings — set OPENAI_API_KEY for real vectors")
         return [random.random() for _ in range(1536)]
@@ -45,12 +152,26 @@ class EmbeddingsService:
     async def generate_batch_embeddings(self, texts: List[str]) -> List[List[float]]:
         client = _get_openai_client()
         if client:
-            response = await client.embeddings.create(model=self.model, input=texts)
-            return [d.embedding for d in response.data]
+            embeddings = await self.cache.get_many(self.model, texts)
+            missing = list(dict.fromkeys(t for t, e in zip(texts, embeddings) if e is None))
+            if missing:
+                fresh = dict(zip(missing, await self._embed_uncached(missing)))
+                embeddings = [e if e is not None else fresh[t] for t, e in zip(texts, embeddings)]
+            return embeddings
 
         logger.warning(f"Using MOCK batch embeddings for {len(texts)} texts — set OPENAI_API_KEY for real vectors")
         return [await self.generate_embedding(t) for t in texts]
 
+    async def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        """Provider round-trip(s) for ``texts``; results are written to the cache."""
+        embeddings: List[List[float]] = []
+        for start in range(0, len(texts), _MAX_INPUTS_PER_REQUEST):
+            page = texts[start:start + _MAX_INPUTS_PER_REQUEST]
+            response = await _get_openai_client().embeddings.create(model=self.model, input=page)
+            embeddings.extend(d.embedding for d in sorted(response.data, key=lambda d: d.index))
+        await self.cache.put_many(self.model, texts, embeddings)
+        return embeddings
+
 
 # Singleton instance
 _embeddings_service = None
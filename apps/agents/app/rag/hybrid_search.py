@@ -0,0 +1,200 @@
+"""
+Hybrid Document Search
+
+Ranks RAG documents by fusing two rankings with reciprocal-rank fusion (RRF):
+
+  1. Lexical: Postgres full-text search on "RAGDocument"."searchVector"
+     (GIN-indexed, kept current by app/db/search.sql), ordered by ts_rank_cd.
+  2. Semantic: RAGRetriever vector search over document chunks.
+
+Each document scores ``sum(1 / (k + rank))`` over the rankings it appears in,
+so the rankers' incomparable score scales never meet.  Both rankers are
+index lookups bounded by a fixed candidate depth, so latency does not grow
+with the table.  Every page of a query is sliced from the same fused
+ranking (cached briefly and cleared on document writes), so pages never
+overlap or skip results; results end at the candidate depth.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from app.config import get_settings
+from app.db import get_conn
+from app.rag.embedding_cache import normalize_text
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_COLUMNS = '"id", "name", "type", "source", "url"'
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked id lists into ``(id, score)`` pairs, best first.
+
+    Ties keep the order of first appearance, so earlier rankings win them.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridSearch:
+    """
+    Full-text + vector document search with a TTL/LRU result cache.
+
+    Args:
+        rrf_k: RRF damping constant; larger flattens the rank contribution
+        candidates: Results taken from each ranker, and the depth of the
+            fused ranking every page is sliced from
+        cache_size: Cached fused rankings (0 disables the cache)
+        cache_ttl_seconds: Lifetime of a cached ranking
+    """
+
+    def __init__(
+        self,
+        rrf_k: int = 60,
+        candidates: int = 50,
+        cache_size: int = 512,
+        cache_ttl_seconds: float = 30.0,
+    ):
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.cache_size = cache_size
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self._cache: "OrderedDict[tuple, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+
+    async def search(
+        self,
+        query: str,
+        limit: int = 10,
+        offset: int = 0,
+        doc_type: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        One page of fused results.
+
+        Returns:
+            Documents (id, name, type, source, url) with their fused ``relevance``
+
+        Raises:
+            ValueError: If the page reaches past the ``candidates`` results that
+                are ranked, where an empty page would look like the end of the matches
+        """
+        if offset + limit > self.candidates:
+            raise ValueError(f"offset + limit must not exceed {self.candidates}")
+        key = (normalize_text(query).lower(), doc_type)
+
+        ranked = self._cached(key)
+        if ranked is None:
+            ranked = await self._rank(query, self.candidates, doc_type)
+            self._remember(key, ranked)
+        return ranked[offset:offset + limit]
+
+    def invalidate(self) -> None:
+        """Drop cached rankings (call after documents change)."""
+        self._cache.clear()
+
+    # ── ranking ───────────────────────────────────────────────────────
+    async def _rank(self, query: str, depth: int, doc_type: Optional[str]) -> List[Dict[str, Any]]:
+        lexical, semantic = await asyncio.gather(
+            self._lexical(query, depth, doc_type),
+            self._semantic(query, depth, doc_type),
+        )
+        rows = {r["id"]: r for r in lexical}
+        fused = reciprocal_rank_fusion([list(rows), semantic], k=self.rrf_k)[:depth]
+
+        missing = [doc_id for doc_id, _ in fused if doc_id not in rows]
+        if missing:
+            rows.update({r["id"]: r for r in await self._fetch(missing, doc_type)})
+
+        return [{**rows[doc_id], "relevance": score} for doc_id, score in fused if doc_id in rows]
+
+    async def _lexical(self, query: str, depth: int, doc_type: Optional[str]) -> List[Dict[str, Any]]:
+        sql = f'''SELECT {_COLUMNS}
+                  FROM "RAGDocument", websearch_to_tsquery('english', $1) AS q
+                  WHERE "ragStatus" = 'INDEXED'::"RAGStatus" AND "searchVector" @@ q'''
+        params: list = [query, depth]
+        if doc_type:
+            sql += ' AND "type" = $3'
+            params.append(doc_type)
+        sql += ' ORDER BY ts_rank_cd("searchVector", q) DESC LIMIT $2'
+
+        async with get_conn() as conn:
+            rows = await conn.fetch(sql, *params)
+        return [dict(r) for r in rows]
+
+    async def _semantic(self, query: str, depth: int, doc_type: Optional[str]) -> List[str]:
+        """Document ids ranked by their best-matching chunk."""
+        from app.rag.retriever import get_rag_retriever
+
+        retriever = get_rag_retriever()
+        if retriever.embeddings_service.is_mock:
+            # Random placeholder vectors would only add noise to the fusion
+            return []
+        try:
+            # Several chunks of one document can crowd the top, so over-fetch
+            results = await retriever.semantic_search(
+                query,
+                top_k=depth * 3,
+                filter_dict={"type": doc_type} if doc_type else None,
+            )
+        except Exception as e:
+            logger.warning(f"Vector leg of hybrid search failed, using full-text only: {e}")
+            return []
+
+        ranked = (r["metadata"].get("doc_id") for r in results if not r["metadata"].get("_mock"))
+        return [doc_id for doc_id in dict.fromkeys(ranked) if doc_id][:depth]
+
+    async def _fetch(self, ids: List[str], doc_type: Optional[str]) -> List[Dict[str, Any]]:
+        sql = f'''SELECT {_COLUMNS} FROM "RAGDocument"
+                  WHERE "id" = ANY($1::text[]) AND "ragStatus" = 'INDEXED'::"RAGStatus"'''
+        params: list = [ids]
+        if doc_type:
+            sql += ' AND "type" = $2'
+            params.append(doc_type)
+
+        async with get_conn() as conn:
+            rows = await conn.fetch(sql, *params)
+        return [dict(r) for r in rows]
+
+    # ── cache ─────────────────────────────────────────────────────────
+    def _cached(self, key: tuple) -> Optional[List[Dict[str, Any]]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, ranked = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return ranked
+
+    def _remember(self, key: tuple, ranked: List[Dict[str, Any]]) -> None:
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = (time.monotonic() + self.cache_ttl_seconds, ranked)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+# Singleton instance
+_hybrid_search = None
+
+
+def get_hybrid_search() -> HybridSearch:
+    global _hybrid_search
+    if _hybrid_search is None:
+        _hybrid_search = HybridSearch(
+            rrf_k=settings.search_rrf_k,
+            candidates=settings.search_candidates,
+            cache_size=settings.search_cache_size,
+            cache_ttl_seconds=settings.search_cache_ttl_seconds,
+        )
+    return _hybrid_search
@@ -0,0 +1,205 @@
+"""
+IVF Coarse Quantizer
+
+Approximate-nearest-neighbour partitioning for the local vector index.
+Vectors are clustered with spherical k-means into ``nlist`` inverted lists;
+a query only scores the rows in its ``nprobe`` closest lists, trading a
+little recall for a scan that touches roughly ``nprobe / nlist`` of the data.
+"""
+
+from typing import List, Optional
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# k-means needs a few dozen points per centroid to produce stable clusters
+MIN_POINTS_PER_LIST = 39
+_MAX_TRAINING_POINTS_PER_LIST = 64
+_KMEANS_ITERATIONS = 10
+
+
+def default_nlist(n: int) -> int:
+    """Rule-of-thumb list count: about sqrt(n), bounded by training data."""
+    return max(1, min(int(np.sqrt(n)), n // MIN_POINTS_PER_LIST, 65536))
+
+
+def spherical_kmeans(
+    vectors: np.ndarray,
+    k: int,
+    iterations: int = _KMEANS_ITERATIONS,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Cluster unit-norm rows by cosine similarity.
+
+    Returns:
+        (k, d) float32 matrix of unit-norm centroids
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+
+    for _ in range(iterations):
+        labels = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, vectors)
+        counts = np.bincount(labels, minlength=k)
+
+        # Re-seed empty clusters from random points so no list is wasted
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = vectors[rng.choice(len(vectors), size=len(empty), replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = (sums / norms).astype(np.float32)
+
+    return centroids
+
+
+class IVFQuantizer:
+    """
+    Inverted-file partitioning over row numbers of a ``VectorIndex``.
+
+    The quantizer never owns vectors; it only maps rows to lists.  Lists may
+    hold stale rows after an overwrite or delete; ``candidates()`` filters
+    them out lazily against the current assignments and the caller's
+    liveness mask.
+    """
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: int = 8):
+        self.requested_nlist = nlist
+        self.nprobe = nprobe
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._lists: List[np.ndarray] = []
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._stale = 0         # entries left behind in a list after a move
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def nlist(self) -> int:
+        return 0 if self.centroids is None else len(self.centroids)
+
+    def reset(self) -> None:
+        """Forget the trained centroids; the next approximate search retrains."""
+        self.centroids = None
+        self.trained_size = 0
+        self._lists = []
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._stale = 0
+
+    def train(self, vectors: np.ndarray, seed: int = 0) -> None:
+        """Fit centroids on (a sample of) unit-norm rows and assign them all."""
+        n = len(vectors)
+        sample = vectors
+        max_sample = self.training_sample_size(n)
+        if n > max_sample:
+            rng = np.random.default_rng(seed)
+            sample = vectors[rng.choice(n, size=max_sample, replace=False)]
+
+        self.fit(sample, n, seed=seed)
+        self.rebuild(vectors)
+
+    def training_sample_size(self, n: int) -> int:
+        """Rows worth sampling to train over an index of ``n`` rows."""
+        return (self.requested_nlist or default_nlist(n)) * _MAX_TRAINING_POINTS_PER_LIST
+
+    def fit(self, sample: np.ndarray, n: int, seed: int = 0) -> None:
+        """Fit centroids on ``sample`` (drawn from ``n`` rows) without assigning rows."""
+        nlist = self.requested_nlist or default_nlist(n)
+        self.centroids = spherical_kmeans(sample, nlist, seed=seed)
+        self.trained_size = n
+        logger.info(f"Trained IVF quantizer: {self.nlist} lists over {n} vectors")
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Nearest list for each row."""
+        if not len(vectors):
+            return np.zeros(0, dtype=np.int64)
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def add(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Assign rows (with their unit-norm vectors) to their nearest list."""
+        if not self.is_trained or not len(rows):
+            return
+
+        needed = int(rows.max()) + 1
+        if needed > len(self._assignments):
+            grown = np.full(max(needed, 2 * len(self._assignments)), -1, dtype=np.int32)
+            grown[:len(self._assignments)] = self._assignments
+            self._assignments = grown
+
+        labels = np.argmax(vectors.reshape(len(rows), -1) @ self.centroids.T, axis=1)
+        for row, label in zip(rows.tolist(), labels.tolist()):
+            previous = self._assignments[row]
+            if previous == label:
+                continue
+            if previous >= 0:
+                self._stale += 1
+            self._assignments[row] = label
+            self._append(label, row)
+
+    def rebuild(self, vectors: np.ndarray) -> None:
+        """Re-assign every row after the owning index renumbered its rows."""
+        if self.is_trained:
+            self.rebuild_from_labels(self.assign(vectors))
+
+    def rebuild_from_labels(self, labels: np.ndarray) -> None:
+        """Rebuild the lists from precomputed per-row assignments."""
+        self._lists = [np.zeros(16, dtype=np.int64) for _ in range(self.nlist)]
+        self._counts = np.zeros(self.nlist, dtype=np.int64)
+        self._assignments = labels.astype(np.int32)
+        self._stale = 0
+
+        order = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[order], np.arange(self.nlist + 1))
+        for label in range(self.nlist):
+            members = order[bounds[label]:bounds[label + 1]]
+            self._lists[label] = np.concatenate([members, np.zeros(16, dtype=np.int64)])
+            self._counts[label] = len(members)
+
+    def candidates(self, query: np.ndarray, alive: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """
+        Rows in the ``nprobe`` lists closest to ``query``.
+
+        Args:
+            query: Unit-norm query vector
+            alive: Liveness mask over the owning index's occupied rows
+            nprobe: Lists to scan (defaults to the quantizer's setting)
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_scores = self.centroids @ query
+        if nprobe < self.nlist:
+            probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(self.nlist)
+
+        rows = np.concatenate([self._lists[p][:self._counts[p]] for p in probes.tolist()])
+        if not len(rows):
+            return rows
+
+        # Drop stale entries: rows since moved to another list or deleted
+        rows = rows[rows < len(alive)]
+        probed = np.zeros(self.nlist, dtype=bool)
+        probed[probes] = True
+        rows = rows[probed[self._assignments[rows]] & alive[rows]]
+        if self._stale:
+            rows = np.unique(rows)
+        return rows
+
+    def _append(self, label: int, row: int) -> None:
+        entries = self._lists[label]
+        count = self._counts[label]
+        if count == len(entries):
+            grown = np.zeros(2 * len(entries), dtype=np.int64)
+            grown[:count] = entries
+            self._lists[label] = entries = grown
+        entries[count] = row
+        self._counts[label] = count + 1
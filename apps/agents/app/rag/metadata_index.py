@@ -0,0 +1,101 @@
+"""
+Metadata Inverted Index
+
+Secondary index for ``VectorIndex`` filters: for each indexed metadata key,
+maps every value to the set of rows holding it.  A filter such as
+``{"type": "invoice"}`` then resolves to a sorted row array without touching
+the other rows' metadata, and conditions on several indexed keys intersect
+their postings (smallest first).
+
+Only scalar values (str, int, float, bool) are indexed; conditions on other
+keys or values are returned as a residual filter for the caller to check.
+"""
+
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEYS = ("type", "invoice_id", "project", "project_id", "doc_id")
+
+_SCALARS = (str, int, float, bool)
+
+
+class MetadataIndex:
+    """
+    Postings ``key -> value -> rows`` for a fixed set of metadata keys.
+
+    Sorted numpy copies of the postings are built on first use and cached
+    until the posting changes.
+    """
+
+    def __init__(self, keys: Iterable[str] = DEFAULT_KEYS):
+        self.keys = tuple(keys)
+        self._postings: Dict[str, Dict[Any, Set[int]]] = {key: {} for key in self.keys}
+        self._arrays: Dict[Tuple[str, Any], np.ndarray] = {}
+
+    def add(self, row: int, metadata: Dict[str, Any]) -> None:
+        for key in self.keys:
+            value = metadata.get(key)
+            if isinstance(value, _SCALARS):
+                self._postings[key].setdefault(value, set()).add(row)
+                self._arrays.pop((key, value), None)
+
+    def remove(self, row: int, metadata: Dict[str, Any]) -> None:
+        for key in self.keys:
+            value = metadata.get(key)
+            rows = self._postings[key].get(value) if isinstance(value, _SCALARS) else None
+            if rows is None:
+                continue
+            rows.discard(row)
+            if not rows:
+                del self._postings[key][value]
+            self._arrays.pop((key, value), None)
+
+    def rebuild(self, metadata: Iterable[Optional[Dict[str, Any]]]) -> None:
+        """Re-index from a row-ordered metadata list (``None`` marks dead rows)."""
+        self.clear()
+        for row, entry in enumerate(metadata):
+            if entry is not None:
+                self.add(row, entry)
+
+    def clear(self) -> None:
+        self._postings = {key: {} for key in self.keys}
+        self._arrays = {}
+
+    def lookup(self, filter_dict: Dict[str, Any]) -> Tuple[Optional[np.ndarray], Dict[str, Any]]:
+        """
+        Resolve the indexed part of an exact-match filter.
+
+        Returns:
+            (rows, residual): sorted rows matching every indexed condition, or
+            ``None`` if no condition could use the index; and the conditions
+            still to be checked against each row's metadata
+        """
+        postings = []
+        residual = {}
+        for key, value in filter_dict.items():
+            if key in self._postings and isinstance(value, _SCALARS):
+                postings.append(self._rows(key, value))
+            else:
+                residual[key] = value
+
+        if not postings:
+            return None, residual
+
+        postings.sort(key=len)
+        rows = postings[0]
+        for other in postings[1:]:
+            if not len(rows):
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows, residual
+
+    def _rows(self, key: str, value: Any) -> np.ndarray:
+        cached = self._arrays.get((key, value))
+        if cached is None:
+            cached = np.fromiter(sorted(self._postings[key].get(value, ())), dtype=np.int64)
+            self._arrays[(key, value)] = cached
+        return cached
@@ -2,20 +2,36 @@
 Pinecone Vector Database Client
 
 Handles document indexing and vector search for RAG.
-Falls back to in-memory mock store when PINECONE_API_KEY is not set.
+Falls back to an in-process vector index when PINECONE_API_KEY is not set.
+
+The Pinecone SDK is synchronous, so its calls run on a small thread pool
+(``pinecone_concurrency`` threads, which also bounds requests in flight)
+instead of blocking the event loop.  Bulk writes are split into pages no
+larger than Pinecone accepts per request, and each page is retried with
+exponential backoff on its own.
 """
 
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Any, List, Optional
+import asyncio
 import logging
 
 from app.config import get_settings
+from app.rag.vector_index import VectorIndex
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
 _pinecone_index = None
-# In-memory fallback store: {doc_id: {"embedding": [...], "metadata": {...}}}
-_mock_store: Dict[str, Dict[str, Any]] = {}
+# In-process fallback index, used when Pinecone is not configured
+_local_index = None
+# Threads running the synchronous Pinecone SDK
+_executor: Optional[ThreadPoolExecutor] = None
+
+# Pinecone request limits: 100 vectors per upsert (2 MB), 1000 ids per delete
+_MAX_UPSERT_PAGE = 100
+_MAX_DELETE_PAGE = 1000
 
 
 def _get_index():
@@ -29,37 +45,155 @@ def _get_index():
         except Exception as e:
             logger.warning(
                 f"Pinecone index '{settings.pinecone_index_name}' not found or unreachable "
-                f"({e}). Falling back to in-memory mock store. "
+                f"({e}). Falling back to the local vector index. "
                 f"Create the index on https://app.pinecone.io or set PINECONE_INDEX_NAME correctly."
             )
             _pinecone_index = None
     return _pinecone_index
 
 
+def _get_local_index() -> VectorIndex:
+    global _local_index
+    if _local_index is None:
+        options = {
+            "nlist": settings.vector_index_nlist or None,
+            "nprobe": settings.vector_index_nprobe,
+            "metadata_keys": [k.strip() for k in settings.vector_index_metadata_keys.split(",") if k.strip()],
+            "storage": settings.vector_index_storage,
+            "pq_subspaces": settings.vector_index_pq_subspaces,
+            "rerank": settings.vector_index_rerank,
+            "background_training": settings.vector_index_background_training,
+        }
+        if settings.vector_index_path:
+            from app.rag.vector_store import PersistentVectorIndex
+            _local_index = PersistentVectorIndex(
+                settings.vector_index_path,
+                checkpoint_ops=settings.vector_index_checkpoint_ops,
+                **options,
+            )
+        else:
+            _local_index = VectorIndex(**options)
+    return _local_index
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.pinecone_concurrency),
+            thread_name_prefix="pinecone",
+        )
+    return _executor
+
+
+def shutdown_pinecone_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def _call(fn, *args, **kwargs):
+    """Run a blocking SDK call on the Pinecone thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), partial(fn, *args, **kwargs))
+
+
+async def _write_local(write, items: List[Any]) -> Any:
+    """Apply a batch to the local index, on a worker thread if the index writes to disk."""
+    if _get_local_index().blocking_writes:
+        return await asyncio.to_thread(write, items)
+    return write(items)
+
+
+async def _write_pages(description: str, items: List[Any], page_size: int, write) -> List[Any]:
+    """
+    Send ``items`` in pages through ``write(page)``, all pages concurrently.
+
+    Each page is retried ``pinecone_max_retries`` times with exponential
+    backoff.  Returns the items of pages that still failed.
+    """
+    async def send(page: List[Any]) -> List[Any]:
+        for attempt in range(settings.pinecone_max_retries + 1):
+            try:
+                await _call(write, page)
+                return []
+            except Exception as e:
+                if attempt == settings.pinecone_max_retries:
+                    logger.error(f"Pinecone {description} of {len(page)} items failed after {attempt + 1} attempts: {e}")
+                    return page
+                delay = settings.pinecone_retry_backoff_seconds * (2 ** attempt)
+                logger.warning(f"Pinecone {description} of {len(page)} items failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        return page
+
+    pages = [items[start:start + page_size] for start in range(0, len(items), page_size)]
+    results = await asyncio.gather(*(send(page) for page in pages))
+    return [item for failed in results for item in failed]
+
+
 class PineconeClient:
     def __init__(self):
         if _get_index():
             logger.info("Pinecone client initialized (live)")
         else:
-            logger.info("Pinecone client initialized (mock — set PINECONE_API_KEY to enable)")
+            logger.info("Pinecone client initialized (local index — set PINECONE_API_KEY to enable)")
 
     async def upsert_document(self, doc_id: str, embedding: List[float], metadata: Dict[str, Any]) -> None:
+        failed = await self.upsert_many([{"id": doc_id, "values": embedding, "metadata": metadata}])
+        if failed:
+            raise RuntimeError(f"Failed to upsert {doc_id}")
+
+    async def upsert_many(self, vectors: List[Dict[str, Any]], page_size: Optional[int] = None) -> List[str]:
+        """
+        Upsert vectors in pages.
+
+        Args:
+            vectors: List of {"id": str, "values": [...], "metadata": {...}}
+            page_size: Vectors per request (default ``rag_upsert_page_size``,
+                capped at Pinecone's limit of 100)
+
+        Returns:
+            Ids of vectors whose page still failed after retries
+        """
+        if not vectors:
+            return []
         index = _get_index()
         if index:
-            index.upsert(vectors=[{"id": doc_id, "values": embedding, "metadata": metadata}])
-            logger.info(f"Upserted {doc_id} to Pinecone")
-        else:
-            _mock_store[doc_id] = {"embedding": embedding, "metadata": metadata}
-            logger.debug(f"Upserted {doc_id} to mock store ({len(_mock_store)} docs)")
+            page_size = min(page_size or settings.rag_upsert_page_size, _MAX_UPSERT_PAGE)
+            failed = await _write_pages("upsert", vectors, page_size, lambda page: index.upsert(vectors=page))
+            logger.info(f"Upserted {len(vectors) - len(failed)} vectors to Pinecone ({len(failed)} failed)")
+            return [v["id"] for v in failed]
+
+        local_index = _get_local_index()
+        await _write_local(local_index.upsert_many, [(v["id"], v["values"], v["metadata"]) for v in vectors])
+        logger.debug(f"Upserted {len(vectors)} vectors to local index ({len(local_index)} docs)")
+        return []
 
-    async def query(self, query_embedding: List[float], top_k: int = 5, filter_dict: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    async def query(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        filter_dict: Dict[str, Any] = None,
+        approximate: bool = False,
+        nprobe: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Nearest-neighbour search.
+
+        ``approximate``/``nprobe`` select IVF search on the local index;
+        Pinecone is always approximate and ignores them.
+        """
         index = _get_index()
         if index:
-            results = index.query(vector=query_embedding, top_k=top_k, filter=filter_dict, include_metadata=True)
+            results = await _call(
+                index.query, vector=query_embedding, top_k=top_k, filter=filter_dict, include_metadata=True
+            )
             return [{"id": m.id, "score": m.score, "metadata": m.metadata} for m in results.matches]
 
-        # Cosine-similarity fallback against mock store
-        if not _mock_store:
+        # Cosine-similarity fallback against the local index
+        local_index = _get_local_index()
+        if not len(local_index):
             logger.warning(
                 "RAG search returned MOCK data — no documents indexed and PINECONE_API_KEY is not set. "
                 "Results below are placeholders, not real data."
@@ -69,32 +203,54 @@ class PineconeClient:
                 {"id": "doc-2", "score": 0.87, "metadata": {"text": "Contract agreement for project...", "type": "contract", "date": "2024-01-10", "_mock": True}},
             ]
 
-        scored = []
-        for doc_id, doc in _mock_store.items():
-            if filter_dict:
-                if not all(doc["metadata"].get(k) == v for k, v in filter_dict.items()):
-                    continue
-            score = _cosine_sim(query_embedding, doc["embedding"])
-            scored.append({"id": doc_id, "score": score, "metadata": doc["metadata"]})
+        matches = local_index.search(
+            query_embedding,
+            top_k=top_k,
+            filter_dict=filter_dict,
+            approximate=approximate,
+            nprobe=nprobe,
+        )
+        return [{"id": doc_id, "score": score, "metadata": metadata} for doc_id, score, metadata in matches]
 
-        scored.sort(key=lambda x: x["score"], reverse=True)
-        return scored[:top_k]
+    async def list_chunk_ids(self, doc_id: str) -> List[str]:
+        """Ids of the chunk vectors stored for a document (``{doc_id}#{n}``)."""
+        prefix = f"{doc_id}#"
+        index = _get_index()
+        if index:
+            pages = await _call(lambda: list(index.list(prefix=prefix)))
+            # The prefix also matches ids of documents named "{doc_id}#..."
+            return [
+                vector_id for page in pages for vector_id in page
+                if vector_id[len(prefix):].isdigit()
+            ]
+
+        return [
+            vector_id for vector_id in _get_local_index().ids({"doc_id": doc_id})
+            if vector_id.startswith(prefix)
+        ]
 
     async def delete_document(self, doc_id: str) -> None:
+        failed = await self.delete_many([doc_id])
+        if failed:
+            raise RuntimeError(f"Failed to delete {doc_id}")
+
+    async def delete_many(self, ids: List[str]) -> List[str]:
+        """
+        Delete vectors by id in pages of up to 1000.
+
+        Returns:
+            Ids whose page still failed after retries
+        """
+        if not ids:
+            return []
         index = _get_index()
         if index:
-            index.delete(ids=[doc_id])
-        else:
-            _mock_store.pop(doc_id, None)
-
+            failed = await _write_pages("delete", list(ids), _MAX_DELETE_PAGE, lambda page: index.delete(ids=page))
+            logger.info(f"Deleted {len(ids) - len(failed)} vectors from Pinecone ({len(failed)} failed)")
+            return failed
 
-def _cosine_sim(a: List[float], b: List[float]) -> float:
-    dot = sum(x * y for x, y in zip(a, b))
-    mag_a = sum(x * x for x in a) ** 0.5
-    mag_b = sum(x * x for x in b) ** 0.5
-    if mag_a == 0 or mag_b == 0:
-        return 0.0
-    return dot / (mag_a * mag_b)
+        await _write_local(_get_local_index().delete_many, list(ids))
+        return []
 
 
 # Singleton instance
@@ -0,0 +1,193 @@
+"""
+Semantic Query Cache
+
+Caches ``RAGRetriever.semantic_search`` results keyed by
+(normalized query, top_k, filter, search mode), evicting by TTL and LRU.
+
+Invalidation uses an index generation counter rather than clearing on a
+timer: every index write bumps the generation, and an entry is only served
+if it was computed in the current generation.  A search that was already in
+flight when a write landed stores its result under the old generation, so it
+is never served.
+
+With ``use_redis`` the generation is shared: writers ``INCR`` a Redis
+counter, and every search first reads it (``refresh``), so a write made by
+another worker or replica invalidates this process's entries before the next
+lookup.  While Redis is unreachable nothing is served from the cache, since
+other processes' writes could not be seen.
+
+Optionally, a query with no exact entry can reuse the results of a cached
+query whose embedding is within ``similarity_threshold`` cosine of its own
+(same top_k, filter and mode).  This still costs the query embedding, but
+skips the vector search.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import time
+
+import numpy as np
+
+from app.config import get_settings
+from app.rag.embedding_cache import normalize_text
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_GENERATION_KEY = "rag:index_generation"
+# After a Redis error, skip the shared generation for this long instead of stalling every search
+_REDIS_BACKOFF_SECONDS = 30.0
+
+
+def query_key(query: str, top_k: int, filter_dict: Optional[Dict[str, Any]], approximate: bool, nprobe: Optional[int]) -> tuple:
+    """Cache key; the filter is canonicalized so key order does not matter."""
+    filter_key = json.dumps(filter_dict, sort_keys=True, default=str) if filter_dict else ""
+    return (normalize_text(query).lower(), top_k, filter_key, approximate, nprobe)
+
+
+class QueryCache:
+    """
+    TTL + LRU result cache with generation-based invalidation.
+
+    Args:
+        max_entries: Cached queries (0 disables the cache)
+        ttl_seconds: Lifetime of an entry
+        similarity_threshold: Cosine similarity at which another query's
+            results are reused (0 disables the near-duplicate lookup)
+        use_redis: Share the index generation with other workers and replicas
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 300.0,
+        similarity_threshold: float = 0.0,
+        use_redis: bool = False,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.use_redis = use_redis
+        self.generation = 0
+        self._shared_generation: Optional[int] = None
+        self._redis = None
+        self._redis_down_until = 0.0
+        # key -> (generation, expires_at, unit embedding or None, results)
+        self._entries: "OrderedDict[tuple, Tuple[int, float, Optional[np.ndarray], List[Dict[str, Any]]]]" = OrderedDict()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def bump(self) -> None:
+        """Invalidate every cached result in this process."""
+        self.generation += 1
+        self._entries.clear()
+
+    async def invalidate(self) -> None:
+        """Invalidate every cached result here and in other processes (call after any index write)."""
+        self.bump()
+        client = self._redis_client()
+        if client is None:
+            return
+        try:
+            self._shared_generation = int(await client.incr(_GENERATION_KEY))
+        except Exception as e:
+            self._redis_failed(e)
+
+    async def refresh(self) -> None:
+        """Catch up with index writes made by other processes (call before a lookup)."""
+        if not self.use_redis:
+            return
+        client = self._redis_client()
+        if client is None:
+            self.bump()
+            return
+        try:
+            shared = int(await client.get(_GENERATION_KEY) or 0)
+        except Exception as e:
+            self._redis_failed(e)
+            self.bump()
+            return
+        if shared != self._shared_generation:
+            self._shared_generation = shared
+            self.bump()
+
+    def get(self, key: tuple) -> Optional[List[Dict[str, Any]]]:
+        entry = self._entries.get(key)
+        if entry is None or not self._fresh(entry):
+            if entry is not None:
+                del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[3]
+
+    def get_similar(self, key: tuple, embedding: List[float]) -> Optional[List[Dict[str, Any]]]:
+        """Results of the closest fresh entry with the same top_k/filter/mode."""
+        if self.similarity_threshold <= 0:
+            return None
+        query = self._unit(embedding)
+        best_key, best_score = None, self.similarity_threshold
+        for other, entry in self._entries.items():
+            if other[1:] != key[1:] or entry[2] is None or not self._fresh(entry):
+                continue
+            score = float(entry[2] @ query)
+            if score >= best_score:
+                best_key, best_score = other, score
+        if best_key is None:
+            return None
+        self._entries.move_to_end(best_key)
+        self.near_hits += 1
+        return self._entries[best_key][3]
+
+    def put(self, key: tuple, generation: int, results: List[Dict[str, Any]], embedding: Optional[List[float]] = None) -> None:
+        """
+        Store results computed while the index was at ``generation``.
+
+        Results from an older generation are dropped: the index changed while
+        they were being computed.
+        """
+        if not self.enabled or generation != self.generation:
+            return
+        unit = self._unit(embedding) if embedding is not None and self.similarity_threshold > 0 else None
+        self._entries[key] = (generation, time.monotonic() + self.ttl_seconds, unit, results)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "generation": self.generation,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+        }
+
+    def _redis_client(self):
+        if not self.use_redis or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(settings.redis_url)
+        return self._redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        logger.warning(f"Query cache generation unavailable ({error}); retrying in {_REDIS_BACKOFF_SECONDS:.0f}s")
+        self._redis_down_until = time.monotonic() + _REDIS_BACKOFF_SECONDS
+        self._redis = None
+
+    def _fresh(self, entry) -> bool:
+        return entry[0] == self.generation and entry[1] >= time.monotonic()
+
+    @staticmethod
+    def _unit(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -4,10 +4,17 @@ RAG Retriever
 Semantic search over documents using embeddings + Pinecone.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterable, Callable
+import asyncio
 import logging
+import time
+from app.config import get_settings
+from app.rag.chunking import chunk_text
 from app.rag.embeddings import get_embeddings_service
 from app.rag.pinecone_client import get_pinecone_client
+from app.rag.query_cache import QueryCache, query_key
+
+settings = get_settings()
 
 logger = logging.getLogger(__name__)
 
@@ -16,18 +23,27 @@ class RAGRetriever:
     """
     Retrieval-Augmented Generation retriever.
 
-    Performs semantic search over indexed documents.
+    Performs semantic search over indexed documents.  Search results are
+    cached until the next index write (see ``QueryCache``).
     """
 
     def __init__(self):
         self.embeddings_service = get_embeddings_service()
         self.pinecone_client = get_pinecone_client()
+        self.query_cache = QueryCache(
+            max_entries=settings.rag_query_cache_size,
+            ttl_seconds=settings.rag_query_cache_ttl_seconds,
+            similarity_threshold=settings.rag_query_cache_similarity,
+            use_redis=settings.rag_query_cache_redis,
+        )
 
     async def semantic_search(
         self,
         query: str,
         top_k: int = 5,
-        filter_dict: Dict[str, Any] = None
+        filter_dict: Dict[str, Any] = None,
+        approximate: bool = False,
+        nprobe: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         Perform semantic search on documents.
@@ -36,20 +52,39 @@ class RAGRetriever:
             query: Search query text
             top_k: Number of results to return
             filter_dict: Metadata filter (e.g., {"type": "invoice"})
+            approximate: Use IVF search instead of an exact scan (local index)
+            nprobe: IVF lists to scan when approximate
 
         Returns:
             List of search results with scores and metadata
         """
+        key = query_key(query, top_k, filter_dict, approximate, nprobe)
+        await self.query_cache.refresh()
+        cached = self.query_cache.get(key)
+        if cached is not None:
+            logger.debug(f"Semantic search cache hit: '{query}'")
+            return list(cached)
+        # Results computed from here on belong to the index as it is now
+        generation = self.query_cache.generation
+
         logger.info(f"Semantic search: '{query}' (top_k={top_k})")
 
         # Generate query embedding
         query_embedding = await self.embeddings_service.generate_embedding(query)
 
+        cached = self.query_cache.get_similar(key, query_embedding)
+        if cached is not None:
+            logger.debug(f"Semantic search served from a near-duplicate query: '{query}'")
+            return list(cached)
+        self.query_cache.misses += 1
+
         # Search Pinecone
         results = await self.pinecone_client.query(
             query_embedding=query_embedding,
             top_k=top_k,
-            filter_dict=filter_dict
+            filter_dict=filter_dict,
+            approximate=approximate,
+            nprobe=nprobe
         )
 
         # Format results
@@ -65,7 +100,8 @@ class RAGRetriever:
         ]
 
         logger.info(f"Found {len(formatted_results)} results")
-        return formatted_results
+        self.query_cache.put(key, generation, formatted_results, query_embedding)
+        return list(formatted_results)
 
     async def index_document(
         self,
@@ -93,29 +129,161 @@ class RAGRetriever:
             embedding=embedding,
             metadata=metadata_with_text
         )
+        await self.query_cache.invalidate()
 
         logger.info(f"Document {doc_id} indexed successfully")
 
+    async def delete_document(self, doc_id: str) -> None:
+        """
+        Remove a document's vectors from the index.
+
+        Deletes the single vector written by ``index_document`` and every
+        chunk written by ``index_batch``.
+
+        Args:
+            doc_id: Document id used when the document was indexed
+        """
+        ids = [doc_id] + await self.pinecone_client.list_chunk_ids(doc_id)
+        failed = await self.pinecone_client.delete_many(ids)
+        await self.query_cache.invalidate()
+        if failed:
+            raise RuntimeError(f"Failed to delete {len(failed)} vectors of {doc_id}")
+        logger.info(f"Document {doc_id} removed from the index ({len(ids) - 1} chunks)")
+
     async def index_batch(
         self,
-        documents: List[Dict[str, Any]]
-    ) -> None:
+        documents: Iterable[Dict[str, Any]],
+        chunk_tokens: Optional[int] = None,
+        chunk_overlap: Optional[int] = None,
+        embed_batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        upsert_page_size: Optional[int] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
         """
-        Index multiple documents.
+        Index multiple documents through a chunk → embed → upsert pipeline.
+
+        Documents are consumed lazily and split into overlapping,
+        token-bounded chunks.  Chunks are embedded in batches with at most
+        ``concurrency`` embedding requests in flight (producers wait when the
+        limit is reached), and each batch's vectors are upserted in pages that
+        are sent and retried independently.  Each chunk is
+        stored as ``{doc_id}#{n}`` with ``doc_id`` and ``chunk`` in its metadata;
+        once a document is indexed, chunks left over from an earlier, longer
+        version of it are deleted.
 
         Args:
-            documents: List of documents with 'id', 'text', and 'metadata'
+            documents: Iterable of documents with 'id', 'text', and 'metadata'
+            chunk_tokens: Maximum tokens per chunk
+            chunk_overlap: Tokens shared by consecutive chunks
+            embed_batch_size: Chunks per embedding request
+            concurrency: Embedding requests in flight
+            upsert_page_size: Vectors per upsert request
+            on_progress: Called with a progress dict after every batch
+
+        Returns:
+            Dict with documents, chunks, failed_chunks, seconds, chunks_per_second
+            and failed_documents (ids with at least one chunk not indexed)
         """
-        logger.info(f"Batch indexing {len(documents)} documents")
+        chunk_tokens = chunk_tokens or settings.rag_chunk_tokens
+        chunk_overlap = settings.rag_chunk_overlap if chunk_overlap is None else chunk_overlap
+        embed_batch_size = embed_batch_size or settings.rag_embed_batch_size
+        concurrency = concurrency or settings.rag_index_concurrency
+        upsert_page_size = upsert_page_size or settings.rag_upsert_page_size
 
-        for doc in documents:
-            await self.index_document(
-                doc_id=doc['id'],
-                text=doc['text'],
-                metadata=doc.get('metadata', {})
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = []
+        progress = {"documents": 0, "chunks": 0, "failed_chunks": 0}
+        failed_documents = set()
+        chunk_counts: Dict[str, int] = {}
+        started = time.perf_counter()
+
+        def snapshot() -> Dict[str, Any]:
+            elapsed = time.perf_counter() - started
+            return {
+                **progress,
+                "seconds": round(elapsed, 3),
+                "chunks_per_second": round(progress["chunks"] / elapsed, 1) if elapsed else 0.0,
+            }
+
+        async def embed_and_upsert(batch: List[Dict[str, Any]]) -> None:
+            try:
+                embeddings = await self.embeddings_service.generate_batch_embeddings(
+                    [chunk["text"] for chunk in batch]
+                )
+                vectors = [
+                    {"id": chunk["id"], "values": embedding, "metadata": chunk["metadata"]}
+                    for chunk, embedding in zip(batch, embeddings)
+                ]
+                failed = set(await self.pinecone_client.upsert_many(vectors, page_size=upsert_page_size))
+                if len(failed) < len(vectors):
+                    await self.query_cache.invalidate()
+                progress["chunks"] += len(batch) - len(failed)
+                progress["failed_chunks"] += len(failed)
+                failed_documents.update(chunk["metadata"]["doc_id"] for chunk in batch if chunk["id"] in failed)
+            except Exception as e:
+                progress["failed_chunks"] += len(batch)
+                failed_documents.update(chunk["metadata"]["doc_id"] for chunk in batch)
+                logger.error(f"Failed to index batch of {len(batch)} chunks: {e}")
+            finally:
+                semaphore.release()
+
+            report = snapshot()
+            logger.info(
+                f"Indexed {report['chunks']} chunks from {report['documents']} documents "
+                f"({report['chunks_per_second']} chunks/s)"
             )
+            if on_progress:
+                on_progress(report)
+
+        async def submit(batch: List[Dict[str, Any]]) -> None:
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(embed_and_upsert(batch)))
 
-        logger.info("Batch indexing complete")
+        batch: List[Dict[str, Any]] = []
+        for doc in documents:
+            metadata = doc.get('metadata', {})
+            chunk_counts[doc['id']] = 0
+            for n, chunk in enumerate(chunk_text(doc['text'], chunk_tokens, chunk_overlap)):
+                chunk_counts[doc['id']] = n + 1
+                batch.append({
+                    "id": f"{doc['id']}#{n}",
+                    "text": chunk,
+                    "metadata": {**metadata, "doc_id": doc['id'], "chunk": n, "text": chunk},
+                })
+                if len(batch) >= embed_batch_size:
+                    await submit(batch)
+                    batch = []
+            progress["documents"] += 1
+        if batch:
+            await submit(batch)
+
+        await asyncio.gather(*tasks)
+        await self._delete_stale_chunks(
+            {doc_id: count for doc_id, count in chunk_counts.items() if doc_id not in failed_documents}
+        )
+
+        result = snapshot()
+        logger.info(f"Batch indexing complete: {result}")
+        result["failed_documents"] = sorted(failed_documents)
+        return result
+
+    async def _delete_stale_chunks(self, chunk_counts: Dict[str, int]) -> None:
+        """Delete chunks numbered past each document's current chunk count."""
+        listed = await asyncio.gather(*(self.pinecone_client.list_chunk_ids(doc_id) for doc_id in chunk_counts))
+        stale = [
+            vector_id
+            for (doc_id, count), ids in zip(chunk_counts.items(), listed)
+            for vector_id in ids
+            if int(vector_id.rpartition("#")[2]) >= count
+        ]
+        if not stale:
+            return
+        failed = await self.pinecone_client.delete_many(stale)
+        await self.query_cache.invalidate()
+        if failed:
+            logger.error(f"Failed to delete {len(failed)} stale chunks: {failed[:10]}")
+        logger.info(f"Deleted {len(stale) - len(failed)} stale chunks")
 
 
 # Singleton instance
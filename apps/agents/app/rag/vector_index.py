@@ -0,0 +1,549 @@
+"""
+Local Vector Index
+
+In-process exact nearest-neighbour search used when Pinecone is not
+configured (air-gapped tenants, local development).
+
+Vectors live in one contiguous float32 matrix with pre-normalised rows, so a
+query is a single matrix-vector product followed by an ``argpartition``
+top-k.  Appends grow the matrix geometrically; deletes mark rows as
+tombstones and the matrix is compacted once tombstones dominate.
+
+Searches can optionally go through an IVF coarse quantizer (see
+``app.rag.ivf``) that only scores the rows in the lists nearest the query.
+
+Rows can be stored compressed (``storage="int8"`` or ``"pq"``, see
+``app.rag.quantization``) and scored with asymmetric distances, optionally
+re-ranking the best candidates against the full float32 vectors.
+
+With ``background_training`` the IVF k-means and the quantizer training run
+on a worker thread instead of inside the search or upsert that needed them.
+Searches stay exact (or on float32 rows) until the trained structure is
+swapped in; rows written meanwhile are assigned / encoded at the swap.
+
+Metadata filters on indexed keys resolve through an inverted index (see
+``app.rag.metadata_index``).  A small planner then scores either just the
+matching rows (pre-filter) or the usual scan / IVF candidates masked down to
+the matches (post-filter), whichever touches fewer rows.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import copy
+import logging
+
+import numpy as np
+
+from app.rag.ivf import IVFQuantizer, MIN_POINTS_PER_LIST
+from app.rag.metadata_index import DEFAULT_KEYS, MetadataIndex
+from app.rag.quantization import make_quantizer
+
+logger = logging.getLogger(__name__)
+
+_INITIAL_CAPACITY = 1024
+# Compact once this fraction of the occupied rows are tombstones
+_COMPACT_RATIO = 0.5
+# Retrain the IVF quantizer once the index has grown this much since training
+_RETRAIN_GROWTH = 4
+# Exact search scores only the filter matches when they are below this
+# fraction of the index; above it one full matrix product is cheaper than
+# gathering the matching rows
+_PREFILTER_SELECTIVITY = 0.25
+# Rows decoded at a time when the IVF quantizer has to read compressed rows
+_DECODE_BLOCK = 16384
+
+# Thread running background IVF / quantizer training for every index
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vector-index-train")
+    return _executor
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = float(np.linalg.norm(vector))
+    if norm == 0.0:
+        return vector
+    return vector / norm
+
+
+class VectorIndex:
+    """
+    Cosine-similarity index over a contiguous float32 matrix.
+
+    Rows are L2-normalised on insert so cosine similarity reduces to a dot
+    product.  Row slots are never reused until ``compact()`` runs, which keeps
+    upserts amortised O(d) and deletes O(1).
+
+    The IVF quantizer is trained lazily on the first approximate search and
+    then kept up to date incrementally, so exact-only callers never pay for it.
+
+    With a compressed ``storage`` mode, rows are held as float32 until enough
+    exist to train the vector quantizer (or ``quantize()`` is called); from
+    then on they are stored as codes.  The float32 matrix is released unless ``rerank`` needs it.
+
+    Args:
+        storage: "float32", "int8" (4x smaller) or "pq" (``dim / pq_subspaces``
+            x smaller)
+        pq_subspaces: Product-quantizer code bytes per row (0 = dim / 16)
+        rerank: Re-score the best ``top_k * rerank`` compressed candidates
+            against the full vectors (0 disables and drops the full vectors)
+        background_training: Train on a worker thread instead of blocking
+            the search / upsert that triggered it
+    """
+
+    # Writes block on disk I/O; such indexes are safe to write from a worker thread
+    blocking_writes = False
+
+    def __init__(
+        self,
+        dim: Optional[int] = None,
+        initial_capacity: int = _INITIAL_CAPACITY,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        metadata_keys: Iterable[str] = DEFAULT_KEYS,
+        storage: str = "float32",
+        pq_subspaces: int = 0,
+        rerank: int = 0,
+        background_training: bool = False,
+    ):
+        self.dim = dim
+        self._initial_capacity = max(1, initial_capacity)
+        self._vectors: Optional[np.ndarray] = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._ids: List[Optional[str]] = []
+        self._metadata: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._size = 0          # occupied rows, including tombstones
+        self._tombstones = 0
+        self._ivf = IVFQuantizer(nlist=nlist, nprobe=nprobe)
+        self._metadata_index = MetadataIndex(metadata_keys)
+        self._quantizer = make_quantizer(storage, pq_subspaces)
+        self._codes: Optional[np.ndarray] = None
+        self.rerank = rerank
+        self._keep_vectors = self._quantizer is None or rerank > 0
+        self.background_training = background_training
+        self._training: Optional[Future] = None
+        self._training_kind = ""
+        self._training_layout = 0
+        self._training_size = 0
+        self._layout = 0        # bumped whenever rows are renumbered
+        self._dirty: set = set()  # rows written while a training job runs
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._rows
+
+    # ── writes ────────────────────────────────────────────────────────
+    def upsert(self, doc_id: str, embedding: List[float], metadata: Dict[str, Any]) -> None:
+        vector = self._prepare(embedding)
+        self._finish_training()
+
+        row = self._rows.get(doc_id)
+        if row is None:
+            self._ensure_capacity(self._size + 1)
+            row = self._size
+            self._size += 1
+            self._ids.append(doc_id)
+            self._metadata.append(metadata)
+            self._rows[doc_id] = row
+            self._alive[row] = True
+        else:
+            self._metadata_index.remove(row, self._metadata[row])
+            self._metadata[row] = metadata
+        self._metadata_index.add(row, metadata)
+        if self._training is not None:
+            self._dirty.add(row)
+
+        if self._vectors is not None:
+            self._vectors[row] = vector
+        if self._codes is not None:
+            self._codes[row] = self._quantizer.encode(vector[None])[0]
+        if self._ivf.is_trained:
+            self._ivf.add(np.array([row]), vector)
+        if self._quantizer is not None and self._codes is None:
+            self._maybe_quantize()
+
+    def delete(self, doc_id: str) -> bool:
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return False
+
+        self._alive[row] = False
+        self._metadata_index.remove(row, self._metadata[row])
+        self._ids[row] = None
+        self._metadata[row] = None
+        self._tombstones += 1
+
+        if self._tombstones > _COMPACT_RATIO * self._size:
+            self.compact()
+        return True
+
+    def upsert_many(self, items: Iterable[Tuple[str, List[float], Dict[str, Any]]]) -> None:
+        """Upsert ``(doc_id, embedding, metadata)`` items."""
+        for doc_id, embedding, metadata in items:
+            self.upsert(doc_id, embedding, metadata)
+
+    def delete_many(self, doc_ids: Iterable[str]) -> int:
+        """Delete ids; returns how many were present."""
+        return sum(self.delete(doc_id) for doc_id in doc_ids)
+
+    def compact(self) -> None:
+        """Drop tombstoned rows and re-pack the matrix."""
+        if not self._tombstones:
+            return
+
+        live = np.flatnonzero(self._alive[:self._size])
+        capacity = max(self._initial_capacity, len(live))
+        if self._vectors is not None:
+            self._vectors = self._repack(self._vectors, live, capacity)
+        if self._codes is not None:
+            self._codes = self._repack(self._codes, live, capacity)
+
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._alive[:len(live)] = True
+        self._ids = [self._ids[i] for i in live]
+        self._metadata = [self._metadata[i] for i in live]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._size = len(live)
+        self._tombstones = 0
+        self._layout += 1
+        self._rebuild_ivf()
+        self._metadata_index.rebuild(self._metadata)
+        logger.debug(f"Compacted vector index to {self._size} rows")
+
+    def train(self) -> None:
+        """(Re)build the IVF quantizer over the current contents."""
+        self._training = None
+        self.compact()
+        self._fit_ivf(self._ivf, self._size, self._vectors, self._codes, self._quantizer)
+
+    def quantize(self) -> None:
+        """Train the vector quantizer now and switch to compressed rows."""
+        if self._quantizer is None or self._vectors is None or not self._rows:
+            return
+        self._training = None
+        self.compact()
+        vectors = self._vectors[:self._size]
+        self._quantizer.train(vectors)
+        self._encode_all()
+
+    def wait_for_training(self, timeout: Optional[float] = None) -> None:
+        """Block until a background training job is done and swap its result in."""
+        if self._training is not None:
+            self._training.exception(timeout)
+            self._finish_training()
+
+    def memory_bytes(self) -> int:
+        """Bytes held by row storage (full vectors and codes)."""
+        return sum(a.nbytes for a in (self._vectors, self._codes) if a is not None)
+
+    # ── reads ─────────────────────────────────────────────────────────
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        filter_dict: Dict[str, Any] = None,
+        approximate: bool = False,
+        nprobe: Optional[int] = None,
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Return up to ``top_k`` (doc_id, score, metadata) tuples, best first.
+
+        Args:
+            query_embedding: Query vector
+            top_k: Number of results to return
+            filter_dict: Exact-match metadata filter (e.g., {"type": "invoice"})
+            approximate: Only score rows in the IVF lists nearest the query
+            nprobe: IVF lists to scan; higher means better recall, slower query
+        """
+        if not self._rows or top_k <= 0:
+            return []
+
+        query = self._prepare(query_embedding)
+        self._finish_training()
+        if self._quantizer is not None and self._codes is None:
+            self._maybe_quantize()
+        # Training may compact and renumber rows, so it goes before any row lookups
+        use_ivf = approximate and self._ensure_trained()
+        alive = self._alive[:self._size]
+
+        matched, residual = None, {}
+        if filter_dict:
+            matched, residual = self._metadata_index.lookup(filter_dict)
+            if matched is not None and not len(matched):
+                return []
+
+        plan = self._plan(matched, use_ivf, nprobe)
+
+        if plan == "prefilter":
+            candidates = matched
+            scores = None
+        elif use_ivf:
+            candidates = self._ivf.candidates(query, alive, nprobe)
+            scores = None
+        else:
+            candidates = np.flatnonzero(alive)
+            scores = self._score(slice(0, self._size), query)
+
+        if plan == "postfilter":
+            keep = np.zeros(self._size, dtype=bool)
+            keep[matched] = True
+            candidates = candidates[keep[candidates]]
+
+        if residual:
+            candidates = np.fromiter(
+                (
+                    row for row in candidates.tolist()
+                    if all(self._metadata[row].get(k) == v for k, v in residual.items())
+                ),
+                dtype=np.int64,
+            )
+
+        if not len(candidates):
+            return []
+
+        if scores is None:
+            candidate_scores = self._score(candidates, query)
+        else:
+            candidate_scores = scores[candidates]
+
+        reranking = self._codes is not None and self.rerank > 0 and self._vectors is not None
+        k = min(top_k * self.rerank if reranking else top_k, len(candidates))
+        top = self._top(candidate_scores, k)
+
+        if reranking:
+            candidates = candidates[top]
+            candidate_scores = self._vectors[candidates] @ query
+            top = self._top(candidate_scores, min(top_k, len(candidates)))
+
+        return [
+            (self._ids[candidates[i]], float(candidate_scores[i]), self._metadata[candidates[i]])
+            for i in top
+        ]
+
+    def ids(self, filter_dict: Dict[str, Any]) -> List[str]:
+        """Ids of the rows whose metadata matches an exact-match filter."""
+        matched, residual = self._metadata_index.lookup(filter_dict)
+        rows = np.flatnonzero(self._alive[:self._size]) if matched is None else matched
+        return [
+            self._ids[row] for row in rows.tolist()
+            if all(self._metadata[row].get(k) == v for k, v in residual.items())
+        ]
+
+    # ── internals ─────────────────────────────────────────────────────
+    def _plan(self, matched: Optional[np.ndarray], use_ivf: bool, nprobe: Optional[int]) -> str:
+        """
+        Choose how to apply an indexed filter.
+
+        Returns:
+            "scan" when no indexed condition applies, "prefilter" to score
+            only the matching rows, "postfilter" to score the normal
+            candidates and keep the matching ones
+        """
+        if matched is None:
+            return "scan"
+        if use_ivf:
+            # IVF would score roughly nprobe/nlist of the rows anyway; scoring
+            # the matches exactly is both cheaper and exact when there are fewer
+            probed = min(nprobe or self._ivf.nprobe, self._ivf.nlist) / self._ivf.nlist
+            return "prefilter" if len(matched) <= probed * len(self) else "postfilter"
+        return "prefilter" if len(matched) < _PREFILTER_SELECTIVITY * len(self) else "postfilter"
+
+    @staticmethod
+    def _top(scores: np.ndarray, k: int) -> np.ndarray:
+        """Positions of the ``k`` highest scores, best first."""
+        if k < len(scores):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        return top[np.argsort(-scores[top], kind="stable")]
+
+    def _score(self, rows, query: np.ndarray) -> np.ndarray:
+        """Similarity of ``query`` to ``rows`` (a slice or row array)."""
+        if self._codes is not None:
+            return self._quantizer.scores(self._codes[rows], query)
+        return self._vectors[rows] @ query
+
+    def _maybe_quantize(self) -> None:
+        if self.background_training:
+            if self._quantizer.is_trained or len(self) >= self._quantizer.min_training_rows:
+                self._start_training("quantize")
+        elif self._quantizer.is_trained:
+            # Quantizer already fitted (e.g. before a segment reload): just re-encode
+            self._encode_all()
+        elif len(self) >= self._quantizer.min_training_rows:
+            self.quantize()
+
+    def _encode_all(self) -> None:
+        capacity = len(self._alive)
+        codes = np.zeros((capacity, self._quantizer.code_size(self.dim)), dtype=self._quantizer.code_dtype)
+        codes[:self._size] = self._quantizer.encode(self._vectors[:self._size])
+        self._codes = codes
+        if not self._keep_vectors:
+            self._vectors = None
+        logger.info(
+            f"Vector index switched to {self._quantizer.name} storage "
+            f"({self._size} rows, {self.memory_bytes() / 2**20:.1f} MiB)"
+        )
+
+    def _rebuild_ivf(self) -> None:
+        self._assign_ivf(self._ivf, self._size, self._vectors, self._codes, self._quantizer)
+
+    @staticmethod
+    def _assign_ivf(ivf: IVFQuantizer, size: int, vectors, codes, quantizer) -> None:
+        """Assign the first ``size`` rows (float32 if available, else decoded codes) to ``ivf``'s lists."""
+        if not ivf.is_trained:
+            return
+        if vectors is not None:
+            ivf.rebuild(vectors[:size])
+            return
+        labels = [
+            ivf.assign(quantizer.decode(codes[start:min(start + _DECODE_BLOCK, size)]))
+            for start in range(0, size, _DECODE_BLOCK)
+        ]
+        ivf.rebuild_from_labels(np.concatenate(labels) if labels else np.zeros(0, dtype=np.int64))
+
+    @classmethod
+    def _fit_ivf(cls, ivf: IVFQuantizer, size: int, vectors, codes, quantizer) -> None:
+        """Fit ``ivf`` on a sample of the first ``size`` rows and assign them all."""
+        if vectors is not None:
+            ivf.train(vectors[:size])
+            return
+
+        sample_size = min(size, ivf.training_sample_size(size))
+        sample = np.sort(np.random.default_rng(0).choice(size, size=sample_size, replace=False))
+        decoded = quantizer.decode(codes[sample])
+        decoded /= np.maximum(np.linalg.norm(decoded, axis=1, keepdims=True), 1e-12)
+        ivf.fit(decoded, size)
+        cls._assign_ivf(ivf, size, vectors, codes, quantizer)
+
+    def _start_training(self, kind: str) -> None:
+        """
+        Train a fresh IVF quantizer ("ivf") or vector quantizer ("quantize")
+        over the current rows on the training thread.
+
+        The job reads the row arrays without copying them; rows written
+        before it finishes are recorded in ``_dirty`` and redone at the swap,
+        and a compaction in between (which renumbers rows) discards it.
+        """
+        if self._training is not None:
+            return
+        size = self._size
+        vectors, codes, quantizer = self._vectors, self._codes, self._quantizer
+        if kind == "ivf":
+            ivf = IVFQuantizer(nlist=self._ivf.requested_nlist, nprobe=self._ivf.nprobe)
+
+            def job():
+                self._fit_ivf(ivf, size, vectors, codes, quantizer)
+                return ivf
+        else:
+            trained = quantizer if quantizer.is_trained else copy.deepcopy(quantizer)
+
+            def job():
+                if not trained.is_trained:
+                    trained.train(vectors[:size])
+                return trained, trained.encode(vectors[:size])
+
+        self._training_kind = kind
+        self._training_layout = self._layout
+        self._training_size = size
+        self._dirty = set()
+        self._training = _get_executor().submit(job)
+        logger.info(f"Vector index {kind} training started in the background ({size} rows)")
+
+    def _finish_training(self) -> None:
+        """Swap in a finished background training result."""
+        if self._training is None or not self._training.done():
+            return
+        future, self._training = self._training, None
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f"Background vector index {self._training_kind} training failed: {e}")
+            return
+        if self._training_layout != self._layout:
+            # Rows were renumbered while it ran; the next search starts over
+            logger.info(f"Discarded background {self._training_kind} training: the index was compacted")
+            return
+
+        dirty = np.array(sorted(self._dirty | set(range(self._training_size, self._size))), dtype=np.int64)
+        self._dirty = set()
+        if self._training_kind == "ivf":
+            if len(dirty):
+                result.add(dirty, self._rows_as_float(dirty))
+            self._ivf = result
+            return
+
+        quantizer, codes = result
+        full = np.zeros((len(self._alive), quantizer.code_size(self.dim)), dtype=quantizer.code_dtype)
+        full[:self._training_size] = codes
+        if len(dirty):
+            full[dirty] = quantizer.encode(self._vectors[dirty])
+        self._quantizer = quantizer
+        self._codes = full
+        if not self._keep_vectors:
+            self._vectors = None
+        logger.info(
+            f"Vector index switched to {quantizer.name} storage "
+            f"({self._size} rows, {self.memory_bytes() / 2**20:.1f} MiB)"
+        )
+
+    def _rows_as_float(self, rows: np.ndarray) -> np.ndarray:
+        if self._vectors is not None:
+            return self._vectors[rows]
+        decoded = self._quantizer.decode(self._codes[rows])
+        return decoded / np.maximum(np.linalg.norm(decoded, axis=1, keepdims=True), 1e-12)
+
+    @staticmethod
+    def _repack(array: np.ndarray, rows: np.ndarray, capacity: int) -> np.ndarray:
+        packed = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        packed[:len(rows)] = array[rows]
+        return packed
+
+    def _ensure_trained(self) -> bool:
+        """Train or retrain the quantizer if needed; False if IVF cannot be used yet."""
+        if len(self) < MIN_POINTS_PER_LIST:
+            return False
+        if not self._ivf.is_trained or len(self) >= _RETRAIN_GROWTH * self._ivf.trained_size:
+            if not self.background_training:
+                self.train()
+            else:
+                # Keeps using the current lists, if any, until the new ones are in
+                self._start_training("ivf")
+        return self._ivf.is_trained
+
+    def _prepare(self, embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if self.dim is None:
+            self.dim = vector.shape[0]
+        if vector.shape[0] != self.dim:
+            raise ValueError(f"Embedding has dimension {vector.shape[0]}, index expects {self.dim}")
+        return _normalize(vector)
+
+    def _ensure_capacity(self, needed: int) -> None:
+        if self._vectors is None and self._codes is None:
+            capacity = max(self._initial_capacity, needed)
+            self._vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+            self._alive = np.zeros(capacity, dtype=bool)
+            return
+
+        capacity = len(self._alive)
+        if needed <= capacity:
+            return
+
+        while capacity < needed:
+            capacity *= 2
+        occupied = np.arange(self._size)
+        if self._vectors is not None:
+            self._vectors = self._repack(self._vectors, occupied, capacity)
+        if self._codes is not None:
+            self._codes = self._repack(self._codes, occupied, capacity)
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._alive = alive
@@ -0,0 +1,319 @@
+"""
+Persistent Vector Store
+
+On-disk format for the local vector index, so restarts do not lose the index
+and every uvicorn worker on a host maps the same page-cached vectors.
+
+Directory layout (``VECTOR_INDEX_PATH``):
+
+    MANIFEST.json              current segment generation and dimension
+    segment-000007.f32         float32 rows, row-major, unit-norm, with headroom
+    segment-000007.meta.json   ids and metadata for the occupied rows
+    wal.jsonl                  append-only upsert/delete log since the segment
+    LOCK                       flock target serialising writers and checkpoints
+
+Segments are mapped copy-on-write: reads are zero-copy and shared between
+processes; only pages this process writes to (appends, overwrites) become
+private.  Every write is appended to the WAL and fsynced before it is applied
+in memory, so a failed or crashed write never leaves this process ahead of
+what is on disk; ``upsert_many`` / ``delete_many`` log a whole batch with one
+append and one fsync.  Writers and readers also take a process-local mutex,
+so writes can run on a worker thread while the event loop searches.  Every process tails the WAL before each operation, so all
+workers converge on the same contents.  Once the WAL holds
+``checkpoint_ops`` records it is folded into a new segment.
+"""
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import base64
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+from app.rag.vector_index import VectorIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows — single-process use only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_MANIFEST = "MANIFEST.json"
+_WAL = "wal.jsonl"
+_LOCK = "LOCK"
+_MIN_SEGMENT_ROWS = 1024
+
+
+def _segment_paths(root: str, generation: int):
+    stem = os.path.join(root, f"segment-{generation:06d}")
+    return f"{stem}.f32", f"{stem}.meta.json"
+
+
+def _write_durable(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class PersistentVectorIndex(VectorIndex):
+    """
+    ``VectorIndex`` backed by an mmap'd segment plus a write-ahead log.
+
+    Args:
+        path: Directory holding the store (created if missing)
+        checkpoint_ops: WAL records after which a new segment is written
+        **kwargs: Passed through to ``VectorIndex`` (dim, nlist, nprobe, ...)
+    """
+
+    blocking_writes = True
+
+    def __init__(self, path: str, checkpoint_ops: int = 10000, **kwargs):
+        super().__init__(**kwargs)
+        # Segments are written from the float32 rows, and being mmap'd they
+        # live in the shared page cache rather than this process's heap
+        self._keep_vectors = True
+        self.path = path
+        self.checkpoint_ops = checkpoint_ops
+        self._generation = -1
+        self._wal_offset = 0
+        self._wal_records = 0
+        self._mutex = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        with self._lock(exclusive=False):
+            self._refresh()
+        logger.info(f"Opened persistent vector index at {path} ({len(self)} docs, generation {self._generation})")
+
+    # ── public ────────────────────────────────────────────────────────
+    def upsert(self, doc_id: str, embedding: List[float], metadata: Dict[str, Any]) -> None:
+        self.upsert_many([(doc_id, embedding, metadata)])
+
+    def delete(self, doc_id: str) -> bool:
+        return self.delete_many([doc_id]) == 1
+
+    def upsert_many(self, items: Iterable[Tuple[str, List[float], Dict[str, Any]]]) -> None:
+        """Upsert a batch with one WAL append and one fsync."""
+        batch = [(doc_id, np.asarray(embedding, dtype=np.float32).reshape(-1), metadata)
+                 for doc_id, embedding, metadata in items]
+        if not batch:
+            return
+        records = [
+            {
+                "op": "upsert",
+                "id": doc_id,
+                "vector": base64.b64encode(vector.tobytes()).decode("ascii"),
+                "metadata": metadata,
+            }
+            for doc_id, vector, metadata in batch
+        ]
+        with self._lock(exclusive=True):
+            self._refresh()
+            # Validate before logging: a record that cannot be applied would fail every replay
+            for _, vector, _ in batch:
+                self._prepare(vector)
+            self._append(records)
+            for doc_id, vector, metadata in batch:
+                VectorIndex.upsert(self, doc_id, vector, metadata)
+        self._maybe_checkpoint()
+
+    def delete_many(self, doc_ids: Iterable[str]) -> int:
+        """Delete a batch with one WAL append and one fsync; returns how many were present."""
+        with self._lock(exclusive=True):
+            self._refresh()
+            present = [doc_id for doc_id in dict.fromkeys(doc_ids) if doc_id in self]
+            if present:
+                self._append([{"op": "delete", "id": doc_id} for doc_id in present])
+                for doc_id in present:
+                    VectorIndex.delete(self, doc_id)
+        self._maybe_checkpoint()
+        return len(present)
+
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        filter_dict: Dict[str, Any] = None,
+        approximate: bool = False,
+        nprobe: Optional[int] = None,
+    ):
+        with self._lock(exclusive=False):
+            self._refresh()
+            return super().search(
+                query_embedding, top_k=top_k, filter_dict=filter_dict, approximate=approximate, nprobe=nprobe,
+            )
+
+    def ids(self, filter_dict: Dict[str, Any]) -> List[str]:
+        with self._lock(exclusive=False):
+            self._refresh()
+            return super().ids(filter_dict)
+
+    def checkpoint(self) -> None:
+        """Fold the WAL into a new segment and truncate it."""
+        with self._lock(exclusive=True):
+            self._refresh()
+            self.compact()
+            generation = self._generation + 1
+            self._write_segment(generation)
+            _write_durable(
+                os.path.join(self.path, _MANIFEST),
+                json.dumps({"generation": generation, "dim": self.dim}).encode(),
+            )
+            with open(os.path.join(self.path, _WAL), "a+b") as wal:
+                wal.truncate(0)
+                os.fsync(wal.fileno())
+
+            previous = self._generation
+            self._load_segment(generation)
+            self._wal_offset = 0
+            self._wal_records = 0
+
+            # Other workers may still map the old segment; unlinking is safe on POSIX
+            for stale in _segment_paths(self.path, previous):
+                if previous >= 0 and os.path.exists(stale):
+                    os.unlink(stale)
+
+        logger.info(f"Checkpointed vector index to generation {generation} ({len(self)} docs)")
+
+    # ── locking ───────────────────────────────────────────────────────
+    @contextmanager
+    def _lock(self, exclusive: bool):
+        # flock serialises processes; the mutex serialises this process's threads
+        with self._mutex, open(os.path.join(self.path, _LOCK), "a+b") as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    # ── segment / WAL io (call with the lock held) ────────────────────
+    def _refresh(self) -> None:
+        """Catch up with segments and WAL records written by any process."""
+        generation = self._read_manifest_generation()
+        if generation != self._generation:
+            self._load_segment(generation)
+            self._wal_offset = 0
+            self._wal_records = 0
+
+        wal_path = os.path.join(self.path, _WAL)
+        try:
+            wal_size = os.path.getsize(wal_path)
+        except FileNotFoundError:
+            return
+        if wal_size <= self._wal_offset:
+            return
+
+        with open(wal_path, "rb") as wal:
+            wal.seek(self._wal_offset)
+            chunk = wal.read(wal_size - self._wal_offset)
+
+        # A trailing line without a newline is a torn write; leave it unread
+        complete = chunk[:chunk.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            self._apply(json.loads(line))
+            self._wal_records += 1
+        self._wal_offset += len(complete)
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        if record["op"] == "upsert":
+            vector = np.frombuffer(base64.b64decode(record["vector"]), dtype=np.float32)
+            VectorIndex.upsert(self, record["id"], vector, record["metadata"])
+        elif record["op"] == "delete":
+            VectorIndex.delete(self, record["id"])
+
+    def _append(self, records: List[Dict[str, Any]]) -> None:
+        lines = b"".join((json.dumps(record, default=str) + "\n").encode() for record in records)
+        # Unbuffered, so a failed write leaves nothing behind to be flushed on close
+        with open(os.path.join(self.path, _WAL), "ab", buffering=0) as wal:
+            # Drop any torn tail left by a crashed writer before appending
+            if wal.tell() > self._wal_offset:
+                wal.truncate(self._wal_offset)
+            try:
+                wal.write(lines)
+                os.fsync(wal.fileno())
+            except BaseException:
+                # Not durable: take the records back so no process replays them
+                wal.truncate(self._wal_offset)
+                raise
+        self._wal_offset += len(lines)
+        self._wal_records += len(records)
+
+    def _maybe_checkpoint(self) -> None:
+        if self.checkpoint_ops and self._wal_records >= self.checkpoint_ops:
+            self.checkpoint()
+
+    def _read_manifest_generation(self) -> int:
+        try:
+            with open(os.path.join(self.path, _MANIFEST), "rb") as f:
+                manifest = json.loads(f.read())
+        except FileNotFoundError:
+            return -1
+        if self.dim is None:
+            self.dim = manifest.get("dim")
+        return manifest["generation"]
+
+    def _load_segment(self, generation: int) -> None:
+        self._reset()
+        self._generation = generation
+        if generation < 0:
+            return
+
+        vectors_path, meta_path = _segment_paths(self.path, generation)
+        with open(meta_path, "rb") as f:
+            meta = json.loads(f.read())
+
+        self.dim = meta["dim"]
+        size = meta["size"]
+        if meta["capacity"]:
+            self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="c", shape=(meta["capacity"], self.dim))
+        self._alive = np.zeros(meta["capacity"], dtype=bool)
+        self._alive[:size] = True
+        self._ids = list(meta["ids"])
+        self._metadata = list(meta["metadata"])
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._size = size
+        self._metadata_index.rebuild(self._metadata)
+
+    def _write_segment(self, generation: int) -> None:
+        vectors_path, meta_path = _segment_paths(self.path, generation)
+        size = self._size
+        # Leave headroom so appends land in the mapped file instead of forcing a copy
+        capacity = max(_MIN_SEGMENT_ROWS, 1 << int(np.ceil(np.log2(max(1, size + size // 4)))))
+
+        with open(vectors_path, "wb") as f:
+            if size:
+                f.write(np.ascontiguousarray(self._vectors[:size]).tobytes())
+            f.truncate(capacity * (self.dim or 0) * 4)
+            f.flush()
+            os.fsync(f.fileno())
+
+        meta = {
+            "dim": self.dim,
+            "size": size,
+            "capacity": capacity if self.dim else 0,
+            "ids": self._ids[:size],
+            "metadata": self._metadata[:size],
+        }
+        _write_durable(meta_path, json.dumps(meta, default=str).encode())
+
+    def _reset(self) -> None:
+        self._vectors = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._ids = []
+        self._metadata = []
+        self._rows = {}
+        self._size = 0
+        self._tombstones = 0
+        self._layout += 1
+        self._ivf.reset()
+        self._metadata_index.clear()
+        # Codes are derived from the segment; the trained quantizer is kept
+        self._codes = None
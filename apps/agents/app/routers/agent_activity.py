@@ -165,3 +165,11 @@ async def get_agent_stats_summary():
         ],
         "period": "last_24_hours",
     }
+
+
+@router.get("/stats/orchestrator")
+async def get_orchestrator_stats():
+    """Per-agent run-time histograms and trigger state of this process's orchestrator"""
+    from app.workers.agent_orchestrator import get_orchestrator
+    orchestrator = await get_orchestrator()
+    return orchestrator.stats()
@@ -4,6 +4,7 @@ from typing import Optional, List
 from datetime import datetime
 from uuid import uuid4
 from app.db import get_conn
+from app.workers.cron import next_run
 
 router = APIRouter(prefix="/agents/schedule", tags=["agents"])
 
@@ -30,6 +31,14 @@ class AgentScheduleResponse(BaseModel):
     updatedAt: datetime
 
 
+def compute_next_run(cron_expression: str) -> datetime:
+    """Next fire time of a cron expression; 422 if the expression is invalid."""
+    try:
+        return next_run(cron_expression, datetime.utcnow())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid cron expression: {e}")
+
+
 def row_to_agent_schedule(row) -> dict:
     return {
         "id": row["id"],
@@ -67,12 +76,13 @@ async def get_agent_schedule(schedule_id: str):
 
 @router.post("/", response_model=AgentScheduleResponse, status_code=201)
 async def create_agent_schedule(schedule: AgentScheduleCreate):
+    next_run_at = compute_next_run(schedule.cronExpression)
     async with get_conn() as conn:
         row = await conn.fetchrow(
-            '''INSERT INTO "AgentSchedule" ("id", "agentType", "cronExpression", "isActive", "createdAt", "updatedAt")
-               VALUES ($1, $2, $3, $4, NOW(), NOW())
+            '''INSERT INTO "AgentSchedule" ("id", "agentType", "cronExpression", "isActive", "nextRun", "createdAt", "updatedAt")
+               VALUES ($1, $2, $3, $4, $5, NOW(), NOW())
                RETURNING *''',
-            str(uuid4()), schedule.agentType, schedule.cronExpression, schedule.isActive,
+            str(uuid4()), schedule.agentType, schedule.cronExpression, schedule.isActive, next_run_at,
         )
     return row_to_agent_schedule(row)
 
@@ -96,6 +106,11 @@ async def update_agent_schedule(schedule_id: str, schedule: AgentScheduleUpdate)
             sets.append(f'"isActive" = ${idx}')
             params.append(schedule.isActive)
             idx += 1
+        if schedule.cronExpression is not None or schedule.isActive:
+            # New expression or re-activation: the next run counts from now
+            sets.append(f'"nextRun" = ${idx}')
+            params.append(compute_next_run(schedule.cronExpression or existing["cronExpression"]))
+            idx += 1
 
         params.append(schedule_id)
         query = f'UPDATE "AgentSchedule" SET {", ".join(sets)} WHERE "id" = ${idx} RETURNING *'
@@ -1,8 +1,9 @@
 """
 Broadcast & Task-Assignment Endpoints
 
-POST /broadcast/send            – send a one-off email to a list of addresses
-POST /broadcast/assign-submission – notify specific users they must submit a doc
+POST /broadcast/send            – queue a one-off email to a list of addresses
+POST /broadcast/assign-submission – queue notices that specific users must submit a doc
+GET  /broadcast/deliveries/{id}  – delivery status of a queued email
 GET  /broadcast/email-settings   – current provider config (no secrets)
 POST /broadcast/email-settings   – update config at runtime (in-memory; set .env to persist)
 POST /broadcast/test-email       – send a test email to verify the config
@@ -15,6 +16,7 @@ from pydantic import BaseModel
 from typing import List, Optional
 
 from app.db import get_conn
+from app.services.email_queue import enqueue_emails, get_delivery
 from app.services.email_service import get_email_service
 from app.config import get_settings
 
@@ -55,31 +57,41 @@ class EmailSettingsUpdate(BaseModel):
 
 @router.post("/send")
 async def send_broadcast(request: BroadcastRequest):
-    """Send a broadcast email to an explicit list of recipients."""
+    """Queue a broadcast email to an explicit list of recipients; returns a receipt."""
     if not request.recipients:
         raise HTTPException(status_code=400, detail="At least one recipient required")
-    email_svc = get_email_service()
-    result = await email_svc.send_email(
-        to=request.recipients,
-        subject=request.subject,
-        body=request.body,
-        html=request.html,
-    )
+    receipt, = await enqueue_emails([{
+        "to": request.recipients,
+        "subject": request.subject,
+        "body": request.body,
+        "html": request.html,
+    }])
+    # No "sent" flag: the message has only been queued (the dashboard shows that)
     return {
-        "sent": result.get("sent", False),
+        "queued": True,
+        "delivery_id": receipt["delivery_id"],
+        "status": receipt["status"],
         "recipients": request.recipients,
-        "reason": result.get("reason"),
     }
 
 
+@router.get("/deliveries/{delivery_id}")
+async def get_delivery_status(delivery_id: str):
+    """Status of a queued email (QUEUED, SENDING, RETRYING, SENT or FAILED)."""
+    delivery = await get_delivery(delivery_id)
+    if not delivery:
+        raise HTTPException(status_code=404, detail="Delivery not found")
+    return delivery
+
+
 # ── Task-assignment ───────────────────────────────────────────────────────────
 
 @router.post("/assign-submission")
 async def assign_submission(request: AssignSubmissionRequest):
     """
     Notify a subset of users that they must submit a document.
-    Looks up their names/emails from the DB, then sends an individual
-    HTML email to each one.
+    Looks up their names/emails from the DB, then queues an individual
+    HTML email to each one and returns the delivery receipts.
     """
     if not request.user_ids:
         raise HTTPException(status_code=400, detail="At least one user_id required")
@@ -101,35 +113,40 @@ async def assign_submission(request: AssignSubmissionRequest):
         "custom": request.custom_task_name or "Document",
     }
     task_label = task_labels.get(request.task_type, request.task_type)
-    email_svc = get_email_service()
-
-    results = []
-    for row in rows:
-        subject = f"[ZOARK OS] Action Required: Submit {task_label}"
-        body = (
-            f"<h2 style='color:#e2e8f0'>Hi {row['name']},</h2>"
-            f"<p style='color:#cbd5e1'>You have been assigned the following submission task:</p>"
-            f"<div style='margin:16px 0;padding:16px;background:#1e293b;border-radius:8px;"
-            f"border-left:4px solid #a78bfa'>"
-            f"<p style='color:#e2e8f0;margin:0;font-weight:bold'>Task: {task_label}</p>"
-            f"<p style='color:#cbd5e1;margin:8px 0 0'>Deadline: {request.deadline}</p>"
-        )
-        if request.notes:
-            body += f"<p style='color:#cbd5e1;margin:8px 0 0'>Notes: {request.notes}</p>"
-        body += (
-            "</div>"
-            "<p style='color:#cbd5e1'>Please submit the required document(s) at your earliest "
-            "convenience. The system will send automatic follow-up reminders until the submission "
-            "is received.</p>"
-            "<p style='color:#6b7280;margin-top:24px;font-size:14px'>— ZOARK OS</p>"
-        )
+    # One template for everyone; the name is a substitution so the email
+    # sender can batch the queued messages into shared SendGrid requests
+    subject = f"[ZOARK OS] Action Required: Submit {task_label}"
+    body = (
+        f"<h2 style='color:#e2e8f0'>Hi -name-,</h2>"
+        f"<p style='color:#cbd5e1'>You have been assigned the following submission task:</p>"
+        f"<div style='margin:16px 0;padding:16px;background:#1e293b;border-radius:8px;"
+        f"border-left:4px solid #a78bfa'>"
+        f"<p style='color:#e2e8f0;margin:0;font-weight:bold'>Task: {task_label}</p>"
+        f"<p style='color:#cbd5e1;margin:8px 0 0'>Deadline: {request.deadline}</p>"
+    )
+    if request.notes:
+        body += f"<p style='color:#cbd5e1;margin:8px 0 0'>Notes: {request.notes}</p>"
+    body += (
+        "</div>"
+        "<p style='color:#cbd5e1'>Please submit the required document(s) at your earliest "
+        "convenience. The system will send automatic follow-up reminders until the submission "
+        "is received.</p>"
+        "<p style='color:#6b7280;margin-top:24px;font-size:14px'>— ZOARK OS</p>"
+    )
 
-        result = await email_svc.send_email(to=row["email"], subject=subject, body=body)
-        results.append({
+    receipts = await enqueue_emails([
+        {"to": row["email"], "subject": subject, "body": body, "substitutions": {"-name-": row["name"]}}
+        for row in rows
+    ])
+    results = [
+        {
             "user_id": row["id"],
             "email": row["email"],
-            "sent": result.get("sent", False),
-        })
+            "queued": True,
+            "delivery_id": receipt["delivery_id"],
+        }
+        for row, receipt in zip(rows, receipts)
+    ]
 
     return {
         "assignments": results,
@@ -180,8 +197,8 @@ async def update_email_settings(update: EmailSettingsUpdate):
     # Bust caches so next access re-reads env
     from app.config import get_settings as _gs
     _gs.cache_clear()
-    import app.services.email_service as _em
-    _em._email_service = None
+    from app.services.email_service import reset_email_service
+    await reset_email_service()
 
     email_svc = get_email_service()
     return {"provider": email_svc.provider, "configured": email_svc.is_configured()}
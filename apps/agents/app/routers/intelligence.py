@@ -12,6 +12,8 @@ class SearchRequest(BaseModel):
     query: str
     top_k: int = 5
     filter_type: Optional[str] = None
+    approximate: bool = False
+    nprobe: Optional[int] = None
 
 
 class SearchResult(BaseModel):
@@ -34,11 +36,24 @@ async def semantic_search(request: SearchRequest):
     retriever = get_rag_retriever()
     filter_dict = {"type": request.filter_type} if request.filter_type else None
     results = await retriever.semantic_search(
-        query=request.query, top_k=request.top_k, filter_dict=filter_dict
+        query=request.query, top_k=request.top_k, filter_dict=filter_dict,
+        approximate=request.approximate, nprobe=request.nprobe,
     )
     return results
 
 
+@router.get("/embedding-cache/stats")
+async def embedding_cache_stats():
+    from app.rag.embeddings import get_embeddings_service
+    return get_embeddings_service().cache.stats()
+
+
+@router.get("/embedding-batcher/stats")
+async def embedding_batcher_stats():
+    from app.rag.embeddings import get_embeddings_service
+    return get_embeddings_service().batcher.stats()
+
+
 @router.get("/agent-logs", response_model=List[AgentLogResponse])
 async def get_agent_logs(limit: int = 50):
     async with get_conn() as conn:
@@ -93,6 +108,18 @@ async def parse_pdf(pdf_url: str, invoice_id: Optional[str] = None):
     return {"message": "PDF parsing completed", "result": result}
 
 
+class ParsePdfBatchItem(BaseModel):
+    pdf_url: str
+    invoice_id: Optional[str] = None
+
+
+@router.post("/parse-pdf/batch")
+async def parse_pdf_batch(items: List[ParsePdfBatchItem]):
+    from app.agents.email_parser import EmailParserAgent
+    results = await EmailParserAgent.parse_batch([item.dict() for item in items])
+    return {"message": f"Parsed {len(results)} PDFs", "results": results}
+
+
 @router.post("/index-document")
 async def index_document(doc_id: str, text: str, metadata: dict):
     from app.rag.retriever import get_rag_retriever
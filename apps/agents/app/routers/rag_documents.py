@@ -4,6 +4,7 @@ from typing import Optional, List
 from datetime import datetime
 from uuid import uuid4
 from app.db import get_conn
+from app.rag.hybrid_search import get_hybrid_search
 
 router = APIRouter(prefix="/documents", tags=["rag"])
 
@@ -84,6 +85,13 @@ async def list_rag_documents(
     return [row_to_rag_document(r) for r in rows]
 
 
+@router.get("/indexer/stats")
+async def get_indexer_stats():
+    """Queue depth and per-stage latency of this process's indexer worker."""
+    from app.agents.document_indexer import get_document_indexer
+    return get_document_indexer().stats()
+
+
 @router.get("/{doc_id}", response_model=RAGDocumentResponse)
 async def get_rag_document(doc_id: str):
     async with get_conn() as conn:
@@ -132,6 +140,7 @@ async def update_rag_document(doc_id: str, doc: RAGDocumentUpdate):
         params.append(doc_id)
         query = f'UPDATE "RAGDocument" SET {", ".join(sets)} WHERE "id" = ${idx} RETURNING *'
         row = await conn.fetchrow(query, *params)
+    get_hybrid_search().invalidate()
     return row_to_rag_document(row)
 
 
@@ -141,50 +150,21 @@ async def delete_rag_document(doc_id: str):
         result = await conn.execute('DELETE FROM "RAGDocument" WHERE "id" = $1', doc_id)
     if result == "DELETE 0":
         raise HTTPException(status_code=404, detail="Document not found")
+    get_hybrid_search().invalidate()
 
 
 @router.post("/search", response_model=List[RAGSearchResult])
 async def search_rag_documents(
     query: str = Query(...),
-    limit: int = Query(10),
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
     type: Optional[str] = Query(None),
 ):
-    """Search documents using semantic search (would integrate with Pinecone in production)"""
-    async with get_conn() as conn:
-        # For now, do simple text search in content and name
-        sql_query = '''
-            SELECT "id", "name", "type", "source", "url", 
-                   CASE 
-                       WHEN "name" ILIKE $1 THEN 0.9
-                       WHEN "content" ILIKE $1 THEN 0.7
-                       ELSE 0.5
-                   END as relevance
-            FROM "RAGDocument"
-            WHERE "ragStatus" = 'INDEXED'
-            AND ("name" ILIKE $1 OR "content" ILIKE $1)
-        '''
-        params = [f"%{query}%"]
-        
-        if type:
-            sql_query += ' AND "type" = $2'
-            params.append(type)
-        
-        sql_query += ' ORDER BY relevance DESC LIMIT $' + str(len(params) + 1)
-        params.append(limit)
-        
-        rows = await conn.fetch(sql_query, *params)
-    
-    return [
-        {
-            "id": r["id"],
-            "name": r["name"],
-            "type": r["type"],
-            "source": r["source"],
-            "url": r["url"],
-            "relevance": float(r["relevance"]),
-        }
-        for r in rows
-    ]
+    """Hybrid search: Postgres full-text and vector rankings fused with RRF"""
+    try:
+        return await get_hybrid_search().search(query, limit=limit, offset=offset, doc_type=type)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 
 @router.post("/{doc_id}/index", status_code=200)
@@ -200,5 +180,6 @@ async def index_document_to_rag(doc_id: str):
             'UPDATE "RAGDocument" SET "ragStatus" = $1::\"RAGStatus\", "updatedAt" = NOW() WHERE "id" = $2',
             "INDEXED", doc_id
         )
-    
+    get_hybrid_search().invalidate()
+
     return {"status": "indexed", "documentId": doc_id}
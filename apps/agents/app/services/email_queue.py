@@ -0,0 +1,390 @@
+"""
+Outbound Email Queue
+────────────────────
+Durable, asynchronous delivery for ``EmailService``:
+
+  * ``enqueue_emails`` records each message as an "EmailDelivery" row
+    (status QUEUED) and appends it to a Redis stream, then returns receipts
+    straight away; the caller never waits on SMTP or a provider API.
+  * ``EmailSender`` drains the stream through a consumer group
+    (app/workers/event_bus.py), so any number of replicas share the work and
+    a message taken by a crashed sender is reclaimed (a live sender keeps
+    re-claiming the messages it holds, so slow sends are never duplicated).  Sends are shaped by a
+    token bucket per provider, held in Redis and shared by every replica, to
+    stay under Gmail / SendGrid quotas however many senders run, and the
+    messages taken within ``email_batch_window_seconds`` go out together
+    through ``EmailService.send_bulk`` (one SendGrid request per template).
+    Delivered entries are deleted from the stream; it is never trimmed by
+    length, so a backlog cannot drop queued messages.
+  * A failed send is parked in a sorted set until ``base * 2^attempt``
+    seconds have passed, then moved back onto the stream; after
+    ``email_max_attempts`` it is marked FAILED.  Every transition is
+    written to "EmailDelivery", which /broadcast/deliveries/{id} reads.
+
+Attachments are not queued (they would have to be stored in Redis); send
+those directly with ``EmailService.send_email``.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+import asyncio
+import json
+import logging
+import time
+
+import redis.asyncio as aioredis
+
+from app.config import get_settings
+from app.db import get_conn
+from app.services.email_service import SENDGRID_MAX_PERSONALIZATIONS, get_email_service, render
+from app.workers.event_bus import StreamConsumer
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_INITIAL_DELAY = 5  # seconds
+
+# Moves due retries back onto the stream atomically, so two senders never
+# both re-queue the same message
+_PROMOTE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, job in ipairs(due) do
+  redis.call('ZREM', KEYS[1], job)
+  redis.call('XADD', KEYS[2], '*', 'data', job)
+end
+return #due
+"""
+
+# Takes one token from the bucket in KEYS[1] (refilled at ARGV[1]/s up to
+# ARGV[2]); returns 0, or the milliseconds until a token is available.
+# Redis' clock is used so every replica refills the bucket the same way.
+_TOKEN_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return wait
+"""
+
+
+class TokenBucket:
+    """
+    Token bucket in Redis: ``rate`` sends per second on average, bursts of up
+    to ``capacity``, shared by every process using the same ``key``.
+
+    Waiters within a process are served in arrival order.
+    """
+
+    def __init__(self, redis, key: str, rate: float, capacity: int = 1):
+        self.redis = redis
+        self.key = key
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                wait_ms = int(await self.redis.eval(_TOKEN_SCRIPT, 1, self.key, self.rate, self.capacity))
+                if wait_ms <= 0:
+                    return
+                await asyncio.sleep(wait_ms / 1000)
+
+
+def parse_rates(spec: str) -> Dict[str, float]:
+    """``"smtp=1,sendgrid=50"`` → per-provider send rates (bad entries are skipped)."""
+    rates = {}
+    for entry in spec.split(","):
+        name, _, value = entry.partition("=")
+        try:
+            rate = float(value)
+        except ValueError:
+            rate = 0.0
+        if rate > 0:
+            rates[name.strip().lower()] = rate
+        elif entry.strip():
+            logger.warning(f"Ignoring email rate entry '{entry.strip()}'")
+    return rates
+
+
+def retry_delay(attempt: int) -> float:
+    """Backoff before retry number ``attempt`` (1-based)."""
+    return min(settings.email_retry_max_seconds, settings.email_retry_base_seconds * 2 ** (attempt - 1))
+
+
+# ── enqueue ───────────────────────────────────────────────────────────────
+_redis: Optional[aioredis.Redis] = None
+
+
+def get_queue_redis() -> aioredis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = aioredis.from_url(settings.redis_url, decode_responses=True)
+    return _redis
+
+
+async def close_email_queue() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
+
+
+async def enqueue_emails(messages: List[dict], redis=None) -> List[Dict[str, Any]]:
+    """Queue messages for delivery.
+
+    messages – list of send_email keyword arguments (no attachments)
+
+    Returns one receipt per message: {"delivery_id", "status": "QUEUED", "recipients"}.
+    """
+    if any(message.get("attachments") for message in messages):
+        raise ValueError("Attachments cannot be queued; send them directly")
+    if not messages:
+        return []
+
+    redis = redis or get_queue_redis()
+    ids = [str(uuid4()) for _ in messages]
+    recipients = [[m["to"]] if isinstance(m["to"], str) else list(m["to"]) for m in messages]
+    async with get_conn() as conn:
+        await conn.execute(
+            '''INSERT INTO "EmailDelivery" ("id", "recipients", "subject", "status", "createdAt", "updatedAt")
+               SELECT d."id", d."recipients"::jsonb, d."subject", 'QUEUED'::"EmailDeliveryStatus", NOW(), NOW()
+               FROM unnest($1::text[], $2::text[], $3::text[]) AS d("id", "recipients", "subject")''',
+            ids,
+            [json.dumps(r) for r in recipients],
+            [render(m["subject"], m.get("substitutions")) for m in messages],
+        )
+
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for delivery_id, message in zip(ids, messages):
+            pipe.xadd(
+                settings.email_queue_stream,
+                {"data": json.dumps({"id": delivery_id, "message": message, "attempt": 0})},
+            )
+        await pipe.execute()
+    except Exception as e:
+        await _mark_failed(ids, f"enqueue failed: {e}")
+        raise
+
+    logger.info(f"Queued {len(ids)} emails")
+    return [
+        {"delivery_id": delivery_id, "status": "QUEUED", "recipients": to}
+        for delivery_id, to in zip(ids, recipients)
+    ]
+
+
+async def get_delivery(delivery_id: str) -> Optional[Dict[str, Any]]:
+    async with get_conn() as conn:
+        row = await conn.fetchrow('SELECT * FROM "EmailDelivery" WHERE "id" = $1', delivery_id)
+    return dict(row) if row else None
+
+
+async def _mark_failed(ids: List[str], error: str) -> None:
+    async with get_conn() as conn:
+        await conn.execute(
+            '''UPDATE "EmailDelivery"
+               SET "status" = 'FAILED'::"EmailDeliveryStatus", "lastError" = $2, "updatedAt" = NOW()
+               WHERE "id" = ANY($1::text[])''',
+            ids, error,
+        )
+
+
+# ── sender ────────────────────────────────────────────────────────────────
+class EmailSender:
+    """
+    Background sender pool draining the outbound queue.
+
+    Args:
+        redis: redis.asyncio client created with ``decode_responses=True``
+        concurrency: Messages being sent at once
+        rates: Per-provider send rates (emails/second) across all replicas;
+            providers without an entry are not rate limited
+    """
+
+    def __init__(self, redis, concurrency: Optional[int] = None, rates: Optional[Dict[str, float]] = None):
+        self.redis = redis
+        self.stream = settings.email_queue_stream
+        self.retry_key = f"{self.stream}:retry"
+        self.consumer = StreamConsumer(
+            redis,
+            self.deliver,
+            stream=self.stream,
+            group=settings.email_queue_group,
+            concurrency=concurrency or settings.email_sender_concurrency,
+            delete_acked=True,
+            # Messages wait on the rate limit and the batch window while
+            # pending; another replica must not reclaim and resend them
+            keep_alive=True,
+        )
+        rates = parse_rates(settings.email_rate_limits) if rates is None else rates
+        self.buckets = {
+            provider: TokenBucket(redis, f"{self.stream}:rate:{provider}", rate, settings.email_rate_burst)
+            for provider, rate in rates.items()
+        }
+        self.counters = {"sent": 0, "retried": 0, "failed": 0, "batches": 0}
+        self._batch: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    async def run(self) -> None:
+        """Deliver and re-queue due retries until cancelled."""
+        try:
+            await asyncio.gather(self.consumer.run(), self._promote_loop())
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+
+    async def deliver(self, job: Dict[str, Any]) -> None:
+        """Send one queued message and record the outcome (raising leaves it pending)."""
+        service = get_email_service()
+        bucket = self.buckets.get(service.provider)
+        if bucket is not None:
+            await bucket.acquire()
+
+        attempt = job.get("attempt", 0) + 1
+        await self._update(job["id"], "SENDING", attempt, service.provider)
+        result = await self._send(service, job["message"])
+
+        if result.get("sent"):
+            self.counters["sent"] += 1
+            # Sent is final: a failed status write must not lead to a resend
+            try:
+                await self._update(job["id"], "SENT", attempt, service.provider, sent=True)
+            except Exception as e:
+                logger.error(f"Email {job['id']} was sent but its status was not saved: {e}")
+            return
+
+        error = result.get("reason") or "send failed"
+        if attempt >= settings.email_max_attempts:
+            self.counters["failed"] += 1
+            logger.error(f"Email {job['id']} failed after {attempt} attempts: {error}")
+            await self._update(job["id"], "FAILED", attempt, service.provider, error=error)
+            return
+
+        delay = retry_delay(attempt)
+        # Status first: once the retry is parked, raising would leave the
+        # entry pending as well and the message would be sent twice
+        await self._update(
+            job["id"], "RETRYING", attempt, service.provider, error=error,
+            next_attempt=datetime.utcnow() + timedelta(seconds=delay),
+        )
+        await self.redis.zadd(self.retry_key, {json.dumps({**job, "attempt": attempt}): time.time() + delay})
+        self.counters["retried"] += 1
+        logger.warning(f"Email {job['id']} failed (attempt {attempt}), retrying in {delay:.0f}s: {error}")
+
+    async def promote_due(self, now: Optional[float] = None, limit: int = 100) -> int:
+        """Move retries whose backoff has passed back onto the stream; returns how many."""
+        return await self.redis.eval(
+            _PROMOTE_SCRIPT, 2, self.retry_key, self.stream, now if now is not None else time.time(), limit,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "consumer": self.consumer.stats()}
+
+    async def _send(self, service, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Add ``message`` to the open batch and wait for its send status."""
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        self._batch.append((message, done))
+        if len(self._batch) >= SENDGRID_MAX_PERSONALIZATIONS:
+            self._flush(service)
+        elif self._flush_timer is None:
+            self._flush_timer = loop.call_later(settings.email_batch_window_seconds, self._flush, service)
+        # A cancelled delivery leaves the send going for the rest of its batch
+        return await asyncio.shield(done)
+
+    def _flush(self, service) -> None:
+        batch, self._batch = self._batch, []
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if batch:
+            task = asyncio.create_task(self._send_batch(service, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send_batch(self, service, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        self.counters["batches"] += 1
+        try:
+            async for index, result in service.send_bulk([message for message, _ in batch]):
+                batch[index][1].set_result(result)
+        except Exception as e:
+            logger.error(f"Email batch of {len(batch)} failed: {e}")
+            for _, done in batch:
+                if not done.done():
+                    done.set_result({"sent": False, "reason": str(e), "provider": service.provider})
+        finally:
+            for _, done in batch:
+                if not done.done():
+                    done.cancel()
+
+    async def _promote_loop(self) -> None:
+        while True:
+            try:
+                while await self.promote_due() > 0:
+                    pass
+            except Exception as e:
+                logger.error(f"Could not re-queue email retries: {e}")
+            await asyncio.sleep(settings.email_retry_poll_seconds)
+
+    async def _update(
+        self,
+        delivery_id: str,
+        status: str,
+        attempts: int,
+        provider: str,
+        error: Optional[str] = None,
+        next_attempt: Optional[datetime] = None,
+        sent: bool = False,
+    ) -> None:
+        async with get_conn() as conn:
+            await conn.execute(
+                '''UPDATE "EmailDelivery"
+                   SET "status" = $2::"EmailDeliveryStatus", "attempts" = $3, "provider" = $4,
+                       "lastError" = COALESCE($5, "lastError"), "nextAttemptAt" = $6,
+                       "sentAt" = CASE WHEN $7 THEN NOW() ELSE "sentAt" END, "updatedAt" = NOW()
+                   WHERE "id" = $1''',
+                delivery_id, status, attempts, provider, error, next_attempt, sent,
+            )
+
+
+async def _run_sender() -> None:
+    """Single sender lifecycle."""
+    r = aioredis.from_url(settings.redis_url, decode_responses=True)
+    sender = EmailSender(r)
+    logger.info(f"Email sender consuming '{sender.stream}' as {sender.consumer.consumer}")
+    try:
+        await sender.run()
+    finally:
+        await r.aclose()
+
+
+async def start_email_sender() -> None:
+    """Reconnecting wrapper around _run_sender."""
+    delay = _INITIAL_DELAY
+    while True:
+        try:
+            await _run_sender()
+        except asyncio.CancelledError:
+            logger.info("Email sender shut down")
+            return
+        except Exception as exc:
+            logger.error(f"Email sender crashed: {exc}. Reconnecting in {delay}s…")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+        else:
+            delay = _INITIAL_DELAY
@@ -11,22 +11,36 @@ Supported providers (set via EMAIL_PROVIDER env var):
 If the chosen provider has no credentials configured the email is logged as a
 draft so nothing disappears silently.  Every outbound email is logged
 regardless of outcome.
+
+Bulk sends (``send_bulk`` / ``send_many``) reuse connections: SMTP goes
+through a pool of persistent, already-authenticated sessions, and the REST
+providers share the process-wide keep-alive HTTP client.  SendGrid batches
+messages with the same subject and body into one request with one
+personalization per message.  Messages can be templates: ``substitutions``
+({"-name-": "Ann"}) are filled in by SendGrid or, for other providers,
+locally.  Sends in flight are bounded per provider.
 """
 
+import asyncio
 import logging
-from typing import List, Optional
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
 
 import aiosmtplib
-import httpx
 from app.config import get_settings
+from app.services.http_client import get_http_client
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# SendGrid accepts at most this many personalizations per request, and at
+# most this many recipients (to + cc across all personalizations)
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+SENDGRID_MAX_RECIPIENTS = 1000
+
 # ── preset SMTP hosts ─────────────────────────────────────────────────────
 SMTP_PRESETS = {
     "gmail":     {"host": "smtp.gmail.com",           "port": 587},
@@ -40,11 +54,103 @@ SMTP_PRESETS = {
 }
 
 
+def render(text: str, substitutions: Optional[Dict[str, str]]) -> str:
+    """Fill ``substitutions`` tags into a template string."""
+    for tag, value in (substitutions or {}).items():
+        text = text.replace(tag, str(value))
+    return text
+
+
+def _recipient_count(message: dict) -> int:
+    """Addresses a message is sent to (to + cc)."""
+    to, cc = message["to"], message.get("cc") or []
+    return (1 if isinstance(to, str) else len(to)) + (1 if isinstance(cc, str) else len(cc))
+
+
+class SmtpSessionPool:
+    """
+    Persistent, authenticated SMTP sessions shared by concurrent sends.
+
+    Args:
+        hostname: SMTP server
+        port: SMTP port (STARTTLS)
+        username: Login user
+        password: Login password
+        size: Sessions open at most; also the SMTP send concurrency
+    """
+
+    def __init__(self, hostname: str, port: int, username: str, password: str, size: int = 4):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self._slots = asyncio.Semaphore(size)
+        self._idle: List[aiosmtplib.SMTP] = []
+        self.connects = 0
+
+    async def send(self, msg) -> None:
+        """Send on an idle session, retrying once on a fresh one if the server dropped it."""
+        async with self._slots:
+            for attempt in range(2):
+                smtp, reused = await self._checkout()
+                try:
+                    await smtp.send_message(msg)
+                except aiosmtplib.SMTPServerDisconnected:
+                    await self._discard(smtp)
+                    if not reused or attempt:
+                        raise
+                except BaseException:
+                    # Includes cancellation, which can leave the session mid-transaction
+                    await self._discard(smtp)
+                    raise
+                else:
+                    self._idle.append(smtp)
+                    return
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for smtp in idle:
+            try:
+                await smtp.quit()
+            except Exception:
+                smtp.close()
+
+    async def _checkout(self) -> Tuple[aiosmtplib.SMTP, bool]:
+        while self._idle:
+            smtp = self._idle.pop()
+            if smtp.is_connected:
+                return smtp, True
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            start_tls=True,
+            username=self.username,
+            password=self.password,
+        )
+        try:
+            await smtp.connect()
+        except BaseException:
+            await self._discard(smtp)
+            raise
+        self.connects += 1
+        return smtp, False
+
+    async def _discard(self, smtp: aiosmtplib.SMTP) -> None:
+        try:
+            smtp.close()
+        except Exception:
+            pass
+
+
 class EmailService:
     """Provider-agnostic email sender."""
 
     def __init__(self):
         self.provider = (settings.email_provider or "smtp").lower()
+        # Sends in flight for this provider (SMTP is bounded by its pool)
+        limits = {"sendgrid": settings.sendgrid_concurrency, "resend": settings.resend_concurrency}
+        self._provider_slots = asyncio.Semaphore(limits.get(self.provider, 1000))
+        self._smtp_pool: Optional[SmtpSessionPool] = None
 
     # ── public ────────────────────────────────────────────────────────
     def is_configured(self) -> bool:
@@ -64,16 +170,19 @@ class EmailService:
         html: bool = True,
         cc: Optional[List[str]] = None,
         attachments: Optional[List[dict]] = None,
+        substitutions: Optional[Dict[str, str]] = None,
     ) -> dict:
         """Send an email.
 
         attachments – list of {"filename": str, "content": bytes}  (SMTP only)
+        substitutions – template tags filled into subject and body
 
         Returns a status dict:
             {"sent": True,  "provider": str, "recipients": list}
             {"sent": False, "reason": str, ...}
         """
         recipients = [to] if isinstance(to, str) else to
+        subject, body = render(subject, substitutions), render(body, substitutions)
         logger.info(f"[{self.provider}] {subject} → {recipients}")
 
         if not self.is_configured():
@@ -99,12 +208,79 @@ class EmailService:
             handler = dispatch.get(self.provider)
             if not handler:
                 raise ValueError(f"Unknown email provider: {self.provider}")
-            await handler(recipients, subject, body, html, cc, attachments)
+            async with self._provider_slots:
+                await handler(recipients, subject, body, html, cc, attachments)
             return {"sent": True, "provider": self.provider, "recipients": recipients}
         except Exception as e:
             logger.error(f"[{self.provider}] send failed: {e}")
             return {"sent": False, "reason": str(e), "provider": self.provider}
 
+    async def send_bulk(
+        self,
+        messages: List[dict],
+        concurrency: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+    ) -> AsyncIterator[Tuple[int, dict]]:
+        """Send many emails, yielding ``(index, status)`` for each as soon as it is done.
+
+        messages – list of send_email keyword arguments ({"to", "subject", "body", ...})
+        concurrency – sends (or SendGrid batch requests) in flight at once
+        rate_per_second – if set, sends start at most this often
+
+        With SendGrid, messages sharing subject, body and format go out in one
+        request per 1000.  Stopping the iteration cancels what is left.
+        """
+        if self.provider == "sendgrid" and self.is_configured():
+            jobs = [self._sendgrid_batch_job(batch) for batch in self._sendgrid_batches(messages)]
+        else:
+            jobs = [self._single_job(index, message) for index, message in enumerate(messages)]
+
+        slots = asyncio.Semaphore(concurrency or settings.email_send_concurrency)
+        interval = 1.0 / rate_per_second if rate_per_second else 0.0
+        loop = asyncio.get_running_loop()
+        next_start = loop.time()
+
+        async def run(job: Callable) -> List[Tuple[int, dict]]:
+            nonlocal next_start
+            if interval:
+                now = loop.time()
+                start, next_start = max(now, next_start), max(now, next_start) + interval
+                await asyncio.sleep(start - now)
+            async with slots:
+                return await job()
+
+        tasks = [asyncio.create_task(run(job)) for job in jobs]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                for item in await finished:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def send_many(
+        self,
+        messages: List[dict],
+        concurrency: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+    ) -> List[dict]:
+        """Like send_bulk, but returns one status dict per message, in order."""
+        results: List[Optional[dict]] = [None] * len(messages)
+        async for index, result in self.send_bulk(messages, concurrency, rate_per_second):
+            results[index] = result
+        return results
+
+    async def close(self) -> None:
+        """Close pooled SMTP sessions."""
+        if self._smtp_pool is not None:
+            await self._smtp_pool.close()
+            self._smtp_pool = None
+
+    def _single_job(self, index: int, message: dict) -> Callable:
+        async def job() -> List[Tuple[int, dict]]:
+            return [(index, await self.send_email(**message))]
+        return job
+
     # ── SMTP ──────────────────────────────────────────────────────────
     async def _send_smtp(self, recipients, subject, body, html, cc, attachments):
         host, port = self._resolve_smtp()
@@ -125,14 +301,11 @@ class EmailService:
             part.add_header("Content-Disposition", "attachment", filename=att["filename"])
             msg.attach(part)
 
-        await aiosmtplib.send(
-            msg,
-            hostname=host,
-            port=port,
-            start_tls=True,
-            username=settings.smtp_user,
-            password=settings.smtp_password,
-        )
+        if self._smtp_pool is None:
+            self._smtp_pool = SmtpSessionPool(
+                host, port, settings.smtp_user, settings.smtp_password, size=settings.smtp_pool_size,
+            )
+        await self._smtp_pool.send(msg)
         logger.info(f"Sent via SMTP ({host}:{port}) → {recipients}")
 
     def _resolve_smtp(self):
@@ -143,28 +316,83 @@ class EmailService:
 
     # ── SendGrid (REST) ───────────────────────────────────────────────
     async def _send_sendgrid(self, recipients, subject, body, html, cc, _attachments):
-        personalizations: dict = {"to": [{"email": r} for r in recipients]}
+        await self._sendgrid_post([self._sendgrid_personalization(recipients, cc)], subject, body, html)
+        logger.info(f"Sent via SendGrid → {recipients}")
+
+    def _sendgrid_personalization(self, recipients, cc, substitutions=None) -> dict:
+        personalization: dict = {"to": [{"email": r} for r in recipients]}
         if cc:
-            personalizations["cc"] = [{"email": c} for c in cc]
+            personalization["cc"] = [{"email": c} for c in cc]
+        if substitutions:
+            personalization["substitutions"] = {tag: str(value) for tag, value in substitutions.items()}
+        return personalization
 
+    async def _sendgrid_post(self, personalizations: List[dict], subject: str, body: str, html: bool) -> None:
         payload = {
-            "personalizations": [personalizations],
+            "personalizations": personalizations,
             "from": {"email": settings.sendgrid_from_email or settings.smtp_user},
             "subject": subject,
             "content": [{"type": "text/html" if html else "text/plain", "value": body}],
         }
+        res = await get_http_client().post(
+            "https://api.sendgrid.com/v3/mail/send",
+            headers={
+                "Authorization": f"Bearer {settings.sendgrid_api_key}",
+                "Content-Type": "application/json",
+            },
+            json=payload,
+        )
+        res.raise_for_status()
 
-        async with httpx.AsyncClient() as client:
-            res = await client.post(
-                "https://api.sendgrid.com/v3/mail/send",
-                headers={
-                    "Authorization": f"Bearer {settings.sendgrid_api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            )
-            res.raise_for_status()
-        logger.info(f"Sent via SendGrid → {recipients}")
+    def _sendgrid_batches(self, messages: List[dict]) -> List[List[Tuple[int, dict]]]:
+        """Group messages that differ only in recipients/substitutions (attachments go alone).
+
+        A group is closed before it would exceed SendGrid's per-request
+        personalization or recipient limit.
+        """
+        groups: Dict[tuple, List[Tuple[int, dict]]] = {}
+        recipients: Dict[tuple, int] = {}
+        batches: List[List[Tuple[int, dict]]] = []
+        for index, message in enumerate(messages):
+            if message.get("attachments"):
+                batches.append([(index, message)])
+                continue
+            key = (message["subject"], message["body"], message.get("html", True))
+            count = _recipient_count(message)
+            if key in groups and recipients[key] + count > SENDGRID_MAX_RECIPIENTS:
+                batches.append(groups.pop(key))
+            if key not in groups:
+                groups[key], recipients[key] = [], 0
+            groups[key].append((index, message))
+            recipients[key] += count
+            if len(groups[key]) == SENDGRID_MAX_PERSONALIZATIONS or recipients[key] >= SENDGRID_MAX_RECIPIENTS:
+                batches.append(groups.pop(key))
+        return batches + list(groups.values())
+
+    def _sendgrid_batch_job(self, batch: List[Tuple[int, dict]]) -> Callable:
+        async def job() -> List[Tuple[int, dict]]:
+            if len(batch) == 1:
+                index, message = batch[0]
+                return [(index, await self.send_email(**message))]
+
+            first = batch[0][1]
+            recipients = [[m["to"]] if isinstance(m["to"], str) else m["to"] for _, m in batch]
+            personalizations = [
+                self._sendgrid_personalization(to, m.get("cc"), m.get("substitutions"))
+                for to, (_, m) in zip(recipients, batch)
+            ]
+            try:
+                async with self._provider_slots:
+                    await self._sendgrid_post(personalizations, first["subject"], first["body"], first.get("html", True))
+            except Exception as e:
+                logger.error(f"[sendgrid] batch of {len(batch)} failed: {e}")
+                return [(index, {"sent": False, "reason": str(e), "provider": "sendgrid"}) for index, _ in batch]
+            logger.info(f"Sent via SendGrid → {len(batch)} messages in one request")
+            return [
+                (index, {"sent": True, "provider": "sendgrid", "recipients": to})
+                for to, (index, _) in zip(recipients, batch)
+            ]
+        return job
 
     # ── Resend (REST) ─────────────────────────────────────────────────
     async def _send_resend(self, recipients, subject, body, html, cc, _attachments):
@@ -177,16 +405,15 @@ class EmailService:
         if cc:
             payload["cc"] = cc
 
-        async with httpx.AsyncClient() as client:
-            res = await client.post(
-                "https://api.resend.com/emails",
-                headers={
-                    "Authorization": f"Bearer {settings.resend_api_key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            )
-            res.raise_for_status()
+        res = await get_http_client().post(
+            "https://api.resend.com/emails",
+            headers={
+                "Authorization": f"Bearer {settings.resend_api_key}",
+                "Content-Type": "application/json",
+            },
+            json=payload,
+        )
+        res.raise_for_status()
         logger.info(f"Sent via Resend → {recipients}")
 
 
@@ -199,3 +426,11 @@ def get_email_service() -> EmailService:
     if _email_service is None:
         _email_service = EmailService()
     return _email_service
+
+
+async def reset_email_service() -> None:
+    """Close the current service's sessions; the next get_email_service() builds a new one."""
+    global _email_service
+    service, _email_service = _email_service, None
+    if service is not None:
+        await service.close()
@@ -0,0 +1,34 @@
+"""
+Shared HTTP Client
+
+One keep-alive ``httpx.AsyncClient`` per process, so outbound calls (PDF
+downloads, provider APIs) reuse TCP/TLS connections instead of paying a
+handshake per request.  Closed from the app lifespan on shutdown.
+"""
+
+from typing import Optional
+import logging
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,91 @@
+"""
+PDF Text Extraction
+
+Parses PDFs in a process pool so PyPDF2's CPU-bound text extraction never
+runs on the event loop.  PDFs are read from memory (``BytesIO``) rather than
+temp files, and large documents are split into page ranges extracted in
+parallel by several worker processes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import asyncio
+import io
+import logging
+import os
+
+from app.config import get_settings
+from app.services.http_client import get_http_client
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+# ── worker-process functions (must stay top-level to be picklable) ────────
+def _extract_pages(data: bytes, start: int = 0, stop: Optional[int] = None) -> Tuple[int, str]:
+    from PyPDF2 import PdfReader
+    reader = PdfReader(io.BytesIO(data))
+    pages = reader.pages[start:stop]
+    return len(reader.pages), ''.join(page.extract_text() or '' for page in pages)
+
+
+# ── pool ──────────────────────────────────────────────────────────────────
+def get_pdf_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        workers = settings.pdf_workers or os.cpu_count() or 2
+        _pool = ProcessPoolExecutor(max_workers=workers)
+        logger.info(f"PDF extraction pool started ({workers} processes)")
+    return _pool
+
+
+def shutdown_pdf_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# ── public ────────────────────────────────────────────────────────────────
+async def extract_pdf_text(data: bytes) -> str:
+    """
+    Extract text from an in-memory PDF.
+
+    The first ``pdf_pages_per_task`` pages are extracted straight away; if the
+    document is longer, the remaining pages are fanned out across the pool
+    in ranges of the same size.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pdf_pool()
+    per_task = settings.pdf_pages_per_task
+
+    total, first = await loop.run_in_executor(pool, _extract_pages, data, 0, per_task)
+    if total <= per_task:
+        return first
+
+    ranges = [(start, start + per_task) for start in range(per_task, total, per_task)]
+    rest = await asyncio.gather(
+        *(loop.run_in_executor(pool, _extract_pages, data, start, stop) for start, stop in ranges)
+    )
+    return first + ''.join(text for _, text in rest)
+
+
+async def download(url: str, max_bytes: Optional[int] = None) -> bytes:
+    """Stream ``url`` into memory over the shared client, enforcing a size cap."""
+    max_bytes = max_bytes or settings.pdf_max_download_bytes
+    chunks: List[bytes] = []
+    received = 0
+    async with get_http_client().stream("GET", url) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            received += len(chunk)
+            if received > max_bytes:
+                raise ValueError(f"Download exceeds {max_bytes} bytes: {url}")
+            chunks.append(chunk)
+    return b''.join(chunks)
+
+
+async def download_and_extract(url: str) -> str:
+    return await extract_pdf_text(await download(url))
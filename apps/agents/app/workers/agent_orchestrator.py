@@ -1,7 +1,13 @@
 import asyncio
 import logging
-from datetime import datetime, timedelta
-from app.db import get_conn
+from typing import List
+from app.config import get_settings
+from app.workers.agent_pool import AgentWorkerPool, parse_concurrency
+from app.workers.cron import CronEngine
+from app.workers.notifications import listen_forever
+from app.workers.trigger_engine import CHANNEL, TriggerEngine
+
+settings = get_settings()
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +18,15 @@ class AgentOrchestrator:
     def __init__(self):
         self.agents = {}
         self.running = False
+        self.triggers = TriggerEngine(self._run_triggered, retry_seconds=settings.trigger_retry_seconds)
+        self.cron = CronEngine(self._run_scheduled, retry_seconds=settings.trigger_retry_seconds)
+        self.pool = AgentWorkerPool(
+            self._execute_agent,
+            max_workers=settings.orchestrator_max_workers,
+            default_concurrency=settings.orchestrator_agent_concurrency,
+            concurrency=parse_concurrency(settings.orchestrator_agent_concurrency_overrides),
+        )
+        self._tasks = []
         
         # Try to load agents, but don't fail if they're not available
         try:
@@ -32,6 +47,12 @@ class AgentOrchestrator:
         except Exception as e:
             logger.warning(f"Could not load TaskEscalatorAgent: {e}")
         
+        try:
+            from app.agents.approval_nudger import ApprovalNudgerAgent
+            self.agents['approval_nudger'] = ApprovalNudgerAgent()
+        except Exception as e:
+            logger.warning(f"Could not load ApprovalNudgerAgent: {e}")
+        
         try:
             from app.agents.team_coordinator import TeamCoordinatorAgent
             self.agents['team_coordinator'] = TeamCoordinatorAgent()
@@ -43,131 +64,62 @@ class AgentOrchestrator:
         self.running = True
         logger.info("Agent Orchestrator started")
         
-        # Run scheduled agents
-        asyncio.create_task(self._run_scheduled_agents())
+        # Row-change notifications feed both engines
+        self._tasks.append(asyncio.create_task(listen_forever(
+            CHANNEL,
+            [self.triggers.notify, self.cron.notify],
+            on_connect=self._reload_engines,
+        )))
+        
+        # Run scheduled agents at their cron times
+        self._tasks.append(asyncio.create_task(self.cron.run()))
         
-        # Monitor for event-driven triggers
-        asyncio.create_task(self._monitor_event_triggers())
+        # Fire event-driven triggers at row deadlines
+        self._tasks.append(asyncio.create_task(self.triggers.run_timer()))
     
     async def stop(self):
         """Stop the orchestrator"""
         self.running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.pool.stop()
         logger.info("Agent Orchestrator stopped")
     
-    async def _run_scheduled_agents(self):
-        """Run agents on schedule"""
-        while self.running:
-            try:
-                async with get_conn() as conn:
-                    # Get all active schedules
-                    schedules = await conn.fetch(
-                        '''SELECT * FROM "AgentSchedule" 
-                           WHERE "isActive" = true
-                           AND ("nextRun" IS NULL OR "nextRun" <= NOW())'''
-                    )
-                    
-                    for schedule in schedules:
-                        agent_type = schedule['agentType']
-                        if agent_type in self.agents:
-                            await self._execute_agent(agent_type, schedule)
-                
-                # Check every 30 seconds
-                await asyncio.sleep(30)
-            except Exception as e:
-                logger.error(f"Error in scheduled agent execution: {e}")
-                await asyncio.sleep(30)
-    
-    async def _monitor_event_triggers(self):
-        """Monitor for event-driven agent triggers"""
-        while self.running:
-            try:
-                await self._check_task_events()
-                await self._check_approval_events()
-                await self._check_broadcast_events()
-                
-                # Check every 10 seconds
-                await asyncio.sleep(10)
-            except Exception as e:
-                logger.error(f"Error in event monitoring: {e}")
-                await asyncio.sleep(10)
+    def _reload_engines(self):
+        """Reload engine state after (re)connecting; changes may have been missed"""
+        self.triggers.reload_all()
+        self.cron.reload_all()
     
-    async def _check_task_events(self):
-        """Check for task-related events"""
-        async with get_conn() as conn:
-            # Check for stuck tasks
-            stuck_threshold = datetime.utcnow() - timedelta(hours=48)
-            stuck_tasks = await conn.fetch(
-                '''SELECT COUNT(*) as count FROM "Task" 
-                   WHERE "status" = 'ACTIVE'::\"TaskStatus\"
-                   AND "lastUpdated" < $1
-                   AND "healthStatus" != 'CRITICAL'::\"HealthStatus\"''',
-                stuck_threshold
-            )
-            
-            if stuck_tasks[0]['count'] > 0:
-                logger.info(f"Triggering task_escalator for {stuck_tasks[0]['count']} stuck tasks")
-                await self._execute_agent('task_escalator', None)
+    def stats(self) -> dict:
+        """Worker pool run times plus trigger and cron engine state"""
+        return {
+            "pool": self.pool.stats(),
+            "triggers": self.triggers.stats(),
+            "cron": self.cron.stats(),
+        }
     
-    async def _check_approval_events(self):
-        """Check for approval-related events"""
-        async with get_conn() as conn:
-            # Check for overdue approvals
-            overdue_approvals = await conn.fetch(
-                '''SELECT COUNT(*) as count FROM "ApprovalStep" 
-                   WHERE "status" = 'PENDING'::\"ApprovalStatus\"
-                   AND "deadline" < NOW()
-                   AND ("lastNudgedAt" IS NULL OR "lastNudgedAt" < NOW() - INTERVAL '24 hours')'''
-            )
-            
-            if overdue_approvals[0]['count'] > 0:
-                logger.info(f"Triggering approval_nudger for {overdue_approvals[0]['count']} overdue approvals")
-                await self._execute_agent('approval_nudger', None)
+    async def _run_scheduled(self, agent_type: str, schedule_ids: List[str]):
+        """Queue an agent whose schedules are due (the cron engine advances them)"""
+        logger.info(f"{len(schedule_ids)} schedules due for {agent_type}")
+        self.pool.submit(agent_type)
     
-    async def _check_broadcast_events(self):
-        """Check for broadcast-related events"""
-        async with get_conn() as conn:
-            # Check for scheduled broadcasts
-            scheduled_broadcasts = await conn.fetch(
-                '''SELECT COUNT(*) as count FROM "BroadcastEmail" 
-                   WHERE "status" = 'SCHEDULED'::\"BroadcastStatus\"
-                   AND "scheduledFor" <= NOW()'''
-            )
-            
-            if scheduled_broadcasts[0]['count'] > 0:
-                logger.info(f"Triggering broadcast_agent for {scheduled_broadcasts[0]['count']} scheduled broadcasts")
-                await self._execute_agent('broadcast_agent', None)
+    async def _run_triggered(self, agent_type: str, ids: List[str]):
+        """Queue an agent whose trigger rows reached their deadline"""
+        logger.info(f"{len(ids)} rows due for {agent_type}")
+        # The agents select every due row themselves, so one run covers all ids
+        self.pool.submit(agent_type)
     
-    async def _execute_agent(self, agent_type: str, schedule: dict = None):
-        """Execute a single agent"""
-        try:
-            agent = self.agents.get(agent_type)
-            if not agent:
-                logger.warning(f"Agent {agent_type} not found")
-                return
-            
-            logger.info(f"Executing agent: {agent_type}")
-            await agent.run()
-            
-            # Update schedule if provided
-            if schedule:
-                await self._update_schedule(schedule['id'])
-        except Exception as e:
-            logger.error(f"Error executing agent {agent_type}: {e}")
-    
-    async def _update_schedule(self, schedule_id: str):
-        """Update schedule after execution"""
-        try:
-            async with get_conn() as conn:
-                # Calculate next run based on cron expression
-                # For now, just update lastRun
-                await conn.execute(
-                    '''UPDATE "AgentSchedule" 
-                       SET "lastRun" = NOW(), "updatedAt" = NOW()
-                       WHERE "id" = $1''',
-                    schedule_id
-                )
-        except Exception as e:
-            logger.error(f"Error updating schedule {schedule_id}: {e}")
+    async def _execute_agent(self, agent_type: str, key=None):
+        """Execute a single agent (called by the worker pool)"""
+        agent = self.agents.get(agent_type)
+        if not agent:
+            logger.warning(f"Agent {agent_type} not found")
+            return
+        
+        logger.info(f"Executing agent: {agent_type}")
+        await agent.run()
 
 
 # Global orchestrator instance
@@ -0,0 +1,221 @@
+"""
+Agent Worker Pool
+
+Execution layer between the orchestrator's triggers and the agents:
+
+  * Each agent type has its own concurrency limit, and a global limit caps
+    runs in flight, so a slow agent type can only occupy its own slots and
+    independent agents run in parallel.
+  * Single-flight per ``(agent_type, key)``: a request for a run that is
+    already queued is dropped, and requests made while it is running
+    collapse into one follow-up run (the agents scan for all due work, so
+    one later run covers every request).
+  * Per-type run-time histograms, exposed through ``stats()``.
+"""
+
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds, in seconds
+_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class RunHistogram:
+    """Fixed-bucket run-time histogram (cumulative counts, Prometheus style)."""
+
+    def __init__(self, buckets: Tuple[float, ...] = _BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (``max`` for the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        cumulative = []
+        seen = 0
+        for bound, n in zip(self.buckets + (float("inf"),), self.counts):
+            seen += n
+            cumulative.append({"le": "+Inf" if bound == float("inf") else bound, "count": seen})
+        return {
+            "count": self.count,
+            "avg_ms": round(1000 * self.total / self.count, 2) if self.count else 0.0,
+            "p50_ms": round(1000 * self.quantile(0.5), 2) if self.count else 0.0,
+            "p95_ms": round(1000 * self.quantile(0.95), 2) if self.count else 0.0,
+            "max_ms": round(1000 * self.max, 2),
+            "buckets": cumulative,
+        }
+
+
+def parse_concurrency(spec: str) -> Dict[str, int]:
+    """``"broadcast_agent=2,task_escalator=1"`` → per-type limits (bad entries are skipped)."""
+    limits = {}
+    for entry in spec.split(","):
+        name, _, value = entry.partition("=")
+        try:
+            limits[name.strip()] = max(1, int(value))
+        except ValueError:
+            if entry.strip():
+                logger.warning(f"Ignoring agent concurrency entry '{entry.strip()}'")
+    return limits
+
+
+class AgentWorkerPool:
+    """
+    Queues agent runs and executes them with per-type bounded concurrency.
+
+    Args:
+        runner: Coroutine function ``(agent_type, key)`` performing one run
+        max_workers: Runs in flight across all agent types
+        default_concurrency: Runs in flight per agent type, unless overridden
+        concurrency: Per-type overrides of ``default_concurrency``
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[str, Optional[Hashable]], Awaitable[Any]],
+        max_workers: int = 8,
+        default_concurrency: int = 1,
+        concurrency: Optional[Dict[str, int]] = None,
+    ):
+        self._runner = runner
+        self.max_workers = max_workers
+        self.default_concurrency = default_concurrency
+        self.concurrency = dict(concurrency or {})
+        self._workers = asyncio.Semaphore(max_workers)
+        self._lanes: Dict[str, asyncio.Semaphore] = {}
+        self._queued: Set[Tuple[str, Hashable]] = set()
+        self._running: Set[Tuple[str, Hashable]] = set()
+        self._rerun: Set[Tuple[str, Hashable]] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.histograms: Dict[str, RunHistogram] = {}
+        self.counters: Dict[str, Dict[str, int]] = {}
+
+    def submit(self, agent_type: str, key: Optional[Hashable] = None) -> bool:
+        """
+        Request a run; returns whether a new run was queued.
+
+        A request for a run already queued is dropped; one for a run in
+        progress schedules a single follow-up run.
+        """
+        flight = (agent_type, key)
+        counters = self._counters(agent_type)
+        counters["requested"] += 1
+        if flight in self._queued:
+            counters["coalesced"] += 1
+            return False
+        if flight in self._running:
+            counters["coalesced"] += 1
+            self._rerun.add(flight)
+            return False
+
+        self._queued.add(flight)
+        task = asyncio.create_task(self._run(flight))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def drain(self) -> None:
+        """Wait until every queued and running run (and follow-up) finished."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def stop(self) -> None:
+        """Cancel queued and running runs."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        types = set(self.counters) | {agent_type for agent_type, _ in self._queued | self._running}
+        return {
+            "max_workers": self.max_workers,
+            "agents": {
+                agent_type: {
+                    "concurrency": self._limit(agent_type),
+                    "queued": sum(1 for t, _ in self._queued if t == agent_type),
+                    "running": sum(1 for t, _ in self._running if t == agent_type),
+                    **self._counters(agent_type),
+                    "run_time": self._histogram(agent_type).summary(),
+                }
+                for agent_type in sorted(types)
+            },
+        }
+
+    # ── internals ─────────────────────────────────────────────────────
+    async def _run(self, flight: Tuple[str, Hashable]) -> None:
+        agent_type, key = flight
+        # Take the type's own slot before a global one, so a saturated type
+        # never holds global slots while it waits
+        async with self._lane(agent_type):
+            async with self._workers:
+                self._queued.discard(flight)
+                self._running.add(flight)
+                try:
+                    while True:
+                        await self._run_once(agent_type, key)
+                        if flight not in self._rerun:
+                            break
+                        self._rerun.discard(flight)
+                finally:
+                    self._running.discard(flight)
+                    self._rerun.discard(flight)
+
+    async def _run_once(self, agent_type: str, key: Optional[Hashable]) -> None:
+        counters = self._counters(agent_type)
+        started = time.perf_counter()
+        try:
+            await self._runner(agent_type, key)
+            counters["succeeded"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            counters["failed"] += 1
+            logger.error(f"Error executing agent {agent_type}: {e}")
+        finally:
+            self._histogram(agent_type).observe(time.perf_counter() - started)
+
+    def _limit(self, agent_type: str) -> int:
+        return self.concurrency.get(agent_type, self.default_concurrency)
+
+    def _lane(self, agent_type: str) -> asyncio.Semaphore:
+        lane = self._lanes.get(agent_type)
+        if lane is None:
+            lane = self._lanes[agent_type] = asyncio.Semaphore(self._limit(agent_type))
+        return lane
+
+    def _histogram(self, agent_type: str) -> RunHistogram:
+        histogram = self.histograms.get(agent_type)
+        if histogram is None:
+            histogram = self.histograms[agent_type] = RunHistogram()
+        return histogram
+
+    def _counters(self, agent_type: str) -> Dict[str, int]:
+        counters = self.counters.get(agent_type)
+        if counters is None:
+            counters = self.counters[agent_type] = {
+                "requested": 0, "coalesced": 0, "succeeded": 0, "failed": 0,
+            }
+        return counters
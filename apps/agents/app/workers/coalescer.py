@@ -0,0 +1,139 @@
+"""
+Agent Event Coalescing
+
+Row-level triggers turn a bulk UPDATE into one event per row; dispatching
+each to its own agent run costs one query and one email per row.  The
+``EventCoalescer`` sits between the stream consumer and the agents:
+
+  * Events of the same type arriving within ``window_seconds`` of the first
+    one are collected into a batch, keyed by their entity id, so repeats of
+    the same entity collapse into one (the latest event wins).
+  * A batch is flushed when its window closes or it reaches ``max_batch``
+    entities, and its batch handler runs once with every event in it.
+  * ``submit`` returns only when the event's batch has been handled and
+    raises if the handler failed, so the caller acknowledges (or retries)
+    each stream entry exactly as if it had been handled on its own.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+BatchHandler = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+
+class _Batch:
+    def __init__(self, event_type: str):
+        self.event_type = event_type
+        self.events: Dict[Hashable, Dict[str, Any]] = {}
+        self.received = 0
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class EventCoalescer:
+    """
+    Groups events by type and entity key and hands each group to one handler call.
+
+    Args:
+        handlers: Event type → (event field holding the entity key, batch
+            handler receiving the deduplicated events)
+        window_seconds: How long a batch stays open after its first event
+        max_batch: Distinct entities that flush a batch before its window ends
+        concurrency: Batch handlers running at once
+    """
+
+    def __init__(
+        self,
+        handlers: Dict[str, Tuple[str, BatchHandler]],
+        window_seconds: float = 0.5,
+        max_batch: int = 500,
+        concurrency: int = 4,
+    ):
+        self.handlers = dict(handlers)
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._slots = asyncio.Semaphore(concurrency)
+        self._open: Dict[str, _Batch] = {}
+        self._tasks: set = set()
+        self.events_received = 0
+        self.batches_run = 0
+        self.batches_failed = 0
+
+    def handles(self, event_type: Optional[str]) -> bool:
+        return event_type in self.handlers
+
+    async def submit(self, event: Dict[str, Any]) -> None:
+        """
+        Add ``event`` to its type's open batch and wait for that batch to be handled.
+
+        Raises:
+            KeyError: No batch handler is registered for the event type
+            Exception: Whatever the batch handler raised
+        """
+        event_type = event.get("type")
+        key_field, _ = self.handlers[event_type]
+        batch = self._open.get(event_type)
+        if batch is None:
+            batch = self._open[event_type] = _Batch(event_type)
+            batch.timer = asyncio.get_running_loop().call_later(self.window_seconds, self._flush, batch)
+
+        batch.events[event.get(key_field)] = event
+        batch.received += 1
+        self.events_received += 1
+        if len(batch.events) >= self.max_batch:
+            self._flush(batch)
+        # Shielded: one cancelled waiter must not cancel the batch for the rest
+        await asyncio.shield(batch.done)
+
+    async def flush_all(self) -> None:
+        """Flush every open batch and wait for all batches to finish."""
+        for batch in list(self._open.values()):
+            self._flush(batch)
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "events_received": self.events_received,
+            "batches_run": self.batches_run,
+            "batches_failed": self.batches_failed,
+            "open": {event_type: len(batch.events) for event_type, batch in self._open.items()},
+        }
+
+    # ── internals ─────────────────────────────────────────────────────
+    def _flush(self, batch: _Batch) -> None:
+        if self._open.get(batch.event_type) is not batch:
+            return  # already flushed
+        del self._open[batch.event_type]
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: _Batch) -> None:
+        _, handler = self.handlers[batch.event_type]
+        events = list(batch.events.values())
+        async with self._slots:
+            logger.info(
+                f"Handling {len(events)} {batch.event_type} entities "
+                f"coalesced from {batch.received} events"
+            )
+            try:
+                await handler(events)
+            except asyncio.CancelledError:
+                batch.done.cancel()
+                raise
+            except Exception as e:
+                self.batches_failed += 1
+                logger.error(f"Batch of {len(events)} {batch.event_type} events failed: {e}")
+                batch.done.set_exception(e)
+                # Retrieved here so an unawaited failure is not reported again
+                batch.done.exception()
+            else:
+                batch.done.set_result(None)
+            finally:
+                self.batches_run += 1
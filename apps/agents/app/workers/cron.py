@@ -0,0 +1,240 @@
+"""
+Cron Engine for "AgentSchedule"
+
+Evaluates each schedule's ``cronExpression`` (standard five-field crontab,
+UTC) and persists ``nextRun``, then sleeps until the earliest due schedule
+instead of polling:
+
+  * At startup the active schedules are loaded once.  A schedule without a
+    valid ``nextRun`` gets one computed and saved; one whose ``nextRun``
+    passed while nothing was running runs once, not once per missed slot.
+  * Schedules due together run their agent type once, and all of them
+    advance ``lastRun``/``nextRun`` in a single UPDATE.
+  * Changes made through /agents/schedule (or anywhere else) arrive as
+    ``row_changed`` notifications from app/db/triggers.sql carrying the
+    row, so the engine updates a single timer without querying.
+"""
+
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import time
+
+from apscheduler.triggers.cron import CronTrigger
+
+from app.db import get_conn
+from app.workers.deadlines import DeadlineScheduler
+from app.workers.trigger_engine import ROW_CHANGED, to_timestamp
+
+logger = logging.getLogger(__name__)
+
+TABLE = "AgentSchedule"
+
+
+@lru_cache(maxsize=1024)
+def parse_cron(expression: str) -> CronTrigger:
+    """
+    Compile a crontab expression (evaluated in UTC).
+
+    Raises:
+        ValueError: The expression is not a valid five-field crontab
+    """
+    return CronTrigger.from_crontab(expression.strip(), timezone=timezone.utc)
+
+
+def next_run(expression: str, after: datetime) -> datetime:
+    """First fire time strictly after ``after`` (both naive UTC)."""
+    start = after.replace(tzinfo=timezone.utc) + timedelta(microseconds=1)
+    fire_time = parse_cron(expression).get_next_fire_time(None, start)
+    return fire_time.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class CronEngine:
+    """
+    Runs ``AgentSchedule`` rows at their cron times.
+
+    Args:
+        fire: Coroutine function run with an agent type and the ids of its
+            due schedules
+        retry_seconds: Delay before retrying a failed database write
+    """
+
+    def __init__(self, fire: Callable[[str, List[str]], Awaitable[None]], retry_seconds: float = 60.0):
+        self._fire = fire
+        self.retry_seconds = retry_seconds
+        self.deadlines = DeadlineScheduler()
+        # schedule id -> (agentType, cronExpression)
+        self.schedules: Dict[str, Tuple[str, str]] = {}
+        self._stale = True
+        self._unscheduled: set = set()
+        self._wake = asyncio.Event()
+        self.runs: Dict[str, int] = {}
+
+    # ── inputs ────────────────────────────────────────────────────────
+    def notify(self, payload: str) -> None:
+        """Handle one ``agent_events`` payload; only AgentSchedule row changes matter."""
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        if not isinstance(event, dict) or event.get("type") != ROW_CHANGED or event.get("table") != TABLE:
+            return
+
+        schedule_id = event.get("id")
+        if event.get("op") != "DELETE" and "isActive" not in event:
+            # Not from the current trigger function: fall back to a reload
+            self.reload_all()
+            return
+        if event.get("op") == "DELETE" or not event.get("isActive"):
+            self.schedules.pop(schedule_id, None)
+            self.deadlines.cancel(schedule_id)
+            return
+
+        self.schedules[schedule_id] = (event.get("agentType"), event.get("cronExpression") or "")
+        try:
+            due = to_timestamp(event.get("nextRun"))
+        except ValueError:
+            due = None
+        earliest = self.deadlines.peek()
+        if due is None:
+            self.deadlines.cancel(schedule_id)
+            self._unscheduled.add(schedule_id)
+            self._wake.set()
+        else:
+            self.deadlines.schedule(schedule_id, due)
+            if earliest is None or due < earliest:
+                self._wake.set()
+
+    def reload_all(self) -> None:
+        """Reload every schedule on the next loop iteration."""
+        self._stale = True
+        self._wake.set()
+
+    def stats(self) -> Dict[str, object]:
+        due = self.deadlines.peek()
+        return {
+            "schedules": len(self.schedules),
+            "next_run": datetime.fromtimestamp(due, timezone.utc).isoformat() if due else None,
+            "runs": dict(self.runs),
+        }
+
+    # ── loop ──────────────────────────────────────────────────────────
+    async def run(self) -> None:
+        """Sleep until the earliest due schedule (or a change), run it, repeat."""
+        while True:
+            try:
+                if self._stale:
+                    await self._reload()
+                if self._unscheduled:
+                    await self._schedule_missing()
+                if await self._run_due():
+                    continue
+            except Exception as e:
+                logger.error(f"Cron engine database error: {e}")
+                await asyncio.sleep(self.retry_seconds)
+                continue
+
+            self._wake.clear()
+            if self._stale or self._unscheduled:
+                continue
+            due = self.deadlines.peek()
+            timeout = None if due is None else max(0.0, due - time.time())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _reload(self) -> None:
+        rows = await self._load_schedules()
+        self.schedules = {}
+        self.deadlines.clear()
+        self._unscheduled = set()
+        for row in rows:
+            self.schedules[row["id"]] = (row["agentType"], row["cronExpression"])
+            if row["nextRun"] is None:
+                self._unscheduled.add(row["id"])
+            else:
+                self.deadlines.schedule(row["id"], to_timestamp(row["nextRun"]))
+        self._stale = False
+        logger.info(f"Loaded {len(rows)} active agent schedules ({len(self._unscheduled)} without nextRun)")
+
+    async def _schedule_missing(self) -> None:
+        """Compute and save nextRun for schedules that have none."""
+        now = datetime.utcnow()
+        updates = []
+        for schedule_id in self._unscheduled:
+            expression = self.schedules.get(schedule_id, (None, ""))[1]
+            upcoming = self._next(schedule_id, expression, now)
+            if upcoming is not None:
+                updates.append((schedule_id, upcoming))
+        await self._save(updates, ran=False)
+        self._unscheduled = set()
+        for schedule_id, upcoming in updates:
+            self.deadlines.schedule(schedule_id, to_timestamp(upcoming))
+
+    async def _run_due(self) -> bool:
+        ids = self.deadlines.pop_due(time.time())
+        if not ids:
+            return False
+
+        by_agent: Dict[str, List[str]] = {}
+        for schedule_id in ids:
+            if schedule_id in self.schedules:
+                by_agent.setdefault(self.schedules[schedule_id][0], []).append(schedule_id)
+
+        for agent_type, schedule_ids in by_agent.items():
+            self.runs[agent_type] = self.runs.get(agent_type, 0) + 1
+            logger.info(f"Running {agent_type} for {len(schedule_ids)} due schedules")
+            try:
+                await self._fire(agent_type, schedule_ids)
+            except Exception as e:
+                logger.error(f"Scheduled agent {agent_type} failed: {e}")
+
+        now = datetime.utcnow()
+        updates = []
+        for schedule_ids in by_agent.values():
+            for schedule_id in schedule_ids:
+                upcoming = self._next(schedule_id, self.schedules[schedule_id][1], now)
+                if upcoming is not None:
+                    updates.append((schedule_id, upcoming))
+        try:
+            await self._save(updates, ran=True)
+        finally:
+            # Keep the in-memory timers even if the write failed, so a
+            # database outage cannot turn into a burst of repeated runs
+            for schedule_id, upcoming in updates:
+                self.deadlines.schedule(schedule_id, to_timestamp(upcoming))
+        return True
+
+    def _next(self, schedule_id: str, expression: str, after: datetime) -> Optional[datetime]:
+        try:
+            return next_run(expression, after)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Schedule {schedule_id} has an invalid cron expression '{expression}': {e}")
+            return None
+
+    # ── database ──────────────────────────────────────────────────────
+    async def _load_schedules(self) -> List[Dict]:
+        async with get_conn() as conn:
+            rows = await conn.fetch(
+                '''SELECT "id", "agentType", "cronExpression", "nextRun"
+                   FROM "AgentSchedule" WHERE "isActive" = true'''
+            )
+        return [dict(r) for r in rows]
+
+    async def _save(self, updates: List[Tuple[str, datetime]], ran: bool) -> None:
+        if not updates:
+            return
+        last_run = ', "lastRun" = NOW()' if ran else ''
+        async with get_conn() as conn:
+            await conn.execute(
+                f'''UPDATE "AgentSchedule" AS s
+                    SET "nextRun" = u."nextRun"{last_run}, "updatedAt" = NOW()
+                    FROM unnest($1::text[], $2::timestamp[]) AS u("id", "nextRun")
+                    WHERE s."id" = u."id"''',
+                [schedule_id for schedule_id, _ in updates],
+                [upcoming for _, upcoming in updates],
+            )
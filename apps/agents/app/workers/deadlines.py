@@ -0,0 +1,84 @@
+"""
+Deadline Scheduler
+
+Min-heap of ``(due, key)`` entries plus a ``key -> due`` map, for "wake me at
+time T" events keyed by row id:
+
+  * ``schedule`` (insert or move) pushes a new entry: O(log n).
+  * ``cancel`` only drops the map entry: O(1).  Heap entries whose due no
+    longer matches the map are skipped when they reach the top, and the heap
+    is rebuilt once such stale entries outnumber live ones, so memory stays
+    proportional to the pending deadlines.
+  * ``pop_due`` removes every key due by a given time: O(log n) each.
+
+Times are POSIX seconds (floats), which keeps entries small enough for
+hundreds of thousands of pending deadlines.
+"""
+
+from typing import Dict, Hashable, List, Optional, Tuple
+import heapq
+
+
+class DeadlineScheduler:
+    """Keyed deadlines, earliest first."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, Hashable]] = []
+        self._due: Dict[Hashable, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._due
+
+    def get(self, key: Hashable) -> Optional[float]:
+        return self._due.get(key)
+
+    def schedule(self, key: Hashable, due: float) -> None:
+        """Set (or move) ``key``'s deadline."""
+        if self._due.get(key) == due:
+            return
+        self._due[key] = due
+        heapq.heappush(self._heap, (due, key))
+        self._maybe_compact()
+
+    def cancel(self, key: Hashable) -> bool:
+        """Forget ``key``; returns whether it was scheduled."""
+        if self._due.pop(key, None) is None:
+            return False
+        self._maybe_compact()
+        return True
+
+    def clear(self) -> None:
+        self._heap = []
+        self._due = {}
+
+    def peek(self) -> Optional[float]:
+        """Earliest pending deadline, or ``None``."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[Hashable]:
+        """Remove and return every key due at or before ``now``, earliest first."""
+        keys = []
+        heap = self._heap
+        while heap:
+            due, key = heap[0]
+            if due > now:
+                break
+            heapq.heappop(heap)
+            if self._due.get(key) == due:
+                del self._due[key]
+                keys.append(key)
+        return keys
+
+    def _drop_stale(self) -> None:
+        heap = self._heap
+        while heap and self._due.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+
+    def _maybe_compact(self) -> None:
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(due, key) for key, due in self._due.items()]
+            heapq.heapify(self._heap)
@@ -0,0 +1,288 @@
+"""
+Agent Event Bus on Redis Streams
+
+Durable replacement for the 'agent_events' pub/sub channel:
+
+  * ``publish_event`` appends a payload to the stream (capped at
+    ``event_stream_maxlen`` entries).  Every replica's pg_listener receives
+    the same notification, so each payload is claimed with a short-lived
+    ``SET NX`` key first and only one replica appends it; the key is
+    released again if the append fails.
+  * ``StreamConsumer`` reads through a consumer group, so each event goes to
+    one consumer across all replicas.  Reads are batched (``XREADGROUP
+    COUNT``), handlers run concurrently behind a semaphore, and an entry is
+    acknowledged only after its handler succeeded.
+  * Entries left unacknowledged (handler failed, consumer died) are
+    reclaimed with ``XAUTOCLAIM`` once idle for ``event_claim_idle_ms`` and
+    retried; after ``event_max_deliveries`` attempts they are moved to a
+    dead-letter stream.  With ``keep_alive`` a consumer keeps re-claiming the
+    entries it holds, so handlers that are slow or still queued for a slot
+    are not taken over by another consumer and run twice.
+
+Events sent while no worker is running wait in the stream instead of being
+lost.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_DEDUPE_PREFIX = "agent_events:seen:"
+
+
+def _entry_order(entry_id: str) -> Tuple[int, int]:
+    milliseconds, _, sequence = entry_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+def consumer_name() -> str:
+    """Unique per process, so a restarted worker's old entries are reclaimed, not re-read."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def publish_event(redis, payload: str, dedupe_seconds: Optional[float] = None) -> Optional[str]:
+    """
+    Append ``payload`` to the event stream.
+
+    Returns:
+        The entry id, or ``None`` if another replica already published the
+        same payload within ``dedupe_seconds``
+    """
+    dedupe_seconds = settings.event_publish_dedupe_seconds if dedupe_seconds is None else dedupe_seconds
+    dedupe_key = None
+    if dedupe_seconds > 0:
+        dedupe_key = _DEDUPE_PREFIX + hashlib.sha1(payload.encode("utf-8")).hexdigest()
+        if not await redis.set(dedupe_key, 1, nx=True, px=int(dedupe_seconds * 1000)):
+            return None
+    try:
+        return await redis.xadd(
+            settings.event_stream,
+            {"data": payload},
+            maxlen=settings.event_stream_maxlen,
+            approximate=True,
+        )
+    except BaseException:
+        # Release the claim so another replica's copy can still be published
+        if dedupe_key is not None:
+            await redis.delete(dedupe_key)
+        raise
+
+
+class StreamConsumer:
+    """
+    Consumer-group reader dispatching stream entries to ``handler``.
+
+    Args:
+        redis: redis.asyncio client created with ``decode_responses=True``
+        handler: Coroutine function receiving the decoded event; raising
+            leaves the entry pending for a retry
+        stream: Stream key
+        group: Consumer group shared by every worker
+        consumer: This consumer's name within the group
+        batch_size: Entries per XREADGROUP / XAUTOCLAIM call
+        block_ms: How long a read waits for new entries
+        concurrency: Handlers running at once
+        claim_idle_ms: Idle time after which a pending entry is reclaimed
+        max_deliveries: Attempts before an entry is dead-lettered
+        delete_acked: Delete entries from the stream once acknowledged, for
+            work queues that must not be trimmed by length
+        keep_alive: Reset the idle time of held entries (XCLAIM JUSTID) every
+            third of ``claim_idle_ms``; only a consumer that died loses its
+            entries, so a hung handler keeps them until its process exits
+    """
+
+    def __init__(
+        self,
+        redis,
+        handler: Callable[[Dict[str, Any]], Awaitable[None]],
+        stream: Optional[str] = None,
+        group: Optional[str] = None,
+        consumer: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        block_ms: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        claim_idle_ms: Optional[int] = None,
+        max_deliveries: Optional[int] = None,
+        delete_acked: bool = False,
+        keep_alive: bool = False,
+    ):
+        self.redis = redis
+        self.handler = handler
+        self.stream = stream or settings.event_stream
+        self.group = group or settings.event_stream_group
+        self.consumer = consumer or consumer_name()
+        self.batch_size = batch_size or settings.event_batch_size
+        self.block_ms = settings.event_block_ms if block_ms is None else block_ms
+        self.claim_idle_ms = claim_idle_ms or settings.event_claim_idle_ms
+        self.max_deliveries = max_deliveries or settings.event_max_deliveries
+        self.delete_acked = delete_acked
+        self.keep_alive = keep_alive
+        self.dead_letter_stream = f"{self.stream}:dead"
+        self._slots = asyncio.Semaphore(concurrency or settings.event_concurrency)
+        self._tasks: set = set()
+        self._in_flight: set = set()
+        self._last_claim = 0.0
+        self.acked = 0
+        self.failed = 0
+        self.reclaimed = 0
+        self.dead_lettered = 0
+
+    async def run(self) -> None:
+        """Read and dispatch until cancelled; in-flight handlers are cancelled too."""
+        await self.ensure_group()
+        keep_alive = asyncio.create_task(self._keep_alive()) if self.keep_alive else None
+        try:
+            while True:
+                if time.monotonic() - self._last_claim >= self.claim_idle_ms / 1000:
+                    await self.reclaim()
+                await self.read_batch()
+        finally:
+            if keep_alive is not None:
+                keep_alive.cancel()
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def ensure_group(self) -> None:
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+            logger.info(f"Created consumer group '{self.group}' on '{self.stream}'")
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def read_batch(self) -> int:
+        """Read up to ``batch_size`` new entries and dispatch them; returns how many."""
+        response = await self.redis.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"}, count=self.batch_size, block=self.block_ms,
+        )
+        entries = [entry for _, stream_entries in response or [] for entry in stream_entries]
+        # Held from here, including while the reader waits for a free slot
+        self._in_flight.update(entry_id for entry_id, _ in entries)
+        for entry_id, fields in entries:
+            await self._dispatch(entry_id, fields)
+        return len(entries)
+
+    async def reclaim(self) -> int:
+        """Take over entries other consumers left pending too long; returns how many."""
+        self._last_claim = time.monotonic()
+        claimed: List[Tuple[str, Optional[Dict[str, str]]]] = []
+        start = "0-0"
+        while True:
+            result = await self.redis.xautoclaim(
+                self.stream, self.group, self.consumer, self.claim_idle_ms, start_id=start, count=self.batch_size,
+            )
+            start, entries = result[0], result[1]
+            claimed.extend(entries)
+            if start in ("0-0", b"0-0") or not entries:
+                break
+        if not claimed:
+            return 0
+
+        deliveries = await self._deliveries([entry_id for entry_id, _ in claimed])
+        retries = []
+        for entry_id, fields in claimed:
+            if entry_id in self._in_flight:
+                # Our own handler is still running it
+                continue
+            if not fields:
+                # Trimmed from the stream while pending: nothing left to run
+                await self._ack(entry_id)
+            elif deliveries.get(entry_id, 0) > self.max_deliveries:
+                await self._dead_letter(entry_id, fields, deliveries[entry_id])
+            else:
+                retries.append((entry_id, fields))
+        self._in_flight.update(entry_id for entry_id, _ in retries)
+        for entry_id, fields in retries:
+            self.reclaimed += 1
+            await self._dispatch(entry_id, fields)
+        logger.info(f"Reclaimed {len(claimed)} pending events from '{self.stream}'")
+        return len(claimed)
+
+    async def drain(self) -> None:
+        """Wait for every dispatched handler to finish."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "consumer": self.consumer,
+            "in_flight": len(self._tasks),
+            "acked": self.acked,
+            "failed": self.failed,
+            "reclaimed": self.reclaimed,
+            "dead_lettered": self.dead_lettered,
+        }
+
+    # ── internals ─────────────────────────────────────────────────────
+    async def _dispatch(self, entry_id: str, fields: Dict[str, str]) -> None:
+        # Blocks the reader while every slot is busy: natural backpressure
+        await self._slots.acquire()
+        task = asyncio.create_task(self._handle(entry_id, fields))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _handle(self, entry_id: str, fields: Dict[str, str]) -> None:
+        try:
+            try:
+                event = json.loads(fields["data"])
+            except (KeyError, TypeError, ValueError):
+                logger.error(f"Dropping malformed event {entry_id}: {fields}")
+            else:
+                await self.handler(event)
+            await self._ack(entry_id)
+            self.acked += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Left pending: reclaimed and retried once idle long enough
+            self.failed += 1
+            logger.error(f"Event {entry_id} failed, will be retried: {e}")
+        finally:
+            self._in_flight.discard(entry_id)
+            self._slots.release()
+
+    async def _keep_alive(self) -> None:
+        while True:
+            await asyncio.sleep(self.claim_idle_ms / 3000)
+            held = list(self._in_flight)
+            if not held:
+                continue
+            try:
+                await self.redis.xclaim(self.stream, self.group, self.consumer, 0, held, justid=True)
+            except Exception as e:
+                logger.warning(f"Could not refresh {len(held)} pending events on '{self.stream}': {e}")
+
+    async def _ack(self, entry_id: str) -> None:
+        await self.redis.xack(self.stream, self.group, entry_id)
+        if self.delete_acked:
+            await self.redis.xdel(self.stream, entry_id)
+
+    async def _deliveries(self, entry_ids: List[str]) -> Dict[str, int]:
+        ordered = sorted(entry_ids, key=_entry_order)
+        pending = await self.redis.xpending_range(
+            self.stream, self.group, min=ordered[0], max=ordered[-1], count=len(entry_ids),
+            consumername=self.consumer,
+        )
+        return {p["message_id"]: p["times_delivered"] for p in pending}
+
+    async def _dead_letter(self, entry_id: str, fields: Dict[str, str], deliveries: int) -> None:
+        await self.redis.xadd(
+            self.dead_letter_stream,
+            {**fields, "source_id": entry_id, "deliveries": deliveries},
+            maxlen=settings.event_stream_maxlen,
+            approximate=True,
+        )
+        await self._ack(entry_id)
+        self.dead_lettered += 1
+        logger.error(f"Event {entry_id} failed {deliveries} times, moved to '{self.dead_letter_stream}'")
@@ -0,0 +1,69 @@
+"""
+In-process LISTEN on Postgres notifications.
+
+One dedicated asyncpg connection LISTENs on a channel and hands every
+payload to the registered handlers (the orchestrator's trigger and cron
+engines).  ``on_connect`` runs after each (re)connect so consumers can
+reload whatever changed while nobody was listening.
+
+Reconnects automatically on connection drop with exponential back-off
+(5 s → 10 s → 20 s … capped at 60 s).
+"""
+
+from typing import Callable, Iterable
+import asyncio
+import logging
+
+import asyncpg
+
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_INITIAL_DELAY = 5  # seconds
+
+
+async def _listen(channel: str, handlers: Iterable[Callable[[str], None]], on_connect: Callable[[], None]) -> None:
+    """Single connection lifecycle: connect → listen → wait for the connection to drop."""
+    conn = await asyncpg.connect(settings.database_url)
+
+    def on_notify(connection, pid, channel, payload):
+        for handler in handlers:
+            try:
+                handler(payload)
+            except Exception as e:
+                logger.error(f"Notification handler failed on {payload}: {e}")
+
+    try:
+        await conn.add_listener(channel, on_notify)
+        logger.info(f"Listening on '{channel}'")
+        on_connect()
+        closed = asyncio.Event()
+        conn.add_termination_listener(lambda _: closed.set())
+        await closed.wait()
+    finally:
+        if not conn.is_closed():
+            await conn.remove_listener(channel, on_notify)
+            await conn.close()
+
+
+async def listen_forever(
+    channel: str,
+    handlers: Iterable[Callable[[str], None]],
+    on_connect: Callable[[], None] = lambda: None,
+) -> None:
+    """Reconnecting wrapper around _listen; runs until cancelled."""
+    handlers = list(handlers)
+    delay = _INITIAL_DELAY
+    while True:
+        try:
+            await _listen(channel, handlers, on_connect)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.error(f"Listener on '{channel}' failed: {exc}. Reconnecting in {delay}s…")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+        else:
+            delay = _INITIAL_DELAY
@@ -2,20 +2,22 @@
 PostgreSQL LISTEN/NOTIFY → Redis bridge.
 
 PostgreSQL triggers fire pg_notify('agent_events', payload).
-This listener picks those up and publishes them to the Redis
-'agent_events' channel so the redis_worker can dispatch to agents.
+This listener picks those up and appends them to the Redis event stream
+(app/workers/event_bus.py) so the redis_worker can dispatch to agents.
 
 Reconnects automatically on connection drop with exponential back-off
 (5 s → 10 s → 20 s … capped at 60 s).
 """
 
 import asyncio
+import json
 import logging
 
 import asyncpg
 import redis.asyncio as aioredis
 
 from app.config import get_settings
+from app.workers.event_bus import publish_event
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -23,15 +25,31 @@ settings = get_settings()
 _INITIAL_DELAY = 5  # seconds
 
 
+def _is_row_change(payload: str) -> bool:
+    try:
+        return json.loads(payload).get("type") == "row_changed"
+    except (ValueError, AttributeError):
+        return False
+
+
 async def _run_listener():
     """Single connection lifecycle: connect → listen → wait forever."""
     conn = await asyncpg.connect(settings.database_url)
-    redis = aioredis.from_url(settings.redis_url)
+    redis = aioredis.from_url(settings.redis_url, decode_responses=True)
     loop = asyncio.get_running_loop()
 
+    async def forward(payload: str) -> None:
+        try:
+            if await publish_event(redis, payload):
+                logger.info(f"pg_notify forwarded: {payload}")
+        except Exception as e:
+            logger.error(f"Could not forward pg_notify {payload}: {e}")
+
     def on_notify(connection, pid, channel, payload):
-        loop.create_task(redis.publish("agent_events", payload))
-        logger.info(f"pg_notify forwarded: {payload}")
+        # Row-change events are consumed in-process by the trigger engine
+        if _is_row_change(payload):
+            return
+        loop.create_task(forward(payload))
 
     await conn.execute("LISTEN agent_events")
     await conn.add_listener("agent_events", on_notify)
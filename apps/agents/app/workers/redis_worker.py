@@ -1,21 +1,27 @@
 """
 Redis Worker — Event-Driven Agent Orchestration.
 
-Subscribes to the 'agent_events' Redis channel (fed by pg_listener)
-and dispatches to the appropriate agent based on event type.
+Consumes the Redis event stream (fed by pg_listener) through a consumer
+group and dispatches to the appropriate agent based on event type.  Events
+are acknowledged only after their handler succeeds; see
+app/workers/event_bus.py for batching, concurrency and retries.  Bursty
+per-row events are coalesced first (app/workers/coalescer.py) so a bulk
+update runs each agent once rather than once per row.
 
 Reconnects automatically on connection drop with exponential back-off
 (5 s → 10 s → 20 s … capped at 60 s).
 """
 
 import asyncio
-import json
+import functools
 import logging
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional
 
 import redis.asyncio as aioredis
 
 from app.config import get_settings
+from app.workers.coalescer import EventCoalescer
+from app.workers.event_bus import StreamConsumer
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -24,16 +30,21 @@ _INITIAL_DELAY = 5  # seconds
 
 
 # ── Event handlers ────────────────────────────────────────────────────────────
+# task_stuck and approval_overdue arrive in bursts (one per updated row) and
+# are coalesced; each batch handler receives the deduplicated events.
 
-async def handle_task_stuck_event(event_data: Dict[str, Any]) -> None:
+async def handle_task_stuck_events(events: List[Dict[str, Any]]) -> None:
     from app.agents.task_monitor import TaskMonitorAgent
-    agent = TaskMonitorAgent(task_id=event_data.get("task_id"))
+    task_ids = [event.get("task_id") for event in events]
+    # An event without an id asks for a full scan
+    agent = TaskMonitorAgent() if None in task_ids else TaskMonitorAgent(task_ids=task_ids)
     await agent.execute()
 
 
-async def handle_approval_overdue_event(event_data: Dict[str, Any]) -> None:
+async def handle_approval_overdue_events(events: List[Dict[str, Any]]) -> None:
     from app.agents.approval_nudger import ApprovalNudgerAgent
-    agent = ApprovalNudgerAgent(approval_id=event_data.get("approval_id"))
+    approval_ids = [event.get("approval_id") for event in events]
+    agent = ApprovalNudgerAgent() if None in approval_ids else ApprovalNudgerAgent(approval_ids=approval_ids)
     await agent.execute()
 
 
@@ -46,44 +57,58 @@ async def handle_invoice_created_event(event_data: Dict[str, Any]) -> None:
     await agent.execute()
 
 
+# Event type → (entity key field, batch handler)
+BATCH_HANDLERS = {
+    "task_stuck": ("task_id", handle_task_stuck_events),
+    "approval_overdue": ("approval_id", handle_approval_overdue_events),
+}
+
 EVENT_HANDLERS = {
-    "task_stuck": handle_task_stuck_event,
-    "approval_overdue": handle_approval_overdue_event,
     "invoice_created": handle_invoice_created_event,
 }
 
 
 # ── Dispatch ──────────────────────────────────────────────────────────────────
 
-async def process_agent_event(message: Dict[str, Any]) -> None:
-    try:
-        event_type = message.get("type")
-        handler = EVENT_HANDLERS.get(event_type)
-        if handler:
-            logger.info(f"Dispatching event: {event_type}")
+async def process_agent_event(message: Dict[str, Any], coalescer: Optional[EventCoalescer] = None) -> None:
+    """Run the handler for one event; handler errors propagate so the event is retried."""
+    event_type = message.get("type")
+    if coalescer is not None and coalescer.handles(event_type):
+        await coalescer.submit(message)
+        return
+
+    handler = EVENT_HANDLERS.get(event_type)
+    if handler is None and event_type in BATCH_HANDLERS:
+        batch_handler = BATCH_HANDLERS[event_type][1]
+        handler = lambda event: batch_handler([event])
+    if handler:
+        logger.info(f"Dispatching event: {event_type}")
+        try:
             await handler(message)
-        else:
-            logger.warning(f"Unknown event type: {event_type}")
-    except Exception as e:
-        logger.error(f"Error processing event: {e}")
+        except Exception as e:
+            logger.error(f"Error processing {event_type} event: {e}")
+            raise
+    else:
+        logger.warning(f"Unknown event type: {event_type}")
 
 
-# ── Subscribe loop ────────────────────────────────────────────────────────────
+# ── Consume loop ──────────────────────────────────────────────────────────────
 
 async def _run_worker():
-    """Single subscribe lifecycle."""
-    r = aioredis.from_url(settings.redis_url)
-    pubsub = r.pubsub()
-    await pubsub.subscribe("agent_events")
-    logger.info("Redis worker listening on 'agent_events'")
+    """Single consumer lifecycle."""
+    r = aioredis.from_url(settings.redis_url, decode_responses=True)
+    coalescer = EventCoalescer(
+        BATCH_HANDLERS,
+        window_seconds=settings.event_coalesce_window_seconds,
+        max_batch=settings.event_coalesce_max_batch,
+        concurrency=settings.event_coalesce_concurrency,
+    )
+    consumer = StreamConsumer(r, functools.partial(process_agent_event, coalescer=coalescer))
+    logger.info(f"Redis worker consuming '{consumer.stream}' as {consumer.consumer}")
 
     try:
-        async for message in pubsub.listen():
-            if message["type"] == "message":
-                event_data = json.loads(message["data"])
-                await process_agent_event(event_data)
+        await consumer.run()
     finally:
-        await pubsub.unsubscribe("agent_events")
         await r.aclose()
 
 
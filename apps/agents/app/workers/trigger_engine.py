@@ -0,0 +1,235 @@
+"""
+Event-Driven Agent Triggers
+
+Replaces the orchestrator's polling of "Task", "ApprovalStep" and
+"BroadcastEmail" with per-row deadlines:
+
+  1. At startup, every candidate row's deadline is loaded once into a
+     ``DeadlineScheduler`` per table: the time a task turns 48 hours stale,
+     an approval passes its deadline and nudge cooldown, a broadcast's send
+     time.
+  2. app/db/triggers.sql publishes a ``row_changed`` event, carrying the
+     row's new deadline, on the existing ``pg_notify('agent_events')``
+     channel whenever a column a trigger reads changes.  The orchestrator's
+     listener (app/workers/notifications.py) passes it to ``notify``, which
+     moves or cancels that row's deadline; no query is needed.
+  3. The engine sleeps until the earliest deadline and fires the table's
+     agent with the ids of every row due by then.
+
+An idle system therefore issues no queries at all.  Deadlines are reloaded
+when the listener (re)connects (``reload_all``), which covers events missed
+while it was down, and for any event without a deadline (an older trigger
+function).
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+import asyncio
+import json
+import logging
+import time
+
+from app.db import get_conn
+from app.workers.deadlines import DeadlineScheduler
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "agent_events"
+ROW_CHANGED = "row_changed"
+
+
+def to_timestamp(value: Optional[Any]) -> Optional[float]:
+    """POSIX seconds for a naive-UTC datetime or its ISO string (``None`` passes through)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class Trigger:
+    """
+    Runs ``agent_type`` for rows of ``table`` when their deadline passes.
+
+    Args:
+        table: Table holding the rows
+        agent_type: Orchestrator agent to run
+        rows_sql: Query returning ("id", "due") for every row with a pending
+            deadline; ``due`` is naive UTC, as in the notifications
+    """
+
+    def __init__(self, table: str, agent_type: str, rows_sql: str):
+        self.table = table
+        self.agent_type = agent_type
+        self.rows_sql = rows_sql
+
+
+DEFAULT_TRIGGERS = (
+    # Active tasks not updated for 48 hours
+    Trigger(
+        "Task",
+        "task_escalator",
+        '''SELECT "id", "lastUpdated" + INTERVAL '48 hours' AS "due" FROM "Task"
+           WHERE "status" = 'ACTIVE'::"TaskStatus"
+           AND "healthStatus" != 'CRITICAL'::"HealthStatus"''',
+    ),
+    # Pending approvals past their deadline and not nudged in 24 hours
+    Trigger(
+        "ApprovalStep",
+        "approval_nudger",
+        '''SELECT "id", GREATEST("deadline", "lastNudgedAt" + INTERVAL '24 hours') AS "due" FROM "ApprovalStep"
+           WHERE "status" = 'PENDING'::"ApprovalStatus"''',
+    ),
+    # Scheduled broadcasts whose send time has come
+    Trigger(
+        "BroadcastEmail",
+        "broadcast_agent",
+        '''SELECT "id", "scheduledFor" AS "due" FROM "BroadcastEmail"
+           WHERE "status" = 'SCHEDULED'::"BroadcastStatus" AND "scheduledFor" IS NOT NULL''',
+    ),
+)
+
+
+class TriggerEngine:
+    """
+    Fires agents at per-row deadlines kept current by row-change notifications.
+
+    Args:
+        fire: Coroutine function run with the agent type and the ids of its
+            due rows
+        triggers: Triggers to evaluate, at most one per table
+        retry_seconds: A fired row is checked again after this delay unless a
+            notification moves or cancels its deadline first (i.e. the agent
+            failed to act on it)
+    """
+
+    def __init__(
+        self,
+        fire: Callable[[str, List[str]], Awaitable[None]],
+        triggers: Iterable[Trigger] = DEFAULT_TRIGGERS,
+        retry_seconds: float = 60.0,
+    ):
+        self._fire = fire
+        self.triggers: Dict[str, Trigger] = {t.table: t for t in triggers}
+        self.retry_seconds = retry_seconds
+        self.deadlines: Dict[str, DeadlineScheduler] = {table: DeadlineScheduler() for table in self.triggers}
+        self._stale: Set[str] = set(self.triggers)
+        self._wake = asyncio.Event()
+        self.events_received = 0
+        self.reloads = 0
+        self.fired: Dict[str, int] = {t.agent_type: 0 for t in self.triggers.values()}
+
+    # ── inputs ────────────────────────────────────────────────────────
+    def notify(self, payload: str) -> None:
+        """Handle one ``agent_events`` payload (other event types are ignored)."""
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        if not isinstance(event, dict) or event.get("type") != ROW_CHANGED:
+            return
+        self.events_received += 1
+        table = event.get("table")
+        if table not in self.triggers:
+            return
+
+        deadlines = self.deadlines[table]
+        row_id = event.get("id")
+        try:
+            due = to_timestamp(event["due"])
+        except (KeyError, TypeError, ValueError):
+            # No usable deadline in the event: reload the table instead
+            self._stale.add(table)
+            self._wake.set()
+            return
+
+        earliest = deadlines.peek()
+        if due is None or event.get("op") == "DELETE":
+            deadlines.cancel(row_id)
+            return
+        deadlines.schedule(row_id, due)
+        if earliest is None or due < earliest:
+            self._wake.set()
+
+    def reload_all(self) -> None:
+        """Reload every table's deadlines on the next loop iteration."""
+        self._stale.update(self.triggers)
+        self._wake.set()
+
+    def next_due(self) -> Optional[float]:
+        pending = [due for due in (d.peek() for d in self.deadlines.values()) if due is not None]
+        return min(pending) if pending else None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "events_received": self.events_received,
+            "reloads": self.reloads,
+            "fired": dict(self.fired),
+            "pending": {table: len(d) for table, d in self.deadlines.items()},
+        }
+
+    # ── loop ──────────────────────────────────────────────────────────
+    async def run_timer(self) -> None:
+        """Sleep until the earliest deadline or a change that moves it, then fire."""
+        while True:
+            if self._stale:
+                await self._reload()
+
+            now = time.time()
+            fired = False
+            for table, deadlines in self.deadlines.items():
+                ids = deadlines.pop_due(now)
+                if ids:
+                    fired = True
+                    await self._run_trigger(table, ids)
+            if fired:
+                continue
+
+            self._wake.clear()
+            if self._stale:
+                continue
+            next_due = self.next_due()
+            timeout = None if next_due is None else max(0.0, next_due - time.time())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    # ── deadlines ─────────────────────────────────────────────────────
+    async def _reload(self) -> None:
+        tables, self._stale = self._stale, set()
+        try:
+            for table in tables:
+                rows = await self._load_rows(self.triggers[table])
+                deadlines = self.deadlines[table]
+                deadlines.clear()
+                for row_id, due in rows:
+                    deadlines.schedule(row_id, to_timestamp(due))
+                self.reloads += 1
+                logger.info(f"Loaded {len(deadlines)} pending {table} deadlines")
+        except Exception as e:
+            logger.error(f"Could not load trigger deadlines: {e}")
+            self._stale |= tables
+            await asyncio.sleep(self.retry_seconds)
+
+    async def _load_rows(self, trigger: Trigger) -> List[tuple]:
+        async with get_conn() as conn:
+            rows = await conn.fetch(trigger.rows_sql)
+        return [(r["id"], r["due"]) for r in rows]
+
+    async def _run_trigger(self, table: str, ids: List[str]) -> None:
+        trigger = self.triggers[table]
+        logger.info(f"{len(ids)} {table} rows are due, running {trigger.agent_type}")
+        self.fired[trigger.agent_type] += 1
+
+        # Re-check later unless the run's own row changes move the deadlines
+        # first; scheduled before the run so those notifications win
+        retry_at = time.time() + self.retry_seconds
+        for row_id in ids:
+            self.deadlines[table].schedule(row_id, retry_at)
+        try:
+            await self._fire(trigger.agent_type, ids)
+        except Exception as e:
+            logger.error(f"Triggered agent {trigger.agent_type} failed: {e}")
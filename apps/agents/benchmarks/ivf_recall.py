@@ -0,0 +1,69 @@
+"""
+Recall vs. latency of IVF search against the exact scan.
+
+Run from apps/agents/:
+
+    python -m benchmarks.ivf_recall --docs 100000 --dim 1536 --queries 200
+
+Vectors are drawn from a Gaussian mixture so the data has cluster structure
+similar to real embeddings; uniform random vectors make every ANN index look
+bad.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.rag.vector_index import VectorIndex
+
+
+def _clustered_vectors(n: int, dim: int, clusters: int, rng) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    noise = rng.standard_normal((n, dim)).astype(np.float32) * 0.6
+    return centers[labels] + noise
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=0, help="0 = ~sqrt(docs)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = _clustered_vectors(args.docs, args.dim, max(8, args.docs // 1000), rng)
+    queries = _clustered_vectors(args.queries, args.dim, max(8, args.docs // 1000), rng)
+
+    index = VectorIndex(dim=args.dim, initial_capacity=args.docs, nlist=args.nlist or None)
+    start = time.perf_counter()
+    for i, v in enumerate(vectors):
+        index.upsert(f"doc-{i}", v, {})
+    print(f"insert      {args.docs} docs in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    index.train()
+    print(f"train       {index._ivf.nlist} lists in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    truth = [{r[0] for r in index.search(q, top_k=args.top_k)} for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"exact       recall=1.000  {exact_ms:8.2f} ms/query")
+
+    for nprobe in args.nprobe:
+        start = time.perf_counter()
+        found = [
+            {r[0] for r in index.search(q, top_k=args.top_k, approximate=True, nprobe=nprobe)}
+            for q in queries
+        ]
+        ivf_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        recall = np.mean([len(f & t) / len(t) for f, t in zip(found, truth)])
+        print(f"nprobe={nprobe:<4} recall={recall:.3f}  {ivf_ms:8.2f} ms/query  ({exact_ms / ivf_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
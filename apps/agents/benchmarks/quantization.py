@@ -0,0 +1,85 @@
+"""
+Memory and recall of compressed vector storage against float32.
+
+Run from apps/agents/:
+
+    python -m benchmarks.quantization --docs 100000 --dim 1536 --queries 100
+
+For each storage mode the index is loaded, quantized, and queried; recall@k
+is measured against the exact float32 top-k, with and without re-ranking the
+best ``top_k * rerank`` compressed hits against the full vectors.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from app.rag.vector_index import VectorIndex
+
+
+def _embedding_like(n: int, basis: np.ndarray, spectrum: np.ndarray, rng) -> np.ndarray:
+    """Gaussian rows with a power-law variance spectrum in a random basis.
+
+    Real embeddings concentrate their variance in relatively few directions;
+    isotropic noise is incompressible and makes every quantizer look bad.
+    """
+    return (rng.standard_normal((n, len(spectrum))).astype(np.float32) * spectrum) @ basis
+
+
+def _build(vectors: np.ndarray, **options) -> VectorIndex:
+    index = VectorIndex(dim=vectors.shape[1], initial_capacity=len(vectors), **options)
+    for i, v in enumerate(vectors):
+        index.upsert(f"doc-{i}", v, {})
+    index.quantize()
+    return index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rerank", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    basis = np.linalg.qr(rng.standard_normal((args.dim, args.dim)))[0].astype(np.float32)
+    spectrum = (np.arange(1, args.dim + 1) ** -0.5).astype(np.float32)
+    vectors = _embedding_like(args.docs, basis, spectrum, rng)
+    queries = _embedding_like(args.queries, basis, spectrum, rng)
+
+    modes = [
+        ("float32", {}),
+        ("int8", {"storage": "int8"}),
+        ("int8+rerank", {"storage": "int8", "rerank": args.rerank}),
+        (f"pq m={args.dim // 8}", {"storage": "pq", "pq_subspaces": args.dim // 8}),
+        (f"pq m={args.dim // 16}", {"storage": "pq", "pq_subspaces": args.dim // 16}),
+        (f"pq m={args.dim // 16}+rerank", {"storage": "pq", "pq_subspaces": args.dim // 16, "rerank": args.rerank}),
+    ]
+
+    truth = None
+    print(f"{args.docs} docs x {args.dim} dims, recall@{args.top_k} over {args.queries} queries")
+    print(f"{'storage':<22}{'MiB':>9}{'bytes/doc':>11}{'build s':>9}{'recall':>8}{'ms/query':>10}")
+    for name, options in modes:
+        start = time.perf_counter()
+        index = _build(vectors, **options)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = [[r[0] for r in index.search(q, top_k=args.top_k)] for q in queries]
+        query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        if truth is None:
+            truth = [set(f) for f in found]
+        recall = np.mean([len(set(f) & t) / len(t) for f, t in zip(found, truth)])
+        memory = index.memory_bytes()
+        print(
+            f"{name:<22}{memory / 2**20:>9.1f}{memory / args.docs:>11.0f}"
+            f"{build:>9.1f}{recall:>8.3f}{query_ms:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,7 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
 import pytest
 import httpx
 
@@ -25,3 +29,203 @@ async def client():
         transport=transport, base_url="http://test", follow_redirects=True
     ) as c:
         yield c
+
+
+# ── shared fakes ──────────────────────────────────────────────────────────
+class FakeConn:
+    """In-memory stand-in for an asyncpg connection.
+
+    fetch / fetchrow / fetchval return the canned ``rows`` / ``row`` / ``value``;
+    every call is recorded in ``fetches`` or ``executes``.
+    """
+
+    def __init__(self, rows=(), row=None, value=None):
+        self.rows = list(rows)
+        self.row = row
+        self.value = value
+        self.fetches = []
+        self.executes = []
+        self.transactions = 0
+
+    @property
+    def queries(self):
+        return len(self.fetches)
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.transactions += 1
+        yield
+
+    async def fetch(self, sql, *args):
+        self.fetches.append((sql, args))
+        return self.rows
+
+    async def fetchrow(self, sql, *args):
+        self.fetches.append((sql, args))
+        return self.row
+
+    async def fetchval(self, sql, *args):
+        self.fetches.append((sql, args))
+        return self.value
+
+    async def execute(self, sql, *args):
+        self.executes.append((sql, args))
+
+
+class FakeEmail:
+    """EmailService stand-in for agents that send through ``send_many``."""
+
+    def __init__(self):
+        self.sent = []
+        self.rate = None
+        self.failing = []
+
+    async def send_many(self, messages, concurrency=None, rate_per_second=None):
+        self.sent.extend(messages)
+        self.rate = rate_per_second
+        return [{"sent": m["to"] not in self.failing} for m in messages]
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def xadd(self, name, fields, **kwargs):
+        self.ops.append((name, fields))
+
+    async def execute(self):
+        if self.redis.fail:
+            raise ConnectionError("redis down")
+        return [await self.redis.xadd(name, fields) for name, fields in self.ops]
+
+
+class FakeRedis:
+    """In-memory subset of Redis: streams with a single consumer group, sorted sets, counters, SET NX."""
+
+    def __init__(self):
+        self.streams = {}
+        self.pending = {}  # entry id -> [consumer, delivered_at, times_delivered]
+        self.last_delivered = "0-0"
+        self.keys = {}
+        self.values = {}
+        self.zsets = {}
+        self.fail = False
+        self._seq = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def set(self, key, value, nx=False, px=None):
+        now = time.monotonic()
+        expires = self.keys.get(key)
+        if nx and expires is not None and expires > now:
+            return None
+        self.keys[key] = now + (px or 0) / 1000
+        return True
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def incr(self, key):
+        self.values[key] = int(self.values.get(key, 0)) + 1
+        return self.values[key]
+
+    async def delete(self, *keys):
+        return sum(self.keys.pop(key, None) is not None for key in keys)
+
+    async def zadd(self, name, mapping):
+        self.zsets.setdefault(name, {}).update(mapping)
+
+    async def xadd(self, name, fields, maxlen=None, approximate=True):
+        self._seq += 1
+        entry_id = f"{self._seq}-0"
+        self.streams.setdefault(name, []).append((entry_id, {k: str(v) for k, v in fields.items()}))
+        return entry_id
+
+    async def xdel(self, name, *ids):
+        entries = self.streams.get(name, [])
+        self.streams[name] = [e for e in entries if e[0] not in ids]
+        return len(entries) - len(self.streams[name])
+
+    async def xgroup_create(self, name, groupname, id="$", mkstream=False):
+        self.streams.setdefault(name, [])
+
+    async def xreadgroup(self, groupname, consumername, streams, count=None, block=None):
+        (name, _), = streams.items()
+        last = int(self.last_delivered.split("-")[0])
+        entries = [e for e in self.streams.get(name, []) if int(e[0].split("-")[0]) > last][:count]
+        if not entries:
+            await asyncio.sleep((block or 0) / 1000)
+            return []
+        for entry_id, _ in entries:
+            self.pending[entry_id] = [consumername, time.monotonic(), 1]
+        self.last_delivered = entries[-1][0]
+        return [[name, entries]]
+
+    async def xack(self, name, groupname, *ids):
+        for entry_id in ids:
+            self.pending.pop(entry_id, None)
+        return len(ids)
+
+    async def xclaim(self, name, groupname, consumername, min_idle_time, message_ids, justid=False):
+        now = time.monotonic()
+        claimed = []
+        for entry_id in message_ids:
+            state = self.pending.get(entry_id)
+            if state is not None and (now - state[1]) * 1000 >= min_idle_time:
+                state[:2] = [consumername, now]
+                claimed.append(entry_id)
+        return claimed
+
+    async def xautoclaim(self, name, groupname, consumername, min_idle_time, start_id="0-0", count=None):
+        now = time.monotonic()
+        entries = dict(self.streams.get(name, []))
+        claimed = []
+        for entry_id, state in sorted(self.pending.items()):
+            if (now - state[1]) * 1000 >= min_idle_time:
+                state[:] = [consumername, now, state[2] + 1]
+                claimed.append((entry_id, entries.get(entry_id)))
+        return ["0-0", claimed, []]
+
+    async def xpending_range(self, name, groupname, min, max, count, consumername=None):
+        return [
+            {"message_id": entry_id, "consumer": state[0], "times_delivered": state[2]}
+            for entry_id, state in self.pending.items()
+            if consumername is None or state[0] == consumername
+        ]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """Point ``get_conn`` in the given modules at one connection and return it.
+
+    Pass ``conn`` to install a custom fake; other keyword arguments build a FakeConn.
+    """
+
+    def install(*modules, conn=None, **fake):
+        conn = conn if conn is not None else FakeConn(**fake)
+
+        @asynccontextmanager
+        async def get_conn():
+            yield conn
+
+        for module in modules:
+            monkeypatch.setattr(module, "get_conn", get_conn)
+        return conn
+
+    return install
+
+
+@pytest.fixture
+def fake_email(monkeypatch):
+    from app.services import email_service
+
+    email = FakeEmail()
+    monkeypatch.setattr(email_service, "get_email_service", lambda: email)
+    return email
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
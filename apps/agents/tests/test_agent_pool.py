@@ -0,0 +1,102 @@
+import asyncio
+
+from app.workers.agent_pool import AgentWorkerPool, RunHistogram, parse_concurrency
+
+
+class _Runner:
+    def __init__(self, durations=None, fail=()):
+        self.durations = durations or {}
+        self.fail = set(fail)
+        self.in_flight = {}
+        self.max_in_flight = {}
+        self.total_in_flight = 0
+        self.max_total = 0
+        self.runs = []
+
+    async def __call__(self, agent_type, key):
+        flight = (agent_type, key)
+        self.in_flight[agent_type] = self.in_flight.get(agent_type, 0) + 1
+        self.max_in_flight[agent_type] = max(self.max_in_flight.get(agent_type, 0), self.in_flight[agent_type])
+        self.total_in_flight += 1
+        self.max_total = max(self.max_total, self.total_in_flight)
+        try:
+            await asyncio.sleep(self.durations.get(agent_type, 0.02))
+            self.runs.append(flight)
+            if agent_type in self.fail:
+                raise RuntimeError("boom")
+        finally:
+            self.in_flight[agent_type] -= 1
+            self.total_in_flight -= 1
+
+
+async def test_slow_agent_does_not_delay_others():
+    runner = _Runner(durations={"broadcast_agent": 0.3})
+    pool = AgentWorkerPool(runner, max_workers=4)
+
+    pool.submit("broadcast_agent")
+    await asyncio.sleep(0.01)
+    pool.submit("task_escalator")
+    pool.submit("approval_nudger")
+    await asyncio.sleep(0.1)
+
+    assert ("task_escalator", None) in runner.runs
+    assert ("approval_nudger", None) in runner.runs
+    assert ("broadcast_agent", None) not in runner.runs
+    await pool.drain()
+
+
+async def test_single_flight_collapses_requests_into_one_rerun():
+    runner = _Runner(durations={"task_escalator": 0.05})
+    pool = AgentWorkerPool(runner)
+
+    assert pool.submit("task_escalator")
+    assert not pool.submit("task_escalator")      # still queued
+    await asyncio.sleep(0.01)
+    for _ in range(5):                            # while running
+        assert not pool.submit("task_escalator")
+    await pool.drain()
+
+    assert runner.runs == [("task_escalator", None)] * 2
+    assert runner.max_in_flight["task_escalator"] == 1
+    counters = pool.stats()["agents"]["task_escalator"]
+    assert counters["requested"] == 7 and counters["coalesced"] == 6 and counters["succeeded"] == 2
+
+
+async def test_per_type_and_global_limits():
+    runner = _Runner()
+    pool = AgentWorkerPool(runner, max_workers=3, default_concurrency=2,
+                           concurrency=parse_concurrency("approval_nudger=1,bogus"))
+
+    for i in range(6):
+        pool.submit("task_monitor", key=i)
+        pool.submit("approval_nudger", key=i)
+    await pool.drain()
+
+    assert len(runner.runs) == 12
+    assert runner.max_in_flight["task_monitor"] == 2
+    assert runner.max_in_flight["approval_nudger"] == 1
+    assert runner.max_total <= 3
+
+
+async def test_failures_are_counted_and_timed():
+    pool = AgentWorkerPool(_Runner(fail={"broadcast_agent"}))
+    pool.submit("broadcast_agent")
+    await pool.drain()
+
+    stats = pool.stats()["agents"]["broadcast_agent"]
+    assert stats["failed"] == 1 and stats["succeeded"] == 0
+    assert stats["run_time"]["count"] == 1
+    assert stats["run_time"]["max_ms"] >= 15
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = RunHistogram(buckets=(0.1, 1.0, 10.0))
+    for seconds in [0.05] * 90 + [5.0] * 9 + [42.0]:
+        histogram.observe(seconds)
+
+    summary = histogram.summary()
+    assert [b["count"] for b in summary["buckets"]] == [90, 90, 99, 100]
+    assert summary["buckets"][-1]["le"] == "+Inf"
+    assert summary["p50_ms"] == 100.0
+    assert summary["p95_ms"] == 10000.0
+    assert summary["max_ms"] == 42000.0
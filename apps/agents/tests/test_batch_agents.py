@@ -0,0 +1,74 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.agents import approval_nudger, task_monitor
+from app.agents.approval_nudger import ApprovalNudgerAgent
+from app.agents.task_monitor import TaskMonitorAgent
+from app.config import get_settings
+from app.services.email_service import EmailService
+
+
+def _approval_row(i):
+    return {
+        "id": f"a{i}", "stage": "Finance", "assigneeEmail": f"user{i}@example.com",
+        "deadline": datetime.utcnow() - timedelta(days=i), "lastNudgedAt": None, "status": "PENDING",
+        "requiredDocs": [], "invoiceId": f"inv{i}", "invoice_amount": 100.0 * i, "project_name": "Apollo",
+    }
+
+
+async def test_nudger_resolves_id_set_with_one_query_and_one_update(fake_db, fake_email):
+    rows = [_approval_row(i) for i in range(1, 51)]
+    conn = fake_db(approval_nudger, rows=rows)
+
+    agent = ApprovalNudgerAgent(approval_ids=[r["id"] for r in rows] + ["a1"])
+    result = await agent.run()
+
+    assert result["nudges_sent"] == 50
+    assert len(conn.fetches) == 1
+    assert "ANY($1::text[])" in conn.fetches[0][0]
+    assert len(conn.fetches[0][1][0]) == 50
+    assert len(conn.executes) == 1
+    assert sorted(conn.executes[0][1][0]) == sorted(r["id"] for r in rows)
+    assert [m["to"] for m in fake_email.sent] == [r["assigneeEmail"] for r in rows]
+    assert all(a["email_sent"] for a in result["approvals"])
+
+
+async def test_empty_id_set_does_not_query(fake_db, fake_email):
+    conn = fake_db(approval_nudger, rows=[])
+    assert (await ApprovalNudgerAgent(approval_ids=[]).run())["nudges_sent"] == 0
+    assert conn.fetches == [] and conn.executes == []
+
+
+async def test_monitor_single_id_uses_set_query(monkeypatch, fake_db, fake_email):
+    row = {
+        "id": "t1", "title": "Ship it", "projectId": "p1", "project_name": "Apollo",
+        "lastUpdated": datetime.utcnow() - timedelta(days=3), "status": "ACTIVE",
+    }
+    conn = fake_db(task_monitor, rows=[row])
+    monkeypatch.setattr(get_settings(), "alert_email", "ops@example.com")
+
+    result = await TaskMonitorAgent(task_id="t1").run()
+
+    assert conn.fetches[0][1] == (["t1"],)
+    assert result["tasks"][0]["stuck_days"] == 3
+    assert len(fake_email.sent) == 1 and fake_email.sent[0]["to"] == "ops@example.com"
+
+
+async def test_send_many_bounds_concurrency():
+    running = 0
+    peak = 0
+
+    class _Service(EmailService):
+        async def send_email(self, to, subject, body, **kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {"sent": True, "recipients": [to]}
+
+    messages = [{"to": f"u{i}@example.com", "subject": "s", "body": "b"} for i in range(20)]
+    results = await _Service().send_many(messages, concurrency=4)
+
+    assert peak == 4
+    assert [r["recipients"][0] for r in results] == [m["to"] for m in messages]
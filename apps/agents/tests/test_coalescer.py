@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from app.workers.coalescer import EventCoalescer
+
+
+class _BatchRecorder:
+    def __init__(self, fail_times=0):
+        self.batches = []
+        self.fail_times = fail_times
+
+    async def __call__(self, events):
+        self.batches.append(events)
+        await asyncio.sleep(0.01)
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("boom")
+
+
+async def test_burst_is_deduplicated_into_one_batch():
+    tasks = _BatchRecorder()
+    coalescer = EventCoalescer({"task_stuck": ("task_id", tasks)}, window_seconds=0.05)
+
+    events = [{"type": "task_stuck", "task_id": f"t{i % 10}", "n": i} for i in range(1000)]
+    await asyncio.gather(*(coalescer.submit(e) for e in events))
+
+    assert len(tasks.batches) == 1
+    batch = tasks.batches[0]
+    assert sorted(e["task_id"] for e in batch) == [f"t{i}" for i in range(10)]
+    # Latest event for each entity wins
+    assert {e["task_id"]: e["n"] for e in batch}["t3"] == 993
+    assert coalescer.stats()["events_received"] == 1000
+
+
+async def test_types_are_batched_separately():
+    tasks = _BatchRecorder()
+    approvals = _BatchRecorder()
+    coalescer = EventCoalescer(
+        {"task_stuck": ("task_id", tasks), "approval_overdue": ("approval_id", approvals)},
+        window_seconds=0.02,
+    )
+
+    await asyncio.gather(
+        coalescer.submit({"type": "task_stuck", "task_id": "t1"}),
+        coalescer.submit({"type": "approval_overdue", "approval_id": "a1"}),
+        coalescer.submit({"type": "approval_overdue", "approval_id": "a2"}),
+    )
+
+    assert [[e["task_id"] for e in b] for b in tasks.batches] == [["t1"]]
+    assert [sorted(e["approval_id"] for e in b) for b in approvals.batches] == [["a1", "a2"]]
+
+
+async def test_max_batch_flushes_before_window():
+    tasks = _BatchRecorder()
+    coalescer = EventCoalescer({"task_stuck": ("task_id", tasks)}, window_seconds=10, max_batch=3)
+
+    await asyncio.wait_for(
+        asyncio.gather(*(coalescer.submit({"type": "task_stuck", "task_id": f"t{i}"}) for i in range(6))),
+        timeout=1,
+    )
+
+    assert [len(b) for b in tasks.batches] == [3, 3]
+
+
+async def test_failure_reaches_every_waiter():
+    tasks = _BatchRecorder(fail_times=1)
+    coalescer = EventCoalescer({"task_stuck": ("task_id", tasks)}, window_seconds=0.02)
+
+    results = await asyncio.gather(
+        coalescer.submit({"type": "task_stuck", "task_id": "t1"}),
+        coalescer.submit({"type": "task_stuck", "task_id": "t2"}),
+        return_exceptions=True,
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    # A later event opens a fresh batch
+    await coalescer.submit({"type": "task_stuck", "task_id": "t1"})
+    assert len(tasks.batches) == 2
+    assert coalescer.stats()["batches_failed"] == 1
+
+
+async def test_unregistered_type_raises():
+    coalescer = EventCoalescer({})
+    assert not coalescer.handles("invoice_created")
+    with pytest.raises(KeyError):
+        await coalescer.submit({"type": "invoice_created"})
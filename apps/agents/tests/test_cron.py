@@ -0,0 +1,98 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.workers.cron import CronEngine, next_run
+
+
+def test_next_run_is_strictly_after():
+    at = datetime(2026, 10, 16, 9, 15)          # a Friday
+    assert next_run("*/15 * * * *", at) == datetime(2026, 10, 16, 9, 30)
+    assert next_run("*/15 * * * *", at - timedelta(seconds=1)) == at
+    assert next_run("0 16 * * fri", at) == datetime(2026, 10, 16, 16, 0)
+    assert next_run("0 9 * * mon-fri", datetime(2026, 10, 16, 9, 0)) == datetime(2026, 10, 19, 9, 0)
+
+
+def test_invalid_expressions_raise_value_error():
+    for expression in ("", "bad", "61 * * * *", "* * * *"):
+        with pytest.raises(ValueError):
+            next_run(expression, datetime(2026, 1, 1))
+
+
+class _Engine(CronEngine):
+    """Cron engine over an in-memory schedule table."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.saved = []
+        self.calls = []
+        super().__init__(self._record)
+
+    async def _record(self, agent_type, schedule_ids):
+        self.calls.append((agent_type, sorted(schedule_ids)))
+
+    async def _load_schedules(self):
+        return self.rows
+
+    async def _save(self, updates, ran):
+        self.saved.append((ran, dict(updates)))
+
+
+def _row(schedule_id, agent_type, cron="0 * * * *", next_run_at=None):
+    return {"id": schedule_id, "agentType": agent_type, "cronExpression": cron, "nextRun": next_run_at}
+
+
+async def test_missing_next_run_is_computed_not_run():
+    engine = _Engine([_row("s1", "task_escalator"), _row("s2", "team_coordinator", cron="nonsense")])
+    task = asyncio.create_task(engine.run())
+    await asyncio.sleep(0.05)
+
+    assert engine.calls == []
+    ran, updates = engine.saved[0]
+    assert not ran and list(updates) == ["s1"]
+    assert updates["s1"] > datetime.utcnow()
+    assert len(engine.deadlines) == 1
+    task.cancel()
+
+
+async def test_due_schedules_run_once_per_agent_and_advance():
+    past = datetime.utcnow() - timedelta(hours=3)
+    engine = _Engine([
+        _row("s1", "task_escalator", next_run_at=past),
+        _row("s2", "task_escalator", cron="*/5 * * * *", next_run_at=past),
+        _row("s3", "broadcast_agent", next_run_at=past),
+        _row("s4", "broadcast_agent", next_run_at=datetime.utcnow() + timedelta(hours=1)),
+    ])
+    task = asyncio.create_task(engine.run())
+    await asyncio.sleep(0.05)
+
+    # Missed slots run once, not once per slot
+    assert sorted(engine.calls) == [("broadcast_agent", ["s3"]), ("task_escalator", ["s1", "s2"])]
+    ran, updates = engine.saved[-1]
+    assert ran and sorted(updates) == ["s1", "s2", "s3"]
+    assert all(at > datetime.utcnow() for at in updates.values())
+
+    await asyncio.sleep(0.05)
+    assert len(engine.calls) == 2
+    task.cancel()
+
+
+async def test_route_changes_arrive_as_notifications():
+    engine = _Engine([])
+    task = asyncio.create_task(engine.run())
+    await asyncio.sleep(0.01)
+
+    soon = (datetime.utcnow() + timedelta(seconds=0.1)).isoformat()
+    event = {"type": "row_changed", "table": "AgentSchedule", "op": "INSERT", "id": "s1",
+             "agentType": "team_coordinator", "cronExpression": "0 * * * *", "isActive": True, "nextRun": soon}
+    engine.notify(json.dumps(event))
+    engine.notify(json.dumps({**event, "id": "s2", "nextRun": soon}))
+    engine.notify(json.dumps({"type": "row_changed", "table": "AgentSchedule", "op": "DELETE", "id": "s2"}))
+    engine.notify(json.dumps({**event, "table": "Task"}))
+    await asyncio.sleep(0.2)
+
+    assert engine.calls == [("team_coordinator", ["s1"])]
+    assert set(engine.schedules) == {"s1"}
+    task.cancel()
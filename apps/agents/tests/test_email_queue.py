@@ -0,0 +1,205 @@
+import asyncio
+import json
+import math
+import time
+
+import pytest
+
+from app.services import email_queue
+from app.services.email_queue import EmailSender, TokenBucket, enqueue_emails, parse_rates, retry_delay
+from tests.conftest import FakeRedis
+
+
+class _FakeRedis(FakeRedis):
+    """Runs the queue's Lua scripts in Python."""
+
+    def __init__(self):
+        super().__init__()
+        self.buckets = {}
+
+    async def eval(self, script, numkeys, *args):
+        if script == email_queue._TOKEN_SCRIPT:
+            return self._take_token(*args)
+        return await self._promote(*args)
+
+    def _take_token(self, key, rate, capacity):
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        wait = 0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = math.ceil((1 - tokens) / rate * 1000)
+        self.buckets[key] = (tokens, now)
+        return wait
+
+    async def _promote(self, retry_key, stream, now, limit):
+        zset = self.zsets.get(retry_key, {})
+        due = sorted((m for m, score in zset.items() if score <= now), key=zset.get)[:limit]
+        for member in due:
+            del zset[member]
+            await self.xadd(stream, {"data": member})
+        return len(due)
+
+
+class _FakeService:
+    provider = "smtp"
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.sent = []
+        self.batches = []
+
+    async def send_bulk(self, messages):
+        self.batches.append(len(messages))
+        for index, message in enumerate(messages):
+            self.sent.append(message)
+            yield index, self.outcomes.pop(0)
+
+
+@pytest.fixture(autouse=True)
+def short_batch_window(monkeypatch):
+    monkeypatch.setattr(email_queue.settings, "email_batch_window_seconds", 0.01)
+
+
+@pytest.fixture
+def conn(fake_db):
+    return fake_db(email_queue)
+
+
+def _statuses(conn):
+    return [args[1] for sql, args in conn.executes if sql.lstrip().startswith("UPDATE") and len(args) > 2]
+
+
+async def test_enqueue_records_and_queues(conn):
+    redis = _FakeRedis()
+    messages = [
+        {"to": "a@example.com", "subject": "Hi -name-", "body": "b", "substitutions": {"-name-": "Ann"}},
+        {"to": ["b@example.com", "c@example.com"], "subject": "Team", "body": "b"},
+    ]
+
+    receipts = await enqueue_emails(messages, redis=redis)
+
+    assert [r["status"] for r in receipts] == ["QUEUED", "QUEUED"]
+    assert receipts[1]["recipients"] == ["b@example.com", "c@example.com"]
+    sql, (ids, recipients, subjects) = conn.executes[0]
+    assert "INSERT INTO \"EmailDelivery\"" in sql
+    assert ids == [r["delivery_id"] for r in receipts]
+    assert subjects == ["Hi Ann", "Team"]
+    queued = [json.loads(f["data"]) for _, f in redis.streams[email_queue.settings.email_queue_stream]]
+    assert [q["id"] for q in queued] == ids
+    assert queued[0]["attempt"] == 0
+
+
+async def test_enqueue_marks_rows_failed_when_redis_is_down(conn):
+    redis = _FakeRedis()
+    redis.fail = True
+
+    with pytest.raises(ConnectionError):
+        await enqueue_emails([{"to": "a@example.com", "subject": "s", "body": "b"}], redis=redis)
+
+    assert "FAILED" in conn.executes[-1][0]
+
+
+async def test_enqueue_rejects_attachments(conn):
+    with pytest.raises(ValueError):
+        await enqueue_emails([{"to": "a", "subject": "s", "body": "b", "attachments": [{}]}], redis=_FakeRedis())
+
+
+async def test_failed_send_is_retried_with_backoff_then_sent(monkeypatch, conn):
+    redis = _FakeRedis()
+    service = _FakeService([{"sent": False, "reason": "451 try later"}, {"sent": True}])
+    monkeypatch.setattr(email_queue, "get_email_service", lambda: service)
+    sender = EmailSender(redis, rates={})
+    job = {"id": "d1", "message": {"to": "a@example.com", "subject": "s", "body": "b"}, "attempt": 0}
+
+    await sender.deliver(job)
+
+    (member, due), = redis.zsets[sender.retry_key].items()
+    assert json.loads(member)["attempt"] == 1
+    assert due == pytest.approx(time.time() + retry_delay(1), abs=2)
+    assert await sender.promote_due(now=time.time()) == 0
+    assert await sender.promote_due(now=due + 1) == 1
+
+    requeued = json.loads(redis.streams[sender.stream][-1][1]["data"])
+    await sender.deliver(requeued)
+
+    assert _statuses(conn) == ["SENDING", "RETRYING", "SENDING", "SENT"]
+    assert sender.stats()["sent"] == 1 and sender.stats()["retried"] == 1
+
+
+async def test_gives_up_after_max_attempts(monkeypatch, conn):
+    redis = _FakeRedis()
+    service = _FakeService([{"sent": False, "reason": "550 rejected"}])
+    monkeypatch.setattr(email_queue, "get_email_service", lambda: service)
+    monkeypatch.setattr(email_queue.settings, "email_max_attempts", 3)
+    sender = EmailSender(redis, rates={})
+
+    await sender.deliver({"id": "d1", "message": {"to": "a", "subject": "s", "body": "b"}, "attempt": 2})
+
+    assert _statuses(conn)[-1] == "FAILED"
+    assert sender.retry_key not in redis.zsets
+
+
+async def test_concurrent_deliveries_share_one_bulk_send(monkeypatch, conn):
+    service = _FakeService([{"sent": True}] * 5)
+    monkeypatch.setattr(email_queue, "get_email_service", lambda: service)
+    sender = EmailSender(_FakeRedis(), rates={})
+    jobs = [{"id": f"d{i}", "message": {"to": f"u{i}@example.com", "subject": "s", "body": "b"}} for i in range(5)]
+
+    await asyncio.gather(*(sender.deliver(job) for job in jobs))
+
+    assert service.batches == [5]
+    assert _statuses(conn).count("SENT") == 5
+
+
+async def test_retry_status_is_written_before_parking(monkeypatch, conn):
+    redis = _FakeRedis()
+    service = _FakeService([{"sent": False, "reason": "451 try later"}])
+    monkeypatch.setattr(email_queue, "get_email_service", lambda: service)
+    sender = EmailSender(redis, rates={})
+
+    async def update(delivery_id, status, *args, **kwargs):
+        if status == "RETRYING":
+            raise ConnectionError("db down")
+
+    monkeypatch.setattr(sender, "_update", update)
+    with pytest.raises(ConnectionError):
+        await sender.deliver({"id": "d1", "message": {"to": "a", "subject": "s", "body": "b"}, "attempt": 0})
+
+    # Left pending for the consumer to retry, not parked as well
+    assert sender.retry_key not in redis.zsets
+
+
+def test_retry_delay_is_exponential_and_capped(monkeypatch):
+    monkeypatch.setattr(email_queue.settings, "email_retry_base_seconds", 10.0)
+    monkeypatch.setattr(email_queue.settings, "email_retry_max_seconds", 100.0)
+    assert [retry_delay(n) for n in range(1, 6)] == [10.0, 20.0, 40.0, 80.0, 100.0]
+
+
+async def test_token_bucket_shapes_rate():
+    bucket = TokenBucket(_FakeRedis(), "bucket", rate=50, capacity=2)
+    started = time.monotonic()
+    for _ in range(7):
+        await bucket.acquire()
+    # Two from the burst, five at 50/s
+    assert time.monotonic() - started >= 5 / 50 * 0.9
+
+
+async def test_token_bucket_is_shared_between_senders():
+    redis = _FakeRedis()
+    replicas = [TokenBucket(redis, "bucket", rate=50, capacity=2) for _ in range(2)]
+
+    async def drain(bucket):
+        for _ in range(4):
+            await bucket.acquire()
+
+    started = time.monotonic()
+    await asyncio.gather(*(drain(bucket) for bucket in replicas))
+    # Eight sends share one burst of two: six at 50/s, not three per replica
+    assert time.monotonic() - started >= 6 / 50 * 0.9
+
+
+def test_parse_rates():
+    assert parse_rates("smtp=1, SendGrid=50,bad,resend=0") == {"smtp": 1.0, "sendgrid": 50.0}
@@ -0,0 +1,189 @@
+import asyncio
+
+import aiosmtplib
+import pytest
+
+from app.services import email_service
+from app.services.email_service import EmailService, SmtpSessionPool, render
+
+
+class _FakeSMTP:
+    instances = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.is_connected = False
+        self.sent = []
+        self.drop_next = False
+        _FakeSMTP.instances.append(self)
+
+    async def connect(self):
+        self.is_connected = True
+
+    async def send_message(self, msg):
+        if self.drop_next:
+            self.is_connected = False
+            raise aiosmtplib.SMTPServerDisconnected("gone")
+        await asyncio.sleep(0.005)
+        self.sent.append(msg)
+
+    def close(self):
+        self.is_connected = False
+
+    async def quit(self):
+        self.is_connected = False
+
+
+class _FakeResponse:
+    def raise_for_status(self):
+        pass
+
+
+class _FakeHttp:
+    def __init__(self):
+        self.posts = []
+
+    async def post(self, url, headers=None, json=None):
+        self.posts.append((url, json))
+        await asyncio.sleep(0.005)
+        return _FakeResponse()
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    _FakeSMTP.instances = []
+    monkeypatch.setattr(email_service.aiosmtplib, "SMTP", _FakeSMTP)
+    return _FakeSMTP
+
+
+@pytest.fixture
+def fake_http(monkeypatch):
+    http = _FakeHttp()
+    monkeypatch.setattr(email_service, "get_http_client", lambda: http)
+    return http
+
+
+def _service(monkeypatch, provider):
+    for name, value in {
+        "email_provider": provider, "smtp_host": "smtp.example.com", "smtp_user": "me@example.com",
+        "smtp_password": "secret", "sendgrid_api_key": "key", "resend_api_key": "key", "smtp_pool_size": 2,
+    }.items():
+        monkeypatch.setattr(email_service.settings, name, value)
+    return EmailService()
+
+
+def _messages(n, **extra):
+    return [{"to": f"u{i}@example.com", "subject": "Hi -name-", "body": "Hello -name-",
+             "substitutions": {"-name-": f"User {i}"}, **extra} for i in range(n)]
+
+
+async def test_smtp_sessions_are_pooled(monkeypatch, fake_smtp):
+    service = _service(monkeypatch, "smtp")
+
+    results = await service.send_many(_messages(20))
+
+    assert all(r["sent"] for r in results)
+    assert len(fake_smtp.instances) == 2
+    assert sum(len(s.sent) for s in fake_smtp.instances) == 20
+    first = fake_smtp.instances[0].sent[0]
+    assert first["Subject"].startswith("Hi User ")
+    await service.close()
+    assert not any(s.is_connected for s in fake_smtp.instances)
+
+
+async def test_smtp_reconnects_when_idle_session_dropped(fake_smtp):
+    pool = SmtpSessionPool("smtp.example.com", 587, "me", "pw", size=1)
+
+    await pool.send("first")
+    fake_smtp.instances[0].drop_next = True
+    await pool.send("second")
+
+    assert pool.connects == 2
+    assert fake_smtp.instances[1].sent == ["second"]
+
+
+async def test_sendgrid_batches_personalizations(monkeypatch, fake_http):
+    service = _service(monkeypatch, "sendgrid")
+    messages = _messages(2500) + [{"to": "other@example.com", "subject": "Other", "body": "x"}]
+
+    results = await service.send_many(messages)
+
+    assert all(r["sent"] for r in results)
+    assert results[5]["recipients"] == ["u5@example.com"]
+    sizes = sorted(len(body["personalizations"]) for _, body in fake_http.posts)
+    assert sizes == [1, 500, 1000, 1000]
+    batch = next(body for _, body in fake_http.posts if len(body["personalizations"]) == 1000)
+    assert batch["subject"] == "Hi -name-"
+    assert batch["personalizations"][0]["substitutions"] == {"-name-": "User 0"}
+
+
+async def test_sendgrid_batches_count_to_and_cc_recipients(monkeypatch, fake_http):
+    service = _service(monkeypatch, "sendgrid")
+    messages = [
+        {"to": [f"u{i}@example.com", f"v{i}@example.com"], "cc": [f"c{i}@example.com"],
+         "subject": "Team", "body": "b"}
+        for i in range(700)
+    ]
+
+    results = await service.send_many(messages)
+
+    assert all(r["sent"] for r in results)
+    recipients = [
+        sum(len(p["to"]) + len(p.get("cc", [])) for p in body["personalizations"]) for _, body in fake_http.posts
+    ]
+    # 333 messages of 3 recipients fit under the 1000-recipient cap
+    assert sorted(recipients) == [102, 999, 999]
+
+
+async def test_smtp_session_is_discarded_when_send_is_cancelled(fake_smtp):
+    pool = SmtpSessionPool("smtp.example.com", 587, "me", "pw", size=1)
+
+    send = asyncio.create_task(pool.send("slow"))
+    await asyncio.sleep(0)
+    send.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await send
+
+    assert not fake_smtp.instances[0].is_connected
+    await pool.send("next")
+    assert pool.connects == 2
+
+
+async def test_send_bulk_streams_results_as_they_finish(monkeypatch):
+    service = _service(monkeypatch, "resend")
+
+    async def send_email(to, subject, body, **kwargs):
+        await asyncio.sleep(0.05 if to == "slow@example.com" else 0.0)
+        return {"sent": True, "recipients": [to]}
+
+    monkeypatch.setattr(service, "send_email", send_email)
+    messages = [{"to": "slow@example.com", "subject": "s", "body": "b"}] + _messages(3)
+
+    order = [index async for index, _ in service.send_bulk(messages)]
+
+    assert sorted(order) == [0, 1, 2, 3]
+    assert order[-1] == 0
+
+
+async def test_provider_concurrency_is_bounded(monkeypatch, fake_http):
+    service = _service(monkeypatch, "resend")
+    running = 0
+    peak = 0
+
+    async def post(url, headers=None, json=None):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return _FakeResponse()
+
+    monkeypatch.setattr(fake_http, "post", post)
+    await service.send_many(_messages(12), concurrency=12)
+
+    assert peak == email_service.settings.resend_concurrency
+
+
+def test_render_fills_substitutions():
+    assert render("Hi -name-, -name-!", {"-name-": "Ann"}) == "Hi Ann, Ann!"
+    assert render("unchanged", None) == "unchanged"
@@ -0,0 +1,43 @@
+import pytest
+
+from app.rag.embedding_cache import EmbeddingCache, cache_key
+
+
+def test_cache_key_normalizes_whitespace_and_separates_models():
+    assert cache_key("m", "  invoice\n total ") == cache_key("m", "invoice total")
+    assert cache_key("m", "invoice") != cache_key("other", "invoice")
+    assert cache_key("m", "Invoice") != cache_key("m", "invoice")
+
+
+async def test_round_trip_and_counters():
+    cache = EmbeddingCache(max_entries=10, use_redis=False)
+    assert await cache.get("m", "hello") is None
+
+    await cache.put("m", "hello", [0.25, -0.5, 1.0])
+    assert await cache.get("m", "hello ") == pytest.approx([0.25, -0.5, 1.0], abs=1e-3)
+
+    stats = cache.stats()
+    assert stats["hits_local"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+
+
+async def test_lru_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2, use_redis=False)
+    await cache.put("m", "a", [1.0])
+    await cache.put("m", "b", [2.0])
+    await cache.get("m", "a")
+    await cache.put("m", "c", [3.0])
+
+    assert await cache.get_many("m", ["a", "b", "c"]) == [[1.0], None, [3.0]]
+
+
+async def test_unreachable_redis_degrades_to_local_tier(monkeypatch):
+    from app.rag import embedding_cache
+
+    monkeypatch.setattr(embedding_cache.settings, "redis_url", "redis://127.0.0.1:1")
+    cache = EmbeddingCache(max_entries=10)
+
+    await cache.put("m", "x", [1.0])
+    assert await cache.get("m", "x") == [1.0]
+    assert await cache.get("m", "y") is None
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from app.rag.embeddings import EmbeddingBatcher
+
+
+async def test_concurrent_requests_share_one_call():
+    calls = []
+
+    async def embed(texts):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    batcher = EmbeddingBatcher(embed, window_ms=5, max_batch=100)
+    results = await asyncio.gather(*(batcher.submit(t) for t in ["a", "bb", "ccc", "a"]))
+
+    assert results == [[1.0], [2.0], [3.0], [1.0]]
+    assert calls == [["a", "bb", "ccc"]]
+    assert batcher.stats()["requests"] == 4
+    assert batcher.stats()["fill_ratio"] == pytest.approx(0.03)
+
+
+async def test_full_batch_flushes_without_waiting_for_window():
+    calls = []
+
+    async def embed(texts):
+        calls.append(len(texts))
+        return [[0.0] for _ in texts]
+
+    batcher = EmbeddingBatcher(embed, window_ms=10_000, max_batch=3)
+    await asyncio.wait_for(asyncio.gather(*(batcher.submit(str(i)) for i in range(6))), timeout=1)
+
+    assert calls == [3, 3]
+
+
+async def test_provider_error_propagates_to_every_caller():
+    async def embed(texts):
+        raise RuntimeError("rate limited")
+
+    batcher = EmbeddingBatcher(embed, window_ms=1)
+    results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
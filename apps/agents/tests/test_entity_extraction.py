@@ -0,0 +1,44 @@
+from app.services.entity_extraction import ExtractionEngine, FieldRule
+
+INVOICE = """ACME CORP
+Invoice Number: INV-2024-001
+Date: January 15, 2024
+Due Date: February 15, 2024
+
+From:
+  Acme Corp
+  123 Business St
+
+Subtotal $1,000.00
+TOTAL $1,234.50
+"""
+
+
+def test_default_rules_extract_invoice_fields():
+    entities = ExtractionEngine().extract(INVOICE)
+
+    assert entities == {
+        "invoice_number": "INV-2024-001",
+        "date": "January 15, 2024",
+        "amount": 1000.0,
+        "vendor": "Acme Corp",
+    }
+
+
+def test_missing_fields_are_omitted():
+    assert ExtractionEngine().extract("nothing to see here") == {}
+
+
+def test_unconvertible_value_falls_through_to_next_occurrence():
+    entities = ExtractionEngine().extract("Total ,\nTotal $42.10")
+    assert entities == {"amount": 42.1}
+
+
+def test_vendor_rules_selected_by_fingerprint_and_fall_back_to_defaults():
+    engine = ExtractionEngine()
+    engine.register_vendor("northwind", ["Northwind Traders"], [FieldRule("invoice_number", "Ref", r"Ref\s*#\s*(\d+)", str)])
+
+    vendor_invoice = "NORTHWIND TRADERS\nRef # 778\nTotal $9.99"
+    assert engine.select(vendor_invoice).name == "northwind"
+    assert engine.extract(vendor_invoice) == {"invoice_number": "778", "amount": 9.99}
+    assert engine.select(INVOICE).name == "default"
@@ -0,0 +1,197 @@
+import asyncio
+import json
+
+import pytest
+
+from app.workers.event_bus import StreamConsumer, publish_event
+
+
+def _consumer(redis, handler, **kwargs):
+    options = dict(stream="events", group="workers", consumer="c1", batch_size=10, block_ms=10,
+                   concurrency=4, claim_idle_ms=50, max_deliveries=3)
+    options.update(kwargs)
+    return StreamConsumer(redis, handler, **options)
+
+
+async def test_publish_dedupes_identical_payloads(fake_redis):
+    redis = fake_redis
+    payload = json.dumps({"type": "task_stuck", "task_id": "t1"})
+
+    assert await publish_event(redis, payload, dedupe_seconds=5) is not None
+    assert await publish_event(redis, payload, dedupe_seconds=5) is None
+    assert await publish_event(redis, json.dumps({"type": "task_stuck", "task_id": "t2"}), dedupe_seconds=5)
+    assert await publish_event(redis, payload, dedupe_seconds=0) is not None
+
+
+async def test_failed_publish_releases_dedupe_key(fake_redis, monkeypatch):
+    payload = json.dumps({"type": "task_stuck", "task_id": "t1"})
+
+    async def xadd(*args, **kwargs):
+        raise ConnectionError("redis down")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(fake_redis, "xadd", xadd)
+        with pytest.raises(ConnectionError):
+            await publish_event(fake_redis, payload, dedupe_seconds=5)
+
+    assert fake_redis.keys == {}
+    assert await publish_event(fake_redis, payload, dedupe_seconds=5) is not None
+
+
+async def test_entries_are_acked_after_handling(fake_redis):
+    redis = fake_redis
+    seen = []
+
+    async def handler(event):
+        seen.append(event["n"])
+
+    consumer = _consumer(redis, handler)
+    await consumer.ensure_group()
+    for n in range(5):
+        await redis.xadd("events", {"data": json.dumps({"n": n})})
+    await redis.xadd("events", {"data": "not json"})
+
+    assert await consumer.read_batch() == 6
+    await consumer.drain()
+
+    assert sorted(seen) == [0, 1, 2, 3, 4]
+    assert redis.pending == {}
+    assert consumer.stats()["acked"] == 6
+
+
+async def test_delete_acked_removes_handled_entries(fake_redis):
+    redis = fake_redis
+
+    async def handler(event):
+        if event["n"] == 1:
+            raise RuntimeError("boom")
+
+    consumer = _consumer(redis, handler, delete_acked=True)
+    for n in range(3):
+        await redis.xadd("events", {"data": json.dumps({"n": n})})
+
+    await consumer.read_batch()
+    await consumer.drain()
+
+    # Only the failed entry is left, pending for a retry
+    assert [json.loads(f["data"])["n"] for _, f in redis.streams["events"]] == [1]
+    assert list(redis.pending) == [redis.streams["events"][0][0]]
+
+
+async def test_concurrency_is_bounded(fake_redis):
+    redis = fake_redis
+    running = 0
+    peak = 0
+
+    async def handler(event):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    consumer = _consumer(redis, handler, concurrency=3, batch_size=20)
+    for n in range(12):
+        await redis.xadd("events", {"data": json.dumps({"n": n})})
+
+    await consumer.read_batch()
+    await consumer.drain()
+
+    assert peak == 3
+    assert consumer.acked == 12
+
+
+async def test_failed_entry_is_reclaimed_and_retried(fake_redis):
+    redis = fake_redis
+    attempts = []
+
+    async def handler(event):
+        attempts.append(event["n"])
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+
+    consumer = _consumer(redis, handler)
+    await redis.xadd("events", {"data": json.dumps({"n": 1})})
+    await consumer.read_batch()
+    await consumer.drain()
+    assert list(redis.pending) == ["1-0"]
+
+    # Not idle long enough yet
+    assert await consumer.reclaim() == 0
+    await asyncio.sleep(0.06)
+    assert await consumer.reclaim() == 1
+    await consumer.drain()
+
+    assert attempts == [1, 1]
+    assert redis.pending == {}
+    assert consumer.stats()["reclaimed"] == 1
+
+
+async def test_poison_entry_is_dead_lettered(fake_redis):
+    redis = fake_redis
+
+    async def handler(event):
+        raise RuntimeError("always")
+
+    consumer = _consumer(redis, handler, max_deliveries=2, claim_idle_ms=1)
+    await redis.xadd("events", {"data": json.dumps({"n": 1})})
+    await consumer.read_batch()
+    await consumer.drain()
+
+    for _ in range(3):
+        await asyncio.sleep(0.005)
+        await consumer.reclaim()
+        await consumer.drain()
+
+    assert redis.pending == {}
+    dead = redis.streams["events:dead"]
+    assert len(dead) == 1
+    assert dead[0][1]["source_id"] == "1-0"
+    assert consumer.dead_lettered == 1
+    assert consumer.failed == 2
+
+
+async def test_entries_still_running_are_not_reclaimed(fake_redis):
+    redis = fake_redis
+    release = asyncio.Event()
+    calls = []
+
+    async def handler(event):
+        calls.append(event["n"])
+        await release.wait()
+
+    consumer = _consumer(redis, handler, claim_idle_ms=1)
+    await redis.xadd("events", {"data": json.dumps({"n": 1})})
+    await consumer.read_batch()
+    await asyncio.sleep(0.01)
+    await consumer.reclaim()
+    release.set()
+    await consumer.drain()
+
+    assert calls == [1]
+    assert redis.pending == {}
+
+
+async def test_keep_alive_stops_other_consumers_reclaiming_held_entries(fake_redis):
+    redis = fake_redis
+    calls = []
+
+    async def handler(event):
+        calls.append(event["n"])
+        await asyncio.sleep(0.05)
+
+    # One slot, so the second entry waits for the first while pending
+    consumer = _consumer(redis, handler, concurrency=1, claim_idle_ms=30, keep_alive=True)
+    other = _consumer(redis, handler, consumer="c2", claim_idle_ms=30)
+    for n in (1, 2):
+        await redis.xadd("events", {"data": json.dumps({"n": n})})
+
+    running = asyncio.create_task(consumer.run())
+    for _ in range(8):
+        await asyncio.sleep(0.015)
+        assert await other.reclaim() == 0
+    running.cancel()
+    await asyncio.gather(running, return_exceptions=True)
+
+    assert calls == [1, 2]
+    assert redis.pending == {}
@@ -0,0 +1,84 @@
+import pytest
+
+from app.rag.hybrid_search import HybridSearch, reciprocal_rank_fusion
+
+
+def _doc(doc_id):
+    return {"id": doc_id, "name": doc_id, "type": "invoice", "source": None, "url": f"https://x/{doc_id}"}
+
+
+def test_rrf_rewards_documents_ranked_by_both():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], k=60)
+
+    assert [doc_id for doc_id, _ in fused] == ["c", "a", "b", "d"]
+    assert fused[0][1] == 1 / 63 + 1 / 61
+
+
+def _searcher(monkeypatch, lexical, semantic):
+    search = HybridSearch(candidates=10)
+    calls = []
+
+    async def fake_lexical(query, depth, doc_type):
+        calls.append(query)
+        return [_doc(i) for i in lexical]
+
+    async def fake_semantic(query, depth, doc_type):
+        return semantic
+
+    async def fake_fetch(ids, doc_type):
+        return [_doc(i) for i in ids]
+
+    monkeypatch.setattr(search, "_lexical", fake_lexical)
+    monkeypatch.setattr(search, "_semantic", fake_semantic)
+    monkeypatch.setattr(search, "_fetch", fake_fetch)
+    return search, calls
+
+
+async def test_search_fuses_fetches_vector_only_hits_and_paginates(monkeypatch):
+    search, _ = _searcher(monkeypatch, lexical=["a", "b"], semantic=["c", "a"])
+
+    first = await search.search("acme invoice", limit=2)
+    second = await search.search("acme invoice", limit=2, offset=2)
+
+    assert [r["id"] for r in first] == ["a", "c"]
+    assert [r["id"] for r in second] == ["b"]
+    assert first[1]["url"] == "https://x/c"
+
+
+async def test_results_are_cached_until_invalidated(monkeypatch):
+    search, calls = _searcher(monkeypatch, lexical=["a"], semantic=[])
+
+    await search.search("Acme  Invoice")
+    await search.search("acme invoice")
+    assert len(calls) == 1
+
+    search.invalidate()
+    await search.search("acme invoice")
+    assert len(calls) == 2
+
+
+async def test_pages_are_sliced_from_one_ranking(monkeypatch):
+    lexical = [f"l{i}" for i in range(10)]
+    semantic = [f"s{i}" for i in range(10)]
+    search, calls = _searcher(monkeypatch, lexical=lexical, semantic=semantic)
+    depths = []
+    rank = search._rank
+
+    async def tracking_rank(query, depth, doc_type):
+        depths.append(depth)
+        return await rank(query, depth, doc_type)
+
+    monkeypatch.setattr(search, "_rank", tracking_rank)
+    pages = [await search.search("q", limit=5, offset=offset) for offset in range(0, 10, 5)]
+
+    ids = [r["id"] for page in pages for r in page]
+    assert len(ids) == len(set(ids)) == 10
+    assert depths == [10] and len(calls) == 1
+
+
+async def test_pages_past_the_ranked_depth_are_rejected(monkeypatch):
+    search, calls = _searcher(monkeypatch, lexical=["a"], semantic=[])
+
+    with pytest.raises(ValueError):
+        await search.search("q", limit=4, offset=8)
+    assert calls == []
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import pytest
+
+from app.rag import pinecone_client
+from app.rag.pinecone_client import PineconeClient
+from app.rag.vector_store import PersistentVectorIndex
+
+
+class _FakeIndex:
+    """Synchronous stand-in for a Pinecone index that records its calls."""
+
+    def __init__(self, fail_times=0, fail_ids=()):
+        self.upserts = []
+        self.deletes = []
+        self.fail_times = fail_times
+        self.fail_ids = set(fail_ids)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.threads = set()
+        self._lock = threading.Lock()
+
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.threads.add(threading.current_thread().name)
+        time.sleep(0.01)
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def upsert(self, vectors):
+        self._enter()
+        try:
+            with self._lock:
+                if self.fail_times:
+                    self.fail_times -= 1
+                    raise ConnectionError("transient")
+            if any(v["id"] in self.fail_ids for v in vectors):
+                raise ValueError("rejected")
+            self.upserts.append(vectors)
+        finally:
+            self._exit()
+
+    def delete(self, ids):
+        self._enter()
+        self.deletes.append(ids)
+        self._exit()
+
+
+@pytest.fixture
+def fake_index(monkeypatch):
+    def install(index):
+        monkeypatch.setattr(pinecone_client, "_get_index", lambda: index)
+        monkeypatch.setattr(pinecone_client.settings, "pinecone_concurrency", 3)
+        monkeypatch.setattr(pinecone_client.settings, "pinecone_retry_backoff_seconds", 0.0)
+        pinecone_client.shutdown_pinecone_executor()
+        return PineconeClient.__new__(PineconeClient)
+    yield install
+    pinecone_client.shutdown_pinecone_executor()
+
+
+def _vectors(n):
+    return [{"id": f"v{i}", "values": [1.0, 0.0], "metadata": {}} for i in range(n)]
+
+
+async def test_upsert_many_pages_off_the_event_loop(fake_index):
+    index = _FakeIndex()
+    client = fake_index(index)
+
+    failed = await client.upsert_many(_vectors(450), page_size=500)
+
+    assert failed == []
+    # Page size is capped at Pinecone's 100-vector limit
+    assert sorted(len(p) for p in index.upserts) == [50, 100, 100, 100, 100]
+    assert 1 < index.max_in_flight <= 3
+    assert all(name.startswith("pinecone") for name in index.threads)
+
+
+async def test_upsert_many_retries_and_reports_failed_pages(fake_index, monkeypatch):
+    monkeypatch.setattr(pinecone_client.settings, "pinecone_max_retries", 2)
+    index = _FakeIndex(fail_times=2, fail_ids={"v7"})
+    client = fake_index(index)
+
+    failed = await client.upsert_many(_vectors(20), page_size=5)
+
+    # Transient errors were retried; only the page holding v7 is reported
+    assert failed == ["v5", "v6", "v7", "v8", "v9"]
+    assert sum(len(p) for p in index.upserts) == 15
+
+    with pytest.raises(RuntimeError):
+        await client.upsert_document("v7", [1.0, 0.0], {})
+
+
+async def test_delete_many_pages_by_thousand(fake_index):
+    index = _FakeIndex()
+    client = fake_index(index)
+
+    assert await client.delete_many([f"v{i}" for i in range(2500)]) == []
+    assert sorted(len(p) for p in index.deletes) == [500, 1000, 1000]
+
+    await client.delete_document("v1")
+    assert ["v1"] in index.deletes
+
+
+async def test_persistent_local_index_is_written_in_bulk_off_the_event_loop(fake_index, monkeypatch, tmp_path):
+    client = fake_index(None)
+    local = PersistentVectorIndex(str(tmp_path), checkpoint_ops=0)
+    monkeypatch.setattr(pinecone_client, "_local_index", local)
+    threads = []
+    upsert_many = local.upsert_many
+    monkeypatch.setattr(local, "upsert_many", lambda items: threads.append(threading.current_thread()) or upsert_many(items))
+
+    assert await client.upsert_many(_vectors(5)) == []
+    assert await client.delete_many(["v0", "v1"]) == []
+
+    assert threads and threads[0] is not threading.main_thread()
+    assert len(PersistentVectorIndex(str(tmp_path))) == 3
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from app.rag.quantization import ProductQuantizer, ScalarQuantizer, make_quantizer
+from app.rag.vector_index import VectorIndex
+
+
+def _unit_vectors(n, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("quantizer,tolerance", [(ScalarQuantizer(), 0.02), (ProductQuantizer(m=16), 0.35)])
+def test_asymmetric_scores_approximate_inner_products(quantizer, tolerance):
+    vectors = _unit_vectors(2000)
+    quantizer.train(vectors)
+    codes = quantizer.encode(vectors)
+    query = _unit_vectors(1, seed=1)[0]
+
+    approx = quantizer.scores(codes, query)
+    assert codes.dtype == quantizer.code_dtype
+    assert np.abs(approx - vectors @ query).max() < tolerance
+    assert np.allclose(approx, quantizer.decode(codes) @ query, atol=1e-4)
+
+
+def test_unknown_storage_mode_and_bad_subspaces_raise():
+    with pytest.raises(ValueError):
+        make_quantizer("fp8")
+    with pytest.raises(ValueError):
+        ProductQuantizer(m=7).code_size(64)
+
+
+@pytest.mark.parametrize("storage", ["int8", "pq"])
+def test_compressed_index_switches_storage_and_keeps_ranking(storage):
+    vectors = _unit_vectors(3000)
+    index = VectorIndex(storage=storage, pq_subspaces=16)
+    for i, v in enumerate(vectors):
+        index.upsert(f"doc-{i}", v.tolist(), {"type": "even" if i % 2 == 0 else "odd"})
+    index.quantize()
+
+    assert index._vectors is None
+    assert index.memory_bytes() <= len(index._alive) * vectors.shape[1] * 4 / 4
+
+    query = vectors[42] + 0.05 * _unit_vectors(1, seed=2)[0]
+    assert index.search(query.tolist(), top_k=1)[0][0] == "doc-42"
+    assert index.search(query.tolist(), top_k=1, approximate=True, nprobe=8)[0][0] == "doc-42"
+    assert all(r[2]["type"] == "odd" for r in index.search(query.tolist(), top_k=5, filter_dict={"type": "odd"}))
+
+
+def test_rerank_returns_exact_scores():
+    vectors = _unit_vectors(3000)
+    index = VectorIndex(storage="pq", pq_subspaces=8, rerank=10)
+    for i, v in enumerate(vectors):
+        index.upsert(f"doc-{i}", v.tolist(), {})
+    index.quantize()
+
+    query = _unit_vectors(1, seed=3)[0]
+    expected = np.argsort(-(vectors @ query))[:5]
+    results = index.search(query.tolist(), top_k=5)
+
+    assert [r[0] for r in results] == [f"doc-{i}" for i in expected]
+    assert results[0][1] == pytest.approx(float(vectors[expected[0]] @ query), abs=1e-5)
+
+
+def test_persistent_store_re_encodes_after_segment_reload(tmp_path):
+    from app.rag.vector_store import PersistentVectorIndex
+
+    vectors = _unit_vectors(1200)
+    index = PersistentVectorIndex(str(tmp_path), storage="int8")
+    for i, v in enumerate(vectors):
+        index.upsert(f"doc-{i}", v.tolist(), {})
+    index.quantize()
+    index.checkpoint()
+
+    assert index._codes is None
+    assert index.search(vectors[7].tolist(), top_k=1)[0][0] == "doc-7"
+    assert index._codes is not None
+    assert index._vectors is not None
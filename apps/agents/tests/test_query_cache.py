@@ -0,0 +1,151 @@
+import asyncio
+
+from app.rag.query_cache import QueryCache, query_key
+from app.rag.retriever import RAGRetriever
+
+
+class _FakeEmbeddings:
+    is_mock = False
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = 0
+
+    async def generate_embedding(self, text):
+        self.calls += 1
+        return self.vectors.get(text, [0.0, 0.0, 1.0])
+
+
+class _FakePinecone:
+    def __init__(self):
+        self.queries = 0
+        self.gate = None
+
+    async def query(self, query_embedding, top_k, filter_dict, approximate, nprobe):
+        self.queries += 1
+        if self.gate:
+            await self.gate.wait()
+        return [{"id": "a", "score": 0.9, "metadata": {"text": "alpha", "doc_id": "a"}}]
+
+    async def upsert_document(self, doc_id, embedding, metadata):
+        pass
+
+    async def list_chunk_ids(self, doc_id):
+        return []
+
+    async def delete_many(self, ids):
+        return []
+
+
+def _retriever(similarity=0.0, vectors=None, redis=None):
+    retriever = RAGRetriever.__new__(RAGRetriever)
+    retriever.embeddings_service = _FakeEmbeddings(vectors or {})
+    retriever.pinecone_client = _FakePinecone()
+    retriever.query_cache = QueryCache(
+        max_entries=8, ttl_seconds=60, similarity_threshold=similarity, use_redis=redis is not None,
+    )
+    retriever.query_cache._redis = redis
+    return retriever
+
+
+def test_key_normalizes_query_and_filter_order():
+    assert query_key("  Overdue   Invoices ", 5, {"a": 1, "b": 2}, False, None) == \
+        query_key("overdue invoices", 5, {"b": 2, "a": 1}, False, None)
+    assert query_key("q", 5, None, False, None) != query_key("q", 10, None, False, None)
+    assert query_key("q", 5, {"type": "invoice"}, False, None) != query_key("q", 5, None, False, None)
+
+
+def test_lru_and_ttl_eviction():
+    cache = QueryCache(max_entries=2, ttl_seconds=60)
+    for name in ("a", "b"):
+        cache.put((name,), cache.generation, [name])
+    cache.get(("a",))
+    cache.put(("c",), cache.generation, ["c"])
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == ["a"]
+
+    expired = QueryCache(max_entries=2, ttl_seconds=-1)
+    expired.put(("a",), expired.generation, ["a"])
+    assert expired.get(("a",)) is None
+
+
+async def test_repeated_search_skips_embedding_and_query():
+    retriever = _retriever()
+
+    first = await retriever.semantic_search("Overdue invoices", top_k=3)
+    second = await retriever.semantic_search("overdue   invoices", top_k=3)
+
+    assert first == second
+    assert retriever.embeddings_service.calls == 1
+    assert retriever.pinecone_client.queries == 1
+
+    await retriever.semantic_search("overdue invoices", top_k=3, filter_dict={"type": "invoice"})
+    assert retriever.pinecone_client.queries == 2
+
+
+async def test_index_writes_invalidate():
+    retriever = _retriever()
+    await retriever.semantic_search("contracts")
+
+    await retriever.index_document("d1", "new contract", {})
+    await retriever.semantic_search("contracts")
+    assert retriever.pinecone_client.queries == 2
+
+    await retriever.delete_document("d1")
+    await retriever.semantic_search("contracts")
+    assert retriever.pinecone_client.queries == 3
+
+
+async def test_search_racing_a_write_is_not_cached():
+    retriever = _retriever()
+    retriever.pinecone_client.gate = asyncio.Event()
+
+    search = asyncio.create_task(retriever.semantic_search("contracts"))
+    await asyncio.sleep(0)
+    await retriever.index_document("d1", "new contract", {})
+    retriever.pinecone_client.gate.set()
+    await search
+
+    retriever.pinecone_client.gate = None
+    await retriever.semantic_search("contracts")
+    assert retriever.pinecone_client.queries == 2
+
+
+async def test_writes_from_another_process_invalidate(fake_redis):
+    writer, reader = _retriever(redis=fake_redis), _retriever(redis=fake_redis)
+    await reader.semantic_search("contracts")
+    await reader.semantic_search("contracts")
+    assert reader.pinecone_client.queries == 1
+
+    await writer.index_document("d1", "new contract", {})
+    await reader.semantic_search("contracts")
+    assert reader.pinecone_client.queries == 2
+
+
+async def test_cache_is_bypassed_while_shared_generation_is_unreachable(fake_redis, monkeypatch):
+    retriever = _retriever(redis=fake_redis)
+
+    async def get(key):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(fake_redis, "get", get)
+    await retriever.semantic_search("contracts")
+    await retriever.semantic_search("contracts")
+    assert retriever.pinecone_client.queries == 2
+
+
+async def test_near_duplicate_queries_share_results():
+    vectors = {
+        "unpaid invoices": [1.0, 0.0, 0.0],
+        "invoices unpaid": [0.99, 0.05, 0.0],
+        "team roster": [0.0, 1.0, 0.0],
+    }
+    retriever = _retriever(similarity=0.95, vectors=vectors)
+
+    await retriever.semantic_search("unpaid invoices")
+    await retriever.semantic_search("invoices unpaid")
+    assert retriever.pinecone_client.queries == 1
+    assert retriever.query_cache.near_hits == 1
+
+    await retriever.semantic_search("team roster")
+    assert retriever.pinecone_client.queries == 2
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from app.rag.chunking import chunk_text, count_tokens
+from app.rag.query_cache import QueryCache
+from app.rag.retriever import RAGRetriever
+
+
+def test_chunks_respect_budget_and_overlap():
+    text = " ".join(f"word{i}" for i in range(1000))
+    chunks = chunk_text(text, max_tokens=100, overlap=20)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(c) <= 110 for c in chunks)
+    # Every word survives, and consecutive chunks share a tail/head
+    assert set(text.split()) == {w for c in chunks for w in c.split()}
+    assert chunks[0].split()[-1] in chunks[1].split()
+
+
+def test_short_and_blank_text():
+    assert chunk_text("one short line", max_tokens=100) == ["one short line"]
+    assert chunk_text("   ") == []
+    with pytest.raises(ValueError):
+        chunk_text("x", max_tokens=10, overlap=10)
+
+
+class _FakeEmbeddings:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.batch_sizes = []
+
+    async def generate_batch_embeddings(self, texts):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.batch_sizes.append(len(texts))
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return [[1.0, 0.0] for _ in texts]
+
+
+class _FakePinecone:
+    def __init__(self):
+        self.pages = []
+        self.ids = set()
+
+    async def upsert_many(self, vectors, page_size=None):
+        for start in range(0, len(vectors), page_size):
+            self.pages.append(vectors[start:start + page_size])
+        self.ids.update(v["id"] for v in vectors)
+        return []
+
+    async def list_chunk_ids(self, doc_id):
+        return [i for i in self.ids if i.startswith(f"{doc_id}#")]
+
+    async def delete_many(self, ids):
+        self.ids.difference_update(ids)
+        return []
+
+
+def _retriever():
+    retriever = RAGRetriever.__new__(RAGRetriever)
+    retriever.embeddings_service = _FakeEmbeddings()
+    retriever.pinecone_client = _FakePinecone()
+    retriever.query_cache = QueryCache()
+    return retriever
+
+
+async def test_index_batch_pipeline_bounds_concurrency_and_pages():
+    retriever = _retriever()
+    progress = []
+
+    docs = [{"id": f"d{i}", "text": " ".join(["token"] * 300), "metadata": {"type": "note"}} for i in range(20)]
+    result = await retriever.index_batch(
+        docs, chunk_tokens=100, chunk_overlap=10, embed_batch_size=8,
+        concurrency=2, upsert_page_size=3, on_progress=progress.append,
+    )
+
+    total_chunks = sum(len(p) for p in retriever.pinecone_client.pages)
+    assert result["documents"] == 20
+    assert result["chunks"] == total_chunks
+    assert result["failed_chunks"] == 0
+    assert retriever.embeddings_service.max_in_flight <= 2
+    assert max(retriever.embeddings_service.batch_sizes) <= 8
+    assert max(len(p) for p in retriever.pinecone_client.pages) <= 3
+    assert progress[-1]["chunks"] == total_chunks
+
+    first = retriever.pinecone_client.pages[0][0]
+    assert first["id"] == "d0#0"
+    assert first["metadata"]["doc_id"] == "d0"
+    assert first["metadata"]["type"] == "note"
+    assert retriever.query_cache.generation > 0
+
+
+async def test_reindexing_shorter_document_drops_old_chunks():
+    retriever = _retriever()
+    pinecone = retriever.pinecone_client
+
+    await retriever.index_batch([{"id": "d1", "text": " ".join(["token"] * 300)}], chunk_tokens=100, chunk_overlap=0)
+    await retriever.index_batch([{"id": "d10", "text": "other"}])
+    assert len([i for i in pinecone.ids if i.startswith("d1#")]) > 1
+
+    await retriever.index_batch([{"id": "d1", "text": "now short"}], chunk_tokens=100, chunk_overlap=0)
+    assert sorted(pinecone.ids) == ["d1#0", "d10#0"]
+
+    await retriever.delete_document("d1")
+    assert pinecone.ids == {"d10#0"}
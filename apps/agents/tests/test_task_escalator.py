@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from app.agents import task_escalator
+from app.agents.task_escalator import TaskEscalatorAgent
+from tests.conftest import FakeConn
+
+
+class _EscalatorConn(FakeConn):
+    """Evaluates the escalator's keyset chunk query against in-memory tasks."""
+
+    def __init__(self, tasks):
+        super().__init__()
+        self.tasks = tasks
+        self.details = {}
+
+    async def fetch(self, sql, threshold, after_updated, after_id, limit):
+        await super().fetch(sql, threshold, after_updated, after_id, limit)
+        stuck = sorted(
+            (t for t in self.tasks
+             if t["status"] == "ACTIVE" and t["healthStatus"] != "CRITICAL" and t["lastUpdated"] < threshold
+             and (t["lastUpdated"], t["id"]) > (after_updated, after_id)),
+            key=lambda t: (t["lastUpdated"], t["id"]),
+        )[:limit]
+        for t in stuck:
+            t["healthStatus"] = "CRITICAL"
+        # Deliberately unordered, like RETURNING
+        return [{"id": t["id"], "lastUpdated": t["lastUpdated"]} for t in reversed(stuck)]
+
+    async def execute(self, sql, detail_ids, task_ids):
+        await super().execute(sql, detail_ids, task_ids)
+        assert "ON CONFLICT" in sql
+        for detail_id, task_id in zip(detail_ids, task_ids):
+            self.details.setdefault(task_id, detail_id)
+
+
+async def test_escalates_backlog_in_chunks(fake_db):
+    now = datetime.utcnow()
+    old = now - timedelta(days=5)
+    tasks = [
+        # Many tasks share a timestamp, so the cursor must break ties on id
+        {"id": f"t{i:03d}", "status": "ACTIVE", "lastUpdated": old + timedelta(minutes=i // 4),
+         "healthStatus": "HEALTHY"}
+        for i in range(25)
+    ]
+    tasks.append({"id": "fresh", "status": "ACTIVE", "lastUpdated": now, "healthStatus": "HEALTHY"})
+    tasks.append({"id": "done", "status": "COMPLETED", "lastUpdated": old, "healthStatus": "HEALTHY"})
+    conn = fake_db(task_escalator, conn=_EscalatorConn(tasks))
+    conn.details["t000"] = "existing"
+
+    result = await TaskEscalatorAgent(chunk_size=10).run()
+
+    assert result["tasks_escalated"] == 25
+    assert result["chunks"] == 3
+    assert result["rows_per_second"] > 0
+    assert conn.transactions == 3
+    assert len(conn.fetches) + len(conn.executes) == 6
+    assert sorted(conn.details) == sorted(f"t{i:03d}" for i in range(25))
+    assert conn.details["t000"] == "existing"
+    assert {t["id"] for t in tasks if t["healthStatus"] == "CRITICAL"} == set(conn.details)
+
+
+async def test_nothing_stuck(fake_db):
+    conn = fake_db(task_escalator, conn=_EscalatorConn([]))
+
+    result = await TaskEscalatorAgent(chunk_size=10).run()
+
+    assert result["tasks_escalated"] == 0
+    assert conn.queries == 1 and not conn.executes
+
+
+async def test_already_critical_tasks_are_left_alone(fake_db):
+    old = datetime.utcnow() - timedelta(days=5)
+    tasks = [{"id": "t1", "status": "ACTIVE", "lastUpdated": old, "healthStatus": "HEALTHY"}]
+    fake_db(task_escalator, conn=_EscalatorConn(tasks))
+    agent = TaskEscalatorAgent(chunk_size=10)
+
+    assert (await agent.run())["tasks_escalated"] == 1
+    assert (await agent.run())["tasks_escalated"] == 0
@@ -0,0 +1,92 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from app.agents import team_coordinator
+from app.agents.team_coordinator import TeamCoordinatorAgent
+from app.services.email_service import EmailService
+
+
+def _assignment(i, member, last_upload):
+    return {
+        "id": f"ta{i}", "teamMemberId": member, "email": f"{member}@example.com", "name": member,
+        "title": f"Task {i}", "taskId": f"t{i}", "lastUploadAt": last_upload,
+    }
+
+
+async def test_reminders_use_one_query_and_group_by_member(fake_db, fake_email):
+    now = datetime.utcnow()
+    rows = [
+        _assignment(1, "ann", None),
+        _assignment(2, "ann", None),
+        _assignment(3, "bob", now - timedelta(days=10)),
+        _assignment(4, "cat", now - timedelta(days=1)),
+    ]
+    conn = fake_db(team_coordinator, rows=rows)
+
+    result = await TeamCoordinatorAgent().run()
+
+    assert conn.queries == 1
+    assert '"lastRemindedAt"' in conn.fetches[0][0]
+    assert result == {"assignments_checked": 4, "members_reminded": 2, "reminders_sent": 2}
+    assert sorted(m["to"] for m in fake_email.sent) == ["ann@example.com", "bob@example.com"]
+    ann = next(m for m in fake_email.sent if m["to"] == "ann@example.com")
+    assert "Task 1" in ann["body"] and "Task 2" in ann["body"]
+    assert fake_email.rate > 0
+
+
+async def test_team_report_is_cached_per_project(monkeypatch, fake_db, fake_email):
+    conn = fake_db(
+        team_coordinator,
+        rows=[{"id": "m1", "name": "Ann", "email": "ann@example.com", "taskCount": 2}],
+        row={"total": 3, "completed": 1, "active": 2, "critical": 0},
+    )
+    monkeypatch.setattr(team_coordinator, "_report_cache", OrderedDict())
+    agent = TeamCoordinatorAgent()
+
+    first = await agent.generate_team_report("p1")
+    again = await agent.generate_team_report("p1")
+    assert again is first
+    assert conn.queries == 2
+
+    await agent.generate_team_report("p2")
+    await agent.generate_team_report("p1", use_cache=False)
+    assert conn.queries == 6
+
+
+async def test_reminded_members_are_stamped(fake_db, fake_email):
+    conn = fake_db(team_coordinator, rows=[_assignment(1, "ann", None), _assignment(2, "bob", None)])
+    fake_email.failing = ["bob@example.com"]
+
+    result = await TeamCoordinatorAgent().run()
+
+    assert result["reminders_sent"] == 1
+    (sql, (members,)), = conn.executes
+    assert '"lastRemindedAt" = NOW()' in sql
+    assert members == ["ann"]
+
+
+async def test_report_cache_is_bounded(monkeypatch, fake_db, fake_email):
+    fake_db(team_coordinator, row={"total": 0, "completed": 0, "active": 0, "critical": 0})
+    monkeypatch.setattr(team_coordinator, "_report_cache", OrderedDict())
+    monkeypatch.setattr(team_coordinator.get_settings(), "team_report_cache_size", 2)
+    agent = TeamCoordinatorAgent()
+
+    for project in ("p1", "p2", "p1", "p3"):
+        await agent.generate_team_report(project)
+
+    assert list(team_coordinator._report_cache) == ["p1", "p3"]
+
+
+async def test_send_many_rate_limit_spaces_sends():
+    starts = []
+
+    class _Service(EmailService):
+        async def send_email(self, to, subject, body, **kwargs):
+            starts.append(time.monotonic())
+            return {"sent": True}
+
+    messages = [{"to": f"u{i}@example.com", "subject": "s", "body": "b"} for i in range(5)]
+    await _Service().send_many(messages, concurrency=5, rate_per_second=50)
+
+    assert starts[-1] - starts[0] >= 4 / 50 * 0.9
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.workers.deadlines import DeadlineScheduler
+from app.workers.trigger_engine import Trigger, TriggerEngine
+
+
+# ── DeadlineScheduler ────────────────────────────────────────────────────────
+
+def test_scheduler_pops_in_order_and_honours_moves_and_cancels():
+    deadlines = DeadlineScheduler()
+    for key, due in [("a", 30.0), ("b", 10.0), ("c", 20.0), ("d", 40.0)]:
+        deadlines.schedule(key, due)
+    deadlines.schedule("d", 5.0)      # moved earlier
+    deadlines.schedule("b", 50.0)     # moved later
+    assert deadlines.cancel("c")
+    assert not deadlines.cancel("missing")
+
+    assert deadlines.peek() == 5.0
+    assert deadlines.pop_due(35.0) == ["d", "a"]
+    assert deadlines.pop_due(35.0) == []
+    assert len(deadlines) == 1 and deadlines.get("b") == 50.0
+
+
+def test_scheduler_stays_compact_under_churn():
+    deadlines = DeadlineScheduler()
+    rng = random.Random(0)
+    for i in range(200_000):
+        deadlines.schedule(i, rng.random())
+    for i in range(0, 200_000, 2):
+        deadlines.cancel(i)
+    for i in range(1, 200_000, 4):
+        deadlines.schedule(i, 2.0 + rng.random())
+
+    assert len(deadlines) == 100_000
+    assert len(deadlines._heap) <= 2 * len(deadlines) + 64
+    due = deadlines.pop_due(1.0)
+    assert len(due) == 50_000 and all(i % 4 == 3 for i in due)
+
+
+# ── TriggerEngine ────────────────────────────────────────────────────────────
+
+class _Engine(TriggerEngine):
+    """Trigger engine loading rows from a dict instead of the database."""
+
+    def __init__(self, rows=None, **kwargs):
+        self.rows = rows or {}
+        self.calls = []
+        self.loads = 0
+        super().__init__(self._record, triggers=[Trigger("Task", "task_escalator", ""),
+                                                  Trigger("ApprovalStep", "approval_nudger", "")], **kwargs)
+
+    async def _record(self, agent_type, ids):
+        self.calls.append((agent_type, sorted(ids), time.time()))
+
+    async def _load_rows(self, trigger):
+        self.loads += 1
+        return self.rows.get(trigger.table, [])
+
+
+def _changed(table, row_id, due, op="UPDATE"):
+    return json.dumps({
+        "type": "row_changed", "table": table, "op": op, "id": row_id,
+        "due": due.isoformat() if due else None,
+    })
+
+
+def _in(seconds):
+    return datetime.utcnow() + timedelta(seconds=seconds)
+
+
+async def test_loads_once_and_fires_each_row_at_its_deadline():
+    engine = _Engine({"ApprovalStep": [("a1", _in(0.1)), ("a2", _in(0.25)), ("a3", _in(3600))]})
+    timer = asyncio.create_task(engine.run_timer())
+
+    await asyncio.sleep(0.15)
+    assert [(agent, ids) for agent, ids, _ in engine.calls] == [("approval_nudger", ["a1"])]
+    await asyncio.sleep(0.2)
+    assert [ids for _, ids, _ in engine.calls] == [["a1"], ["a2"]]
+    assert engine.loads == 2
+    timer.cancel()
+
+
+async def test_notifications_move_and_cancel_deadlines_without_queries():
+    engine = _Engine({"Task": [("t1", _in(0.1)), ("t2", _in(0.1))]})
+    timer = asyncio.create_task(engine.run_timer())
+    await asyncio.sleep(0.01)
+
+    engine.notify(_changed("Task", "t1", None))                  # escalated elsewhere
+    engine.notify(_changed("Task", "t2", _in(3600)))             # touched, 48 h again
+    engine.notify(_changed("Task", "t3", _in(0.05), op="INSERT"))
+    engine.notify(json.dumps({"type": "invoice_created", "invoice_id": "i1"}))
+    await asyncio.sleep(0.2)
+
+    assert [ids for _, ids, _ in engine.calls] == [["t3"]]
+    assert engine.loads == 2
+    assert engine.events_received == 3
+    timer.cancel()
+
+
+async def test_fired_rows_are_retried_unless_their_deadline_moves():
+    engine = _Engine({"Task": [("t1", _in(-60)), ("t2", _in(-60))]}, retry_seconds=0.15)
+    timer = asyncio.create_task(engine.run_timer())
+    await asyncio.sleep(0.05)
+    assert [ids for _, ids, _ in engine.calls] == [["t1", "t2"]]
+
+    # The run escalated t1; t2 was left untouched
+    engine.notify(_changed("Task", "t1", None))
+    await asyncio.sleep(0.2)
+    assert [ids for _, ids, _ in engine.calls] == [["t1", "t2"], ["t2"]]
+    timer.cancel()
+
+
+async def test_event_without_deadline_reloads_table():
+    engine = _Engine()
+    timer = asyncio.create_task(engine.run_timer())
+    await asyncio.sleep(0.01)
+
+    engine.rows["Task"] = [("t9", _in(-1))]
+    engine.notify(json.dumps({"type": "row_changed", "table": "Task", "op": "UPDATE", "id": "t9"}))
+    await asyncio.sleep(0.05)
+
+    assert engine.loads == 3
+    assert [ids for _, ids, _ in engine.calls] == [["t9"]]
+    timer.cancel()
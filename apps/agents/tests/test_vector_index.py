@@ -0,0 +1,207 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.rag import vector_index
+from app.rag.vector_index import VectorIndex
+
+
+def _random_vectors(n, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def _brute_force(vectors, query, top_k):
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normed @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:top_k])
+
+
+def test_search_matches_brute_force():
+    vectors = _random_vectors(500)
+    index = VectorIndex(initial_capacity=8)
+    for i, v in enumerate(vectors):
+        index.upsert(f"doc-{i}", v.tolist(), {"n": i})
+
+    query = _random_vectors(1, seed=1)[0]
+    results = index.search(query.tolist(), top_k=10)
+
+    assert [r[0] for r in results] == [f"doc-{i}" for i in _brute_force(vectors, query, 10)]
+    assert all(results[i][1] >= results[i + 1][1] for i in range(len(results) - 1))
+
+
+def test_upsert_overwrites_existing_row():
+    index = VectorIndex()
+    index.upsert("a", [1.0, 0.0], {"v": 1})
+    index.upsert("a", [0.0, 1.0], {"v": 2})
+
+    assert len(index) == 1
+    doc_id, score, metadata = index.search([0.0, 1.0], top_k=1)[0]
+    assert doc_id == "a"
+    assert score == pytest.approx(1.0)
+    assert metadata == {"v": 2}
+
+
+def test_delete_tombstones_and_compacts():
+    vectors = _random_vectors(100, dim=8)
+    index = VectorIndex(initial_capacity=4)
+    for i, v in enumerate(vectors):
+        index.upsert(f"doc-{i}", v.tolist(), {})
+
+    for i in range(0, 80):
+        assert index.delete(f"doc-{i}")
+    assert not index.delete("doc-0")
+
+    assert len(index) == 20
+    ids = {r[0] for r in index.search(vectors[0].tolist(), top_k=100)}
+    assert ids == {f"doc-{i}" for i in range(80, 100)}
+
+
+def test_filter_restricts_candidates():
+    index = VectorIndex()
+    index.upsert("inv", [1.0, 0.0], {"type": "invoice"})
+    index.upsert("con", [1.0, 0.1], {"type": "contract"})
+
+    results = index.search([1.0, 0.0], top_k=5, filter_dict={"type": "contract"})
+    assert [r[0] for r in results] == ["con"]
+
+
+def test_dimension_mismatch_raises():
+    index = VectorIndex()
+    index.upsert("a", [1.0, 0.0, 0.0], {})
+    with pytest.raises(ValueError):
+        index.upsert("b", [1.0, 0.0], {})
+
+
+def test_approximate_search_recall_and_incremental_insert():
+    rng = np.random.default_rng(3)
+    centers = rng.standard_normal((20, 32)).astype(np.float32)
+    vectors = centers[rng.integers(0, 20, size=2000)] + 0.3 * rng.standard_normal((2000, 32)).astype(np.float32)
+
+    index = VectorIndex(nlist=20, nprobe=4)
+    for i, v in enumerate(vectors[:1500]):
+        index.upsert(f"doc-{i}", v.tolist(), {})
+
+    # First approximate search trains the quantizer; later inserts are assigned incrementally
+    index.search(vectors[0].tolist(), top_k=1, approximate=True)
+    for i, v in enumerate(vectors[1500:], start=1500):
+        index.upsert(f"doc-{i}", v.tolist(), {})
+
+    hits = 0
+    for i in range(0, 2000, 50):
+        exact = {r[0] for r in index.search(vectors[i].tolist(), top_k=10)}
+        approx = {r[0] for r in index.search(vectors[i].tolist(), top_k=10, approximate=True)}
+        hits += len(exact & approx)
+    assert hits / (40 * 10) > 0.8
+
+    # The query vector itself is always in its own nearest list
+    assert index.search(vectors[1999].tolist(), top_k=1, approximate=True)[0][0] == "doc-1999"
+
+
+def test_approximate_search_falls_back_to_exact_on_small_index():
+    index = VectorIndex()
+    index.upsert("a", [1.0, 0.0], {})
+    index.upsert("b", [0.0, 1.0], {})
+
+    assert index.search([1.0, 0.1], top_k=1, approximate=True)[0][0] == "a"
+
+
+def _typed_index(n=400):
+    vectors = _random_vectors(n)
+    index = VectorIndex(initial_capacity=8)
+    for i, v in enumerate(vectors):
+        # "contract" is 10% of rows, "invoice" 90%
+        index.upsert(f"doc-{i}", v.tolist(), {"type": "contract" if i % 10 == 0 else "invoice", "n": i})
+    return index, vectors
+
+
+@pytest.mark.parametrize("doc_type,plan", [("contract", "prefilter"), ("invoice", "postfilter")])
+def test_indexed_filter_matches_brute_force_under_each_plan(doc_type, plan):
+    index, vectors = _typed_index()
+    matched, _ = index._metadata_index.lookup({"type": doc_type})
+    assert index._plan(matched, use_ivf=False, nprobe=None) == plan
+
+    query = _random_vectors(1, seed=1)[0]
+    rows = [i for i in range(len(vectors)) if (i % 10 == 0) == (doc_type == "contract")]
+    expected = [f"doc-{rows[i]}" for i in _brute_force(vectors[rows], query, 5)]
+
+    results = index.search(query.tolist(), top_k=5, filter_dict={"type": doc_type})
+    assert [r[0] for r in results] == expected
+
+
+def test_metadata_index_follows_updates_deletes_and_compaction():
+    index, vectors = _typed_index(100)
+    index.upsert("doc-0", vectors[0].tolist(), {"type": "invoice"})
+    for i in range(10, 70):
+        index.delete(f"doc-{i}")
+
+    results = index.search(vectors[0].tolist(), top_k=100, filter_dict={"type": "contract"})
+    assert sorted(r[0] for r in results) == sorted(f"doc-{i}" for i in range(70, 100, 10))
+
+
+def test_unindexed_and_mixed_filters_use_residual_check():
+    index, vectors = _typed_index(100)
+
+    results = index.search(vectors[0].tolist(), top_k=100, filter_dict={"type": "contract", "n": 30})
+    assert [r[0] for r in results] == ["doc-30"]
+    assert index.search(vectors[0].tolist(), top_k=5, filter_dict={"type": "receipt"}) == []
+
+
+def test_selective_filter_prefilters_approximate_search_exactly():
+    index, vectors = _typed_index(2000)
+    index.upsert("rare", vectors[5].tolist(), {"type": "rare"})
+
+    results = index.search(vectors[5].tolist(), top_k=3, filter_dict={"type": "rare"}, approximate=True, nprobe=1)
+    assert [r[0] for r in results] == ["rare"]
+
+
+def test_ids_by_metadata():
+    index = VectorIndex()
+    for i in range(4):
+        index.upsert(f"d{i % 2}#{i}", [1.0, float(i)], {"doc_id": f"d{i % 2}", "chunk": i})
+    index.delete("d0#2")
+
+    assert sorted(index.ids({"doc_id": "d0"})) == ["d0#0"]
+    assert sorted(index.ids({"chunk": 3})) == ["d1#3"]
+
+
+def test_background_training_serves_exact_until_swapped_in():
+    rng = np.random.default_rng(3)
+    centers = rng.standard_normal((20, 32)).astype(np.float32)
+    vectors = centers[rng.integers(0, 20, size=2000)] + 0.3 * rng.standard_normal((2000, 32)).astype(np.float32)
+    index = VectorIndex(nlist=20, nprobe=4, background_training=True)
+    for i, v in enumerate(vectors[:1500]):
+        index.upsert(f"doc-{i}", v.tolist(), {})
+
+    # Hold the training thread until the test has written more rows
+    release = threading.Event()
+    gate = vector_index._get_executor().submit(release.wait, 5)
+
+    results = index.search(vectors[0].tolist(), top_k=5, approximate=True)
+    assert index._training is not None and not index._ivf.is_trained
+    assert [r[0] for r in results] == [f"doc-{i}" for i in _brute_force(vectors[:1500], vectors[0], 5)]
+
+    for i, v in enumerate(vectors[1500:], start=1500):
+        index.upsert(f"doc-{i}", v.tolist(), {})
+    release.set()
+    gate.result()
+    index.wait_for_training(timeout=10)
+
+    assert index._ivf.is_trained
+    # Rows written during training were assigned at the swap
+    assert index.search(vectors[1999].tolist(), top_k=1, approximate=True)[0][0] == "doc-1999"
+
+
+def test_background_quantization_keeps_float_rows_until_encoded():
+    vectors = _random_vectors(5000, dim=64)
+    index = VectorIndex(storage="int8", background_training=True)
+    for i, v in enumerate(vectors):
+        index.upsert(f"doc-{i}", v.tolist(), {})
+
+    index.upsert("doc-0", vectors[1].tolist(), {})
+    index.wait_for_training(timeout=10)
+
+    assert index._codes is not None and index._vectors is None
+    query = vectors[1] / np.linalg.norm(vectors[1])
+    assert {r[0] for r in index.search(query.tolist(), top_k=2)} == {"doc-0", "doc-1"}
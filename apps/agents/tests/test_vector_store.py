@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from app.rag import vector_store
+from app.rag.vector_store import PersistentVectorIndex
+
+
+def _vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_reopen_replays_wal(tmp_path):
+    vectors = _vectors(50)
+    index = PersistentVectorIndex(str(tmp_path), checkpoint_ops=0)
+    for i, v in enumerate(vectors):
+        index.upsert(f"doc-{i}", v.tolist(), {"n": i})
+    index.delete("doc-0")
+
+    reopened = PersistentVectorIndex(str(tmp_path), checkpoint_ops=0)
+    assert len(reopened) == 49
+    assert "doc-0" not in reopened
+    doc_id, _, metadata = reopened.search(vectors[7].tolist(), top_k=1)[0]
+    assert doc_id == "doc-7"
+    assert metadata == {"n": 7}
+
+
+def test_checkpoint_writes_segment_and_truncates_wal(tmp_path):
+    vectors = _vectors(30)
+    index = PersistentVectorIndex(str(tmp_path), checkpoint_ops=10)
+    for i, v in enumerate(vectors):
+        index.upsert(f"doc-{i}", v.tolist(), {})
+
+    # 30 writes with checkpoint_ops=10 → three checkpoints, empty WAL
+    assert (tmp_path / "wal.jsonl").stat().st_size == 0
+    assert sorted(p.name for p in tmp_path.glob("segment-*")) == [
+        "segment-000002.f32", "segment-000002.meta.json",
+    ]
+
+    reopened = PersistentVectorIndex(str(tmp_path))
+    assert len(reopened) == 30
+    assert isinstance(reopened._vectors, np.memmap)
+    assert reopened.search(vectors[12].tolist(), top_k=1)[0][0] == "doc-12"
+
+
+def test_instances_see_each_others_writes(tmp_path):
+    vectors = _vectors(4)
+    writer = PersistentVectorIndex(str(tmp_path))
+    reader = PersistentVectorIndex(str(tmp_path))
+
+    writer.upsert("a", vectors[0].tolist(), {})
+    assert reader.search(vectors[0].tolist(), top_k=1)[0][0] == "a"
+
+    writer.checkpoint()
+    writer.upsert("b", vectors[1].tolist(), {})
+    assert {r[0] for r in reader.search(vectors[1].tolist(), top_k=5)} == {"a", "b"}
+
+
+def test_torn_wal_tail_is_ignored(tmp_path):
+    vectors = _vectors(2)
+    index = PersistentVectorIndex(str(tmp_path))
+    index.upsert("a", vectors[0].tolist(), {})
+    with open(tmp_path / "wal.jsonl", "ab") as wal:
+        wal.write(b'{"op": "upsert", "id": "torn"')
+
+    reopened = PersistentVectorIndex(str(tmp_path))
+    assert len(reopened) == 1
+    reopened.upsert("b", vectors[1].tolist(), {})
+
+    assert len(PersistentVectorIndex(str(tmp_path))) == 2
+
+
+def test_write_is_applied_only_after_the_wal_is_durable(tmp_path, monkeypatch):
+    vectors = _vectors(2)
+    index = PersistentVectorIndex(str(tmp_path), checkpoint_ops=0)
+    index.upsert("doc-0", vectors[0].tolist(), {})
+
+    def failing_fsync(fd):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(vector_store.os, "fsync", failing_fsync)
+    with pytest.raises(OSError):
+        index.upsert("doc-1", vectors[1].tolist(), {})
+    with pytest.raises(OSError):
+        index.delete("doc-0")
+    assert "doc-1" not in index and "doc-0" in index
+
+    monkeypatch.undo()
+    with pytest.raises(ValueError):
+        index.upsert("doc-2", [1.0, 2.0], {})
+    reopened = PersistentVectorIndex(str(tmp_path), checkpoint_ops=0)
+    assert len(reopened) == 1
+
+
+def test_batches_are_logged_with_one_fsync(tmp_path, monkeypatch):
+    vectors = _vectors(20)
+    index = PersistentVectorIndex(str(tmp_path), checkpoint_ops=0)
+    fsyncs = []
+    fsync = vector_store.os.fsync
+    monkeypatch.setattr(vector_store.os, "fsync", lambda fd: fsyncs.append(fd) or fsync(fd))
+
+    index.upsert_many([(f"doc-{i}", v.tolist(), {"n": i}) for i, v in enumerate(vectors)])
+    assert index.delete_many(["doc-0", "doc-1", "missing"]) == 2
+
+    assert len(fsyncs) == 2
+    reopened = PersistentVectorIndex(str(tmp_path), checkpoint_ops=0)
+    assert len(reopened) == 18
+    assert reopened.search(vectors[5].tolist(), top_k=1)[0][0] == "doc-5"